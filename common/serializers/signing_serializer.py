@@ -20,8 +20,6 @@ message coming from node j, node i first verifies the MAC
 authenticator.
 
 """
-from collections.abc import Iterable
-
 from common.error import error
 from stp_core.common.log import getlogger
 
@@ -31,6 +29,61 @@ logger = getlogger()
 acceptableTypes = (str, int, float, list, dict, type(None))
 
 
+class _InvalidType(Exception):
+    pass
+
+
+def _serialize_into(obj, append):
+    # Appends parts of the serialized form of `obj` to a single buffer
+    # rather than joining the parts at every level of nesting
+    if isinstance(obj, str):
+        append(obj)
+    elif isinstance(obj, dict):
+        sep = ''
+        for k in sorted(obj):
+            v = obj[k]
+            if isinstance(v, str):
+                append(sep + str(k) + ':' + v)
+            else:
+                append(sep + str(k) + ':')
+                _serialize_into(v, append)
+            sep = '|'
+    elif isinstance(obj, list):
+        sep = ''
+        for o in obj:
+            if sep:
+                append(sep)
+            _serialize_into(o, append)
+            sep = ','
+    elif obj is None:
+        pass
+    elif isinstance(obj, (int, float)):
+        append(str(obj))
+    else:
+        raise _InvalidType
+
+
+def _find_invalid(obj, objname=None):
+    """
+    Find the first object of a type which cannot be serialized, in the
+    order it is met by serialization, and the dotted path to it
+    """
+    if not isinstance(obj, acceptableTypes):
+        return objname, obj
+    if isinstance(obj, dict):
+        for k in sorted(obj):
+            onm = ".".join([str(objname), str(k)]) if objname else k
+            found = _find_invalid(obj[k], onm)
+            if found is not None:
+                return found
+    elif isinstance(obj, list):
+        for o in obj:
+            found = _find_invalid(o, objname)
+            if found is not None:
+                return found
+    return None
+
+
 class SigningSerializer:
     def serialize(self, obj, level=0, objname=None, topLevelKeysToIgnore=None,
                   toBytes=True):
@@ -55,41 +108,19 @@ class SigningSerializer:
          serialization
         :return: a string representation of `obj`
         """
-        res = None
-        if not isinstance(obj, acceptableTypes):
+        if level == 0 and topLevelKeysToIgnore and isinstance(obj, dict):
+            obj = {k: v for k, v in obj.items() if k not in topLevelKeysToIgnore}
+
+        parts = []
+        try:
+            _serialize_into(obj, parts.append)
+        except _InvalidType:
+            # Path to the invalid object is only needed for the error
+            objname, obj = _find_invalid(obj, objname)
             error("invalid type found {}: {}".format(objname, obj))
-        elif isinstance(obj, str):
-            res = obj
-        elif isinstance(obj, dict):
-            if level > 0:
-                keys = list(obj.keys())
-            else:
-                topLevelKeysToIgnore = topLevelKeysToIgnore or []
-                keys = [k for k in obj.keys() if k not in topLevelKeysToIgnore]
-            keys.sort()
-            strs = []
-            for k in keys:
-                onm = ".".join([str(objname), str(k)]) if objname else k
-                strs.append(
-                    str(k) + ":" + self.serialize(obj[k], level + 1, onm, toBytes=False))
-            res = "|".join(strs)
-        elif isinstance(obj, Iterable):
-            strs = []
-            for o in obj:
-                strs.append(self.serialize(
-                    o, level + 1, objname, toBytes=False))
-            res = ",".join(strs)
-        elif obj is None:
-            res = ""
-        else:
-            res = str(obj)
-
-        # logger.trace("serialized msg {} into {}".format(obj, res))
+        res = ''.join(parts)
 
         if not toBytes:
             return res
 
         return res.encode('utf-8')
-
-        # topLevelKeysToIgnore = topLevelKeysToIgnore or []
-        # return ujson.dumps({k:obj[k] for k in obj.keys() if k not in topLevelKeysToIgnore}, sort_keys=True)
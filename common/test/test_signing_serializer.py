@@ -1,8 +1,12 @@
+import random
 from collections import OrderedDict
+from collections.abc import Iterable
 
 import pytest
 
+from common.error import error
 from common.serializers.serialization import serialize_msg_for_signing
+from common.serializers.signing_serializer import SigningSerializer, acceptableTypes
 
 
 def test_serialize_int():
@@ -138,3 +142,98 @@ def test_serialize_complex_ordered_dict():
             ])),
             ('1', 'a'),
         ]))
+
+
+class ReferenceSigningSerializer:
+    # Recursive implementation the signing serializer had before it was
+    # made single pass, the serialized form must not change
+    def serialize(self, obj, level=0, objname=None, topLevelKeysToIgnore=None,
+                  toBytes=True):
+        res = None
+        if not isinstance(obj, acceptableTypes):
+            error("invalid type found {}: {}".format(objname, obj))
+        elif isinstance(obj, str):
+            res = obj
+        elif isinstance(obj, dict):
+            if level > 0:
+                keys = list(obj.keys())
+            else:
+                topLevelKeysToIgnore = topLevelKeysToIgnore or []
+                keys = [k for k in obj.keys() if k not in topLevelKeysToIgnore]
+            keys.sort()
+            strs = []
+            for k in keys:
+                onm = ".".join([str(objname), str(k)]) if objname else k
+                strs.append(
+                    str(k) + ":" + self.serialize(obj[k], level + 1, onm, toBytes=False))
+            res = "|".join(strs)
+        elif isinstance(obj, Iterable):
+            strs = []
+            for o in obj:
+                strs.append(self.serialize(
+                    o, level + 1, objname, toBytes=False))
+            res = ",".join(strs)
+        elif obj is None:
+            res = ""
+        else:
+            res = str(obj)
+
+        if not toBytes:
+            return res
+
+        return res.encode('utf-8')
+
+
+def random_str(rnd):
+    alphabet = 'abcXYZ019:|,. ~é中'
+    return ''.join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 8)))
+
+
+def random_obj(rnd, depth=0, invalid=False):
+    kinds = ['str', 'int', 'float', 'bool', 'none']
+    if depth < 4:
+        kinds += ['list', 'dict', 'dict']
+    if invalid:
+        kinds += ['bytes']
+    kind = rnd.choice(kinds)
+    if kind == 'str':
+        return random_str(rnd)
+    if kind == 'int':
+        return rnd.randint(-10 ** 20, 10 ** 20)
+    if kind == 'float':
+        return rnd.uniform(-1e6, 1e6)
+    if kind == 'bool':
+        return rnd.random() < 0.5
+    if kind == 'none':
+        return None
+    if kind == 'bytes':
+        return random_str(rnd).encode()
+    if kind == 'list':
+        return [random_obj(rnd, depth + 1, invalid) for _ in range(rnd.randint(0, 5))]
+    # Keys of one dict are of the same type, so that they can be sorted
+    if rnd.random() < 0.8:
+        keys = [random_str(rnd) for _ in range(rnd.randint(0, 6))]
+    else:
+        keys = [rnd.randint(-100, 100) for _ in range(rnd.randint(0, 6))]
+    return {k: random_obj(rnd, depth + 1, invalid) for k in keys}
+
+
+def serialize_or_error(serializer, obj, **kwargs):
+    try:
+        return serializer.serialize(obj, **kwargs)
+    except Exception as ex:
+        return type(ex), str(ex)
+
+
+def test_serialization_is_same_as_reference():
+    rnd = random.Random(0)
+    serializer = SigningSerializer()
+    reference = ReferenceSigningSerializer()
+    for i in range(3000):
+        obj = random_obj(rnd, invalid=i % 3 == 0)
+        ignore = None
+        if isinstance(obj, dict) and obj and rnd.random() < 0.5:
+            ignore = rnd.sample(list(obj), rnd.randint(1, len(obj)))
+        for to_bytes in (True, False):
+            assert serialize_or_error(serializer, obj, topLevelKeysToIgnore=ignore, toBytes=to_bytes) == \
+                serialize_or_error(reference, obj, topLevelKeysToIgnore=ignore, toBytes=to_bytes)
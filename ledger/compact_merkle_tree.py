@@ -1,3 +1,4 @@
+import bisect
 import functools
 from binascii import hexlify
 from typing import List, Tuple, Sequence
@@ -19,6 +20,9 @@ class CompactMerkleTree(merkle_tree.MerkleTree):
             sorted in descending order of size.
     """
 
+    # Number of leaves hashed as one independent subtree by `extend`
+    SUBTREE_SIZE = 1024
+
     def __init__(self, hasher=TreeHasher(), tree_size=0, hashes=(),
                  hashStore=None):
 
@@ -159,30 +163,79 @@ class CompactMerkleTree(merkle_tree.MerkleTree):
         self._push_subtree([new_leaf])
         return auditPath
 
-    def extend(self, new_leaves: List[bytes]):
+    def extend(self, new_leaves: List[bytes], with_audit_info=False):
         """Extend this tree with new_leaves on the end.
 
-        The algorithm works by using _push_subtree() as a primitive, calling
-        it with the maximum number of allowed leaves until we can add the
-        remaining leaves as a valid entire (non-full) subtree in one go.
+        The result is the same as appending the leaves one by one, including
+        the leaves and nodes written to the hash store, but the hash store
+        gets all of them with one `writeLeafs` and one `writeNodes` call.
+
+        Unless audit info is requested, leaves forming full subtrees of
+        SUBTREE_SIZE aligned with the tree are hashed as independent
+        subtrees by the hasher (which may do it in parallel), only the roots
+        of those subtrees are pushed onto the tree.
+
+        If with_audit_info is set, returns a list of (audit path, root hash)
+        for every appended leaf, i.e. what `append` and `root_hash` would
+        give right after appending that leaf.
         """
+        if with_audit_info:
+            return self.__extend_with_audit_info(new_leaves)
+
+        leaf_hashes = []
+        nodes = []
         size = len(new_leaves)
-        final_size = self.tree_size + size
-        idx = 0
-        while True:
-            # keep pushing subtrees until mintree_size > remaining
-            max_h = self.__mintree_height
-            max_size = 1 << (max_h - 1) if max_h > 0 else 0
-            if max_h > 0 and size - idx >= max_size:
-                self._push_subtree(new_leaves[idx:idx + max_size])
-                idx += max_size
-            else:
-                break
-        # fill in rest of tree in one go, now that we can
-        if idx < size:
-            root_hash, hashes = self.__hasher._hash_full(new_leaves, idx, size)
-            self._update(final_size, self.hashes + hashes)
-        assert self.tree_size == final_size
+        # Leaves up to the next multiple of SUBTREE_SIZE are pushed one by
+        # one, after that the tree size is aligned to subtrees.
+        head_size = min(size, -self.tree_size % self.SUBTREE_SIZE)
+        tail_start = head_size + \
+            (size - head_size) // self.SUBTREE_SIZE * self.SUBTREE_SIZE
+
+        self.__push_leaf_hashes(
+            self.__hasher.hash_leaves(new_leaves[:head_size]),
+            leaf_hashes, nodes)
+        subtrees = [new_leaves[i:i + self.SUBTREE_SIZE]
+                    for i in range(head_size, tail_start, self.SUBTREE_SIZE)]
+        subtree_h = lowest_bit_set(self.SUBTREE_SIZE)
+        for subtree_leaf_hashes, subtree_nodes, subtree_hash in \
+                self.__hasher.hash_full_subtrees(subtrees):
+            offset = self.tree_size
+            leaf_hashes.extend(subtree_leaf_hashes)
+            nodes.extend((offset + start, height, h)
+                         for start, height, h in subtree_nodes)
+            new_node_hashes = self.__push_subtree_hash(subtree_h, subtree_hash)
+            nodes.extend((self.tree_size, height, h)
+                         for h, height in new_node_hashes)
+        self.__push_leaf_hashes(
+            self.__hasher.hash_leaves(new_leaves[tail_start:]),
+            leaf_hashes, nodes)
+
+        if self.hashStore:
+            self.hashStore.writeLeafs(leaf_hashes)
+            self.hashStore.writeNodes(nodes)
+
+    def __push_leaf_hashes(self, new_leaf_hashes, leaf_hashes, nodes):
+        for leaf_hash in new_leaf_hashes:
+            leaf_hashes.append(leaf_hash)
+            new_node_hashes = self.__push_subtree_hash(1, leaf_hash)
+            nodes.extend((self.tree_size, height, h)
+                         for h, height in new_node_hashes)
+
+    def __extend_with_audit_info(self, new_leaves: List[bytes]):
+        leaf_hashes = self.__hasher.hash_leaves(new_leaves)
+        audit_info = []
+        nodes = []
+        for leaf_hash in leaf_hashes:
+            audit_path = list(reversed(self.__hashes))
+            root_hash = self.__hasher._hash_fold(self.__hashes + (leaf_hash,))
+            audit_info.append((audit_path, root_hash))
+            new_node_hashes = self.__push_subtree_hash(1, leaf_hash)
+            nodes.extend((self.tree_size, height, h)
+                         for h, height in new_node_hashes)
+        if self.hashStore:
+            self.hashStore.writeLeafs(leaf_hashes)
+            self.hashStore.writeNodes(nodes)
+        return audit_info
 
     def extended(self, new_leaves: List[bytes]):
         """Returns a new tree equal to this tree extended with new_leaves."""
@@ -218,6 +271,38 @@ class CompactMerkleTree(merkle_tree.MerkleTree):
         return [self.merkle_tree_hash(a, b)
                 for a, b in self._path(start, 0, end)]
 
+    def multi_inclusion_proof(self, indices, end):
+        """
+        Proof of inclusion of several leaves at once in the tree of size
+        `end`. It consists of the hashes of the maximal subtrees which have
+        none of the leaves, in left to right order, so nodes shared by the
+        audit paths of the leaves are sent only once and nodes which can be
+        computed from the leaves themselves are not sent at all.
+
+        :param indices: 0-based indices of the leaves, e.g. a range
+        """
+        indices = sorted(set(indices))
+        if not indices:
+            raise ValueError("no leaves to prove inclusion of")
+        if indices[0] < 0 or indices[-1] >= end:
+            raise IndexError("leaf indices {}-{} are out of tree of size {}"
+                             .format(indices[0], indices[-1], end))
+        return [self.merkle_tree_hash(a, b)
+                for a, b in self._multi_path(indices, 0, end)]
+
+    def _multi_path(self, indices, start_n: int, end_n: int):
+        # `indices` are sorted and lie within [start_n, end_n)
+        if not indices:
+            return [(start_n, end_n)]
+        n = end_n - start_n
+        if n == 1:
+            return []
+        # `k` is the largest power of 2 less than `n`
+        k = 1 << (len(bin(n - 1)) - 3)
+        split = bisect.bisect_left(indices, start_n + k)
+        return self._multi_path(indices[:split], start_n, start_n + k) + \
+            self._multi_path(indices[split:], start_n + k, end_n)
+
     def _subproof(self, m, start_n: int, end_n: int, b: int):
         n = end_n - start_n
         if m == n:
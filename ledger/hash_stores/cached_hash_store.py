@@ -0,0 +1,100 @@
+from collections import OrderedDict
+
+from ledger.hash_stores.hash_store import HashStore
+
+
+class CachedHashStore(HashStore):
+    # Wraps any hash store and keeps the most recently read node hashes in
+    # memory. Nodes of the upper levels of the tree are on the audit path of
+    # nearly every proof, so with a cache of a few thousand entries reading
+    # them stops hitting the disk. Node hashes never change once written,
+    # so the cache only has to be dropped when the store is reset.
+    def __init__(self, hash_store: HashStore, max_nodes=4096):
+        if max_nodes < 1:
+            raise ValueError("max_nodes must be positive, got {}"
+                             .format(max_nodes))
+        self.hash_store = hash_store
+        self.max_nodes = max_nodes
+        self._nodes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        # Anything specific to the wrapped store (files, databases) is
+        # accessed as is
+        if name == 'hash_store':
+            raise AttributeError(name)
+        return getattr(self.hash_store, name)
+
+    @property
+    def is_persistent(self) -> bool:
+        return self.hash_store.is_persistent
+
+    def writeLeaf(self, leafHash):
+        self.hash_store.writeLeaf(leafHash)
+
+    def writeNode(self, node):
+        self.hash_store.writeNode(node)
+
+    def writeLeafs(self, leafHashes):
+        self.hash_store.writeLeafs(leafHashes)
+
+    def writeNodes(self, nodes):
+        self.hash_store.writeNodes(nodes)
+
+    def readLeaf(self, pos):
+        return self.hash_store.readLeaf(pos)
+
+    def readNode(self, pos):
+        nodeHash = self._nodes.get(pos)
+        if nodeHash is not None:
+            self._nodes.move_to_end(pos)
+            self.hits += 1
+            return nodeHash
+        self.misses += 1
+        nodeHash = self.hash_store.readNode(pos)
+        if nodeHash is not None:
+            self._nodes[pos] = nodeHash
+            if len(self._nodes) > self.max_nodes:
+                self._nodes.popitem(last=False)
+        return nodeHash
+
+    def readLeafs(self, startpos, endpos):
+        return self.hash_store.readLeafs(startpos, endpos)
+
+    def readNodes(self, startpos, endpos):
+        return self.hash_store.readNodes(startpos, endpos)
+
+    @property
+    def leafCount(self) -> int:
+        return self.hash_store.leafCount
+
+    @leafCount.setter
+    def leafCount(self, count: int) -> None:
+        self.hash_store.leafCount = count
+
+    @property
+    def nodeCount(self) -> int:
+        return self.hash_store.nodeCount
+
+    def take_stats(self):
+        """
+        Return the number of cache hits and misses since the last call
+        """
+        stats = self.hits, self.misses
+        self.hits = self.misses = 0
+        return stats
+
+    def open(self):
+        self.hash_store.open()
+
+    def close(self):
+        self.hash_store.close()
+
+    @property
+    def closed(self):
+        return self.hash_store.closed
+
+    def reset(self) -> bool:
+        self._nodes.clear()
+        return self.hash_store.reset()
@@ -29,6 +29,27 @@ class HashStore:
         :param node: tuple of start, height and nodeHash
         """
 
+    def writeLeafs(self, leafHashes):
+        """
+        append multiple leafHashes to the leaf hash store. Implementations
+        can override it to persist all of them with a single write
+
+        :param leafHashes: list of hashes of the leaves
+        """
+        for leafHash in leafHashes:
+            self.writeLeaf(leafHash)
+
+    def writeNodes(self, nodes):
+        """
+        append multiple nodes to the node hash store in the given order.
+        Implementations can override it to persist all of them with a
+        single write
+
+        :param nodes: list of tuples of start, height and nodeHash
+        """
+        for node in nodes:
+            self.writeNode(node)
+
     @abstractmethod
     def readLeaf(self, pos):
         """
@@ -0,0 +1,100 @@
+import mmap
+import os
+
+from ledger.hash_stores.file_hash_store import FileHashStore
+
+
+class MmapFileHashStore(FileHashStore):
+    # Same on-disk layout as `FileHashStore`, but reads are served from
+    # read-only memory maps of the leaves and nodes files instead of a
+    # `seek` + `read` pair per entry. Since every entry is of fixed size, a
+    # range of leaves or nodes is a single slice of the map. Writes still go
+    # through the underlying file stores; a map is re-created lazily once a
+    # read goes past its end.
+    def __init__(self, dataDir, fileNamePrefix="", leafSize=32, nodeSize=32):
+        self._maps = {}
+        super().__init__(dataDir,
+                         fileNamePrefix=fileNamePrefix,
+                         leafSize=leafSize,
+                         nodeSize=nodeSize)
+
+    def _map_for(self, store, end_offset):
+        """
+        Return a memory map of `store` that covers at least `end_offset`
+        bytes or None if the file is not that big yet
+        """
+        mapped = self._maps.get(store.db_path)
+        if mapped is not None and len(mapped) >= end_offset:
+            return mapped
+        file_size = os.fstat(store.db_file.fileno()).st_size
+        if file_size < end_offset:
+            return None
+        if mapped is not None:
+            mapped.close()
+        mapped = mmap.mmap(store.db_file.fileno(), file_size,
+                           access=mmap.ACCESS_READ)
+        self._maps[store.db_path] = mapped
+        return mapped
+
+    def _read_range(self, store, startpos, endpos, size):
+        self._validatePos(startpos)
+        if endpos < startpos:
+            raise IndexError(
+                "start ({}) index must not be greater than end ({}) index"
+                .format(startpos, endpos))
+        start_offset = (startpos - 1) * size
+        end_offset = endpos * size
+        mapped = self._map_for(store, end_offset)
+        if mapped is None:
+            raise IndexError("No entries at positions {}-{}"
+                             .format(startpos, endpos))
+        return mapped[start_offset:end_offset]
+
+    def _close_maps(self):
+        for mapped in self._maps.values():
+            mapped.close()
+        self._maps = {}
+
+    def readNode(self, pos):
+        return self._read_range(self.nodesFile, pos, pos, self.nodeSize)
+
+    def readLeaf(self, pos):
+        return self._read_range(self.leavesFile, pos, pos, self.leafSize)
+
+    def readLeafsBuffer(self, startpos, endpos):
+        """
+        Read leaves from `startpos` to `endpos` (both inclusive) as one
+        contiguous buffer of `leafSize` sized hashes
+        """
+        return self._read_range(self.leavesFile, startpos, endpos,
+                                self.leafSize)
+
+    def readNodesBuffer(self, startpos, endpos):
+        """
+        Read nodes from `startpos` to `endpos` (both inclusive) as one
+        contiguous buffer of `nodeSize` sized hashes
+        """
+        return self._read_range(self.nodesFile, startpos, endpos,
+                                self.nodeSize)
+
+    @staticmethod
+    def _split(buffer, size):
+        return [buffer[i:i + size] for i in range(0, len(buffer), size)]
+
+    def readLeafs(self, startpos, endpos):
+        return self._split(self.readLeafsBuffer(startpos, endpos),
+                           self.leafSize)
+
+    def readNodes(self, startpos, endpos):
+        return self._split(self.readNodesBuffer(startpos, endpos),
+                           self.nodeSize)
+
+    def close(self):
+        self._close_maps()
+        super().close()
+
+    def reset(self):
+        # Maps must be dropped before the files are truncated, accessing
+        # a mapped page past the end of a file raises SIGBUS
+        self._close_maps()
+        return super().reset()
@@ -6,6 +6,7 @@ from common.serializers.mapping_serializer import MappingSerializer
 from common.serializers.serialization import ledger_txn_serializer, ledger_hash_serializer, txn_root_serializer
 from ledger.genesis_txn.genesis_txn_initiator import GenesisTxnInitiator
 from ledger.immutable_store import ImmutableStore
+from ledger.merkle_frontier_store import MerkleFrontierStore
 from ledger.merkle_tree import MerkleTree
 from ledger.tree_hasher import TreeHasher
 from ledger.util import F, ConsistencyVerificationFailed
@@ -15,6 +16,10 @@ from plenum.common.config_util import getConfig
 
 
 class Ledger(ImmutableStore):
+    # Number of transactions added to the tree at once when it is recovered
+    # from the transaction log
+    RECOVERY_BATCH_SIZE = 65536
+
     @staticmethod
     def _defaultStore(dataDir,
                       logName,
@@ -38,7 +43,8 @@ class Ledger(ImmutableStore):
                  transactionLogStore: KeyValueStorage = None,
                  genesis_txn_initiator: GenesisTxnInitiator = None,
                  config=None,
-                 read_only=False):
+                 read_only=False,
+                 frontier_store: MerkleFrontierStore = None):
         """
         :param tree: an implementation of MerkleTree
         :param dataDir: the directory where the transaction log is stored
@@ -46,6 +52,8 @@ class Ledger(ImmutableStore):
         it and storing it in the MerkleTree
         :param fileName: the name of the transaction log file
         :param genesis_txn_initiator: file or dir to use for initialization of transaction log store
+        :param frontier_store: if given, the frontier of the tree is saved
+        there on every commit and the tree is restored from it on start
         """
         self.genesis_txn_initiator = genesis_txn_initiator
 
@@ -61,6 +69,7 @@ class Ledger(ImmutableStore):
         self._transactionLogName = fileName or "transactions"
         self.ensureDurability = ensureDurability
         self._customTransactionLogStore = transactionLogStore
+        self._frontier_store = frontier_store
         self.seqNo = 0
         self.start()
         self.recoverTree()
@@ -79,13 +88,15 @@ class Ledger(ImmutableStore):
             self.recoverTreeFromTxnLog()
         else:
             try:
-                logging.info("Recovering tree from hash store of size {}".format(self.tree.leafCount))
-                self.recoverTreeFromHashStore()
+                if not self.recoverTreeFromFrontier():
+                    logging.info("Recovering tree from hash store of size {}".format(self.tree.leafCount))
+                    self.recoverTreeFromHashStore()
             except ConsistencyVerificationFailed:
                 logging.error("Consistency verification of merkle tree "
                               "from hash store failed, "
                               "falling back to transaction log")
                 self.recoverTreeFromTxnLog()
+        self._save_frontier()
 
         end = time.perf_counter()
         t = end - start
@@ -96,22 +107,122 @@ class Ledger(ImmutableStore):
         if not self._read_only:
             self.tree.reset()
         self.seqNo = 0
-        for key, entry in self._transactionLog.iterator():
-            if self.txn_serializer != self.hash_serializer:
-                entry = self.serialize_for_tree(
-                    self.txn_serializer.deserialize(entry))
-            if isinstance(entry, str):
-                entry = entry.encode()
-            self._addToTreeSerialized(entry)
+        self._replayTxnLog()
+
+    def _replayTxnLog(self, entries=None):
+        # Leaves are added in batches, so that the tree can hash big ranges
+        # of them at once (in parallel if its hasher supports it)
+        if entries is None:
+            entries = self._transactionLog.iterator()
+        leaves = []
+        for _, entry in entries:
+            leaves.append(self._txnLogEntryToLeaf(entry))
+            if len(leaves) >= self.RECOVERY_BATCH_SIZE:
+                self._addToTreeSerializedBatch(leaves)
+                leaves = []
+        self._addToTreeSerializedBatch(leaves)
+
+    def _txnLogEntryToLeaf(self, entry):
+        if self.txn_serializer != self.hash_serializer:
+            entry = self.serialize_for_tree(
+                self.txn_serializer.deserialize(entry))
+        if isinstance(entry, str):
+            entry = entry.encode()
+        return entry
 
     def recoverTreeFromHashStore(self):
         treeSize = self.tree.leafCount
         self.seqNo = treeSize
-        hashes = list(reversed(self.tree.inclusion_proof(treeSize,
-                                                         treeSize + 1)))
+        hashes = self._frontierFromHashStore(treeSize)
         self.tree._update(self.tree.leafCount, hashes)
         self.tree.verify_consistency(self._transactionLog.size)
 
+    def recoverTreeFromFrontier(self) -> bool:
+        """
+        Restore the tree from the last saved frontier. The hash store is
+        checked against the frontier and the transactions added after the
+        hash store was last written are replayed, so that neither the whole
+        hash store nor the whole transaction log is read.
+
+        :return: False if there is no saved frontier to restore from
+        """
+        frontier = self._frontier_store.load() \
+            if self._frontier_store else None
+        if frontier is None:
+            return False
+        frontierSize, frontierHashes = frontier
+        leafCount = self.tree.leafCount
+        logging.info("Recovering tree from frontier of size {} and hash "
+                     "store of size {}".format(frontierSize, leafCount))
+        # The hash store is written before the frontier, so it can only be
+        # ahead of it, and it must hold the very tree the frontier describes
+        if frontierSize > leafCount or \
+                self._frontierFromHashStore(frontierSize) != \
+                list(frontierHashes):
+            raise ConsistencyVerificationFailed()
+        # The transaction log is written before the hash store, so it must
+        # have the transaction of the last leaf, possibly followed by a tail
+        # of transactions which did not make it to the hash store
+        tail = iter(self._transactionLog.iterator(start=leafCount))
+        last = next(tail, None)
+        if last is None or int(last[0]) != leafCount:
+            raise ConsistencyVerificationFailed()
+
+        self.tree._update(leafCount, self._frontierFromHashStore(leafCount))
+        self.seqNo = leafCount
+        self._replayTxnLog(tail)
+        return True
+
+    def _frontierFromHashStore(self, treeSize):
+        if treeSize == 0:
+            return []
+        return list(reversed(self.tree.inclusion_proof(treeSize,
+                                                       treeSize + 1)))
+
+    def _save_frontier(self):
+        if self._frontier_store and not self._read_only:
+            self._frontier_store.save(self.tree.tree_size, self.tree.hashes)
+
+    def verify_tree(self, batch_size=None):
+        """
+        Re-hash the transaction log up to the current size of the tree and
+        check that the result matches the current root hash.
+
+        This reads the whole transaction log, so it is done as a generator
+        which yields the number of checked transactions after every
+        `batch_size` of them, letting the caller spread the work over time.
+
+        :raises ConsistencyVerificationFailed: if the tree does not match
+        the transaction log
+        """
+        batch_size = batch_size or self.RECOVERY_BATCH_SIZE
+        expectedSize = self.tree.tree_size
+        expectedRoot = self.tree.root_hash
+        # Frontier of the tree built so far, merged in the same way as
+        # `CompactMerkleTree` does without writing anything anywhere
+        size = 0
+        hashes = []
+        for key, entry in self._transactionLog.iterator():
+            if size == expectedSize:
+                break
+            if int(key) != size + 1:
+                raise ConsistencyVerificationFailed()
+            leafHash = self.hasher.hash_leaf(self._txnLogEntryToLeaf(entry))
+            size += 1
+            mergesLeft = size
+            while not mergesLeft & 1:
+                leafHash = self.hasher.hash_children(hashes.pop(), leafHash)
+                mergesLeft >>= 1
+            hashes.append(leafHash)
+            if size % batch_size == 0:
+                yield size
+
+        root = self.hasher._hash_fold(hashes) if hashes \
+            else self.hasher.hash_empty()
+        if size != expectedSize or root != expectedRoot:
+            raise ConsistencyVerificationFailed()
+        yield size
+
     def add(self, leaf):
         """
         Add the leaf (transaction) to the log and the merkle tree.
@@ -131,6 +242,40 @@ class Ledger(ImmutableStore):
 
         return merkle_info
 
+    def add_batch(self, leaves, with_merkle_info=True):
+        """
+        Add multiple leaves (transactions) to the log and the merkle tree.
+
+        Gives the same result as calling `add` for every leaf, but the
+        transaction log entries are written with one `setBatch` and the tree
+        is extended at once, so that leaves and nodes go to the hash store
+        with grouped writes as well.
+
+        :param with_merkle_info: if not set, merkle info is not built, which
+        lets the tree hash the leaves as whole subtrees
+        :return: list of merkle info for every added leaf
+        """
+        if not leaves:
+            return []
+        self._transactionLog.setBatch(
+            [(str(self.seqNo + i + 1), self.serialize_for_txn_log(leaf))
+             for i, leaf in enumerate(leaves)])
+
+        serz_leaves = [self.serialize_for_tree(leaf) for leaf in leaves]
+        if not with_merkle_info:
+            self._addToTreeSerializedBatch(serz_leaves)
+            self._save_frontier()
+            return []
+
+        audit_info = self.tree.extend(serz_leaves, with_audit_info=True)
+        merkle_infos = []
+        for audit_path, root_hash in audit_info:
+            self.seqNo += 1
+            merkle_infos.append(self._build_merkle_proof(audit_path,
+                                                         root_hash))
+        self._save_frontier()
+        return merkle_infos
+
     def _addToTree(self, leafData, serialized=False):
         serializedLeafData = self.serialize_for_tree(leafData) if \
             not serialized else leafData
@@ -146,10 +291,15 @@ class Ledger(ImmutableStore):
         self.seqNo += 1
         return self._build_merkle_proof(audit_path)
 
-    def _build_merkle_proof(self, audit_path):
+    def _addToTreeSerializedBatch(self, serializedLeaves):
+        self.tree.extend(serializedLeaves)
+        self.seqNo += len(serializedLeaves)
+
+    def _build_merkle_proof(self, audit_path, root_hash=None):
+        root_hash = root_hash or self.tree.root_hash
         return {
             F.seqNo.name: self.seqNo,
-            F.rootHash.name: self.hashToStr(self.tree.root_hash),
+            F.rootHash.name: self.hashToStr(root_hash),
             F.auditPath.name: [self.hashToStr(h) for h in audit_path]
         }
 
@@ -216,6 +366,24 @@ class Ledger(ImmutableStore):
             F.ledgerSize.name: self.size
         }
 
+    def multiAuditProof(self, seqNos):
+        """
+        One proof of inclusion of all the given transactions in the current
+        ledger, which is much smaller than the audit proofs of each of them
+        when the transactions are close to each other, e.g. a batch
+        """
+        seqNos = [int(seqNo) for seqNo in seqNos]
+        if not seqNos or min(seqNos) <= 0:
+            raise PlenumValueError('seqNos', seqNos, 'non empty and > 0')
+        rootHash = self.tree.merkle_tree_hash(0, self.size)
+        auditPath = self.tree.multi_inclusion_proof(
+            [seqNo - 1 for seqNo in seqNos], self.size)
+        return {
+            F.rootHash.name: self.hashToStr(rootHash),
+            F.auditPath.name: [self.hashToStr(h) for h in auditPath],
+            F.ledgerSize.name: self.size
+        }
+
     def start(self, loop=None, ensureDurability=True):
         if self._transactionLog and not self._transactionLog.closed:
             logging.debug("Ledger already started.")
@@ -242,13 +410,24 @@ class Ledger(ImmutableStore):
         # THIS IS A DESTRUCTIVE ACTION
         self._transactionLog.reset()
         self.tree.hashStore.reset()
+        if self._frontier_store:
+            self._frontier_store.reset()
 
     # TODO: rename getAllTxn to get_txn_slice with required parameters frm to
     # add get_txn_all without args.
-    def getAllTxn(self, frm: int = None, to: int = None):
+    def getAllTxn(self, frm: int = None, to: int = None,
+                  serialized: bool = False):
+        """
+        Stream transactions from `frm` to `to` (both inclusive)
+
+        :param serialized: yield transactions as they are stored in the
+        transaction log, for callers which pass them on without looking
+        inside
+        """
         for seq_no, txn in self._transactionLog.iterator(start=frm, end=to):
             if to is None or int(seq_no) <= to:
-                yield (int(seq_no), self.txn_serializer.deserialize(txn))
+                yield (int(seq_no),
+                       txn if serialized else self.txn_serializer.deserialize(txn))
             else:
                 break
 
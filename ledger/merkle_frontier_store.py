@@ -0,0 +1,80 @@
+import hashlib
+import os
+import struct
+from typing import Optional, Sequence, Tuple
+
+from ledger.util import count_bits_set
+from stp_core.common.log import getlogger
+
+logger = getlogger()
+
+
+class MerkleFrontierStore:
+    # Keeps the last checkpoint of the frontier of a compact merkle tree,
+    # i.e. its size and the hashes of its full subtrees. With it a ledger
+    # restores its tree by reading a single small file instead of walking
+    # the whole hash store or transaction log.
+    #
+    # The file is a header with the tree size, the number and size of the
+    # hashes, then the hashes and a sha256 digest sealing all of the above,
+    # so a torn or damaged checkpoint is never loaded. It is replaced
+    # atomically on every save.
+    HEADER = struct.Struct(">QHH")
+
+    def __init__(self, dataDir, fileNamePrefix="", ensureDurability=False):
+        self.dataDir = dataDir
+        self.ensureDurability = ensureDurability
+        self.db_path = os.path.join(dataDir,
+                                    fileNamePrefix + "_merkleFrontier")
+
+    @staticmethod
+    def _digest(data: bytes) -> bytes:
+        return hashlib.sha256(data).digest()
+
+    def save(self, tree_size: int, hashes: Sequence[bytes]):
+        hash_size = len(hashes[0]) if hashes else 0
+        payload = self.HEADER.pack(tree_size, len(hashes), hash_size) + \
+            b''.join(hashes)
+        tmp_path = self.db_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload + self._digest(payload))
+            if self.ensureDurability:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.db_path)
+
+    def load(self) -> Optional[Tuple[int, Tuple[bytes]]]:
+        """
+        Return the size and hashes of the last saved frontier or None if
+        there is no valid one
+        """
+        try:
+            with open(self.db_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        digest_size = hashlib.sha256().digest_size
+        payload, digest = data[:-digest_size], data[-digest_size:]
+        if len(payload) < self.HEADER.size or \
+                self._digest(payload) != digest:
+            logger.warning("Merkle frontier {} is damaged, ignoring it"
+                           .format(self.db_path))
+            return None
+        tree_size, count, hash_size = \
+            self.HEADER.unpack_from(payload)
+        raw_hashes = payload[self.HEADER.size:]
+        if count != count_bits_set(tree_size) or \
+                len(raw_hashes) != count * hash_size:
+            logger.warning("Merkle frontier {} does not match its tree size "
+                           "{}, ignoring it".format(self.db_path, tree_size))
+            return None
+        hashes = tuple(raw_hashes[i * hash_size:(i + 1) * hash_size]
+                       for i in range(count))
+        return tree_size, hashes
+
+    def reset(self):
+        try:
+            os.remove(self.db_path)
+        except FileNotFoundError:
+            pass
@@ -1,6 +1,7 @@
+import bisect
 import logging
 from binascii import hexlify
-from typing import Sequence, List
+from typing import Sequence, List, Dict
 
 from ledger import error
 from ledger.tree_hasher import TreeHasher
@@ -180,6 +181,28 @@ class MerkleVerifier(object):
                                    len(audit_path))
         return calculated_hash
 
+    def _calculate_root_hash_from_multi_path(self, leaf_hashes: Dict[int, bytes],
+                                             indices: List[int],
+                                             multi_path, start: int,
+                                             end: int):
+        # Same recursion as `CompactMerkleTree._multi_path`, subtrees
+        # without any of the leaves are taken from the proof
+        lo = bisect.bisect_left(indices, start)
+        hi = bisect.bisect_left(indices, end)
+        if lo == hi:
+            try:
+                return next(multi_path)
+            except StopIteration:
+                raise error.ProofError("Merkle proof is too short")
+        if end - start == 1:
+            return leaf_hashes[indices[lo]]
+        k = 1 << (len(bin(end - start - 1)) - 3)
+        left_hash = self._calculate_root_hash_from_multi_path(
+            leaf_hashes, indices, multi_path, start, start + k)
+        right_hash = self._calculate_root_hash_from_multi_path(
+            leaf_hashes, indices, multi_path, start + k, end)
+        return self.hasher.hash_children(left_hash, right_hash)
+
     @classmethod
     def audit_path_length(cls, index: int, tree_size: int):
         length = 0
@@ -264,3 +287,70 @@ class MerkleVerifier(object):
         leaf_hash = self.hasher.hash_leaf(leaf)
         return self.verify_leaf_hash_inclusion(leaf_hash, leaf_index, proof,
                                                sth)
+
+    @error.returns_true_or_raises
+    def verify_leaf_hashes_inclusion(self, leaf_hashes: Sequence[bytes],
+                                     leaf_indices: Sequence[int],
+                                     proof: List[bytes], sth: STH):
+        """Verify a proof of inclusion of several leaves at once, as made by
+        `CompactMerkleTree.multi_inclusion_proof`.
+
+        Args:
+            leaf_hashes: The hashes of the leaves for which the proof was
+            provided.
+            leaf_indices: Indices of the leaves in the tree, in the same
+            order as `leaf_hashes`.
+            proof: A list of SHA-256 hashes of the subtrees which have none
+            of the leaves.
+            sth: STH with the same tree size as the one used to fetch the
+            proof.
+
+        Returns:
+            True. The return value is enforced by a decorator and need not be
+                checked by the caller.
+
+        Raises:
+            ProofError: the proof is invalid.
+        """
+        tree_size = int(sth.tree_size)
+        if len(leaf_hashes) != len(leaf_indices):
+            raise ValueError("Got %d leaf hashes for %d leaf indices" %
+                             (len(leaf_hashes), len(leaf_indices)))
+        if not leaf_hashes:
+            raise ValueError("No leaves to verify inclusion of")
+        hashes_by_index = {}
+        for leaf_index, leaf_hash in zip(leaf_indices, leaf_hashes):
+            leaf_index = int(leaf_index)
+            if not 0 <= leaf_index < tree_size:
+                raise ValueError("Leaf index %d is out of tree of size %d" %
+                                 (leaf_index, tree_size))
+            if hashes_by_index.setdefault(leaf_index, leaf_hash) != leaf_hash:
+                raise ValueError("Different hashes for leaf index %d" %
+                                 leaf_index)
+        indices = sorted(hashes_by_index)
+
+        multi_path = iter(proof)
+        calculated_root_hash = self._calculate_root_hash_from_multi_path(
+            hashes_by_index, indices, multi_path, 0, tree_size)
+        if next(multi_path, None) is not None:
+            raise error.ProofError("Proof too long")
+        if calculated_root_hash == sth.sha256_root_hash:
+            return True
+
+        raise error.ProofError("Constructed root hash differs from provided "
+                               "root hash. Constructed: %s Expected: %s" %
+                               (hexlify(calculated_root_hash).strip(),
+                                hexlify(sth.sha256_root_hash).strip()))
+
+    @error.returns_true_or_raises
+    def verify_leaves_inclusion(self, leaves: Sequence[bytes],
+                                leaf_indices: Sequence[int],
+                                proof: List[bytes], sth: STH):
+        """Verify a proof of inclusion of several leaves at once.
+
+        Same as `verify_leaf_hashes_inclusion` but takes the leaves
+        themselves instead of their hashes.
+        """
+        leaf_hashes = [self.hasher.hash_leaf(leaf) for leaf in leaves]
+        return self.verify_leaf_hashes_inclusion(leaf_hashes, leaf_indices,
+                                                 proof, sth)
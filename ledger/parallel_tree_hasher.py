@@ -0,0 +1,110 @@
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from ledger.tree_hasher import TreeHasher
+
+
+def _hash_leaves(hashfunc, leaves):
+    return TreeHasher(hashfunc).hash_leaves(leaves)
+
+
+def _hash_full_subtree(hashfunc, leaves):
+    return TreeHasher(hashfunc)._hash_full_subtree(leaves)
+
+
+def _hash_full_tree(hashfunc, leaves):
+    return TreeHasher(hashfunc).hash_full_tree(leaves)
+
+
+class ParallelTreeHasher(TreeHasher):
+    """Merkle hasher which spreads hashing of large ranges of leaves over a
+    pool of worker processes.
+
+    Hashes are byte-identical to the ones of TreeHasher. Ranges smaller than
+    `min_parallel_leaves` are hashed in the calling process since sending
+    them to the workers would cost more than hashing them.
+    """
+
+    def __init__(self, hashfunc=hashlib.sha256, workers=None,
+                 min_parallel_leaves=4096, chunk_size=1024):
+        super().__init__(hashfunc)
+        if chunk_size < 1 or chunk_size & (chunk_size - 1):
+            raise ValueError("chunk_size must be a power of 2, got {}"
+                             .format(chunk_size))
+        self.workers = workers or os.cpu_count() or 1
+        self.min_parallel_leaves = min_parallel_leaves
+        self.chunk_size = chunk_size
+        self._executor = None
+
+    def __repr__(self):
+        return "%s(%r, workers=%r)" % (self.__class__.__name__,
+                                       self.hashfunc, self.workers)
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            # Workers are started from a clean server process, forking the
+            # node itself would duplicate its sockets and threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('forkserver'))
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _map(self, func, chunks):
+        return list(self.executor.map(func,
+                                      [self.hashfunc] * len(chunks),
+                                      chunks))
+
+    def hash_leaves(self, leaves):
+        if len(leaves) < self.min_parallel_leaves:
+            return super().hash_leaves(leaves)
+        chunks = [leaves[i:i + self.chunk_size]
+                  for i in range(0, len(leaves), self.chunk_size)]
+        return [leaf_hash
+                for chunk_hashes in self._map(_hash_leaves, chunks)
+                for leaf_hash in chunk_hashes]
+
+    def hash_full_subtrees(self, subtrees):
+        if sum(len(leaves) for leaves in subtrees) < self.min_parallel_leaves:
+            return super().hash_full_subtrees(subtrees)
+        return self._map(_hash_full_subtree, subtrees)
+
+    def _hash_full(self, leaves, l_idx, r_idx):
+        width = r_idx - l_idx
+        if width < self.min_parallel_leaves or \
+                l_idx < 0 or r_idx > len(leaves):
+            return super()._hash_full(leaves, l_idx, r_idx)
+
+        # The range consists of full subtrees, one for every bit set in its
+        # width, in descending order of size. Each of them is hashed as a
+        # number of `chunk_size` pieces in the workers and the roots of the
+        # pieces are combined here.
+        subtrees = []
+        pos = l_idx
+        for bit in reversed(range(width.bit_length())):
+            size = 1 << bit
+            if width & size:
+                subtrees.append((pos, size))
+                pos += size
+        pieces = [leaves[start + i:start + i + min(size, self.chunk_size)]
+                  for start, size in subtrees
+                  for i in range(0, size, self.chunk_size)]
+        piece_roots = iter(self._map(_hash_full_tree, pieces))
+
+        hashes = []
+        for _, size in subtrees:
+            level = [next(piece_roots)
+                     for _ in range(max(size // self.chunk_size, 1))]
+            while len(level) > 1:
+                level = [self.hash_children(level[i], level[i + 1])
+                         for i in range(0, len(level), 2)]
+            hashes.append(level[0])
+        hashes = tuple(hashes)
+        return self._hash_fold(hashes), hashes
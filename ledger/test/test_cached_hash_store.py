@@ -0,0 +1,109 @@
+import pytest
+
+from ledger.compact_merkle_tree import CompactMerkleTree
+from ledger.hash_stores.cached_hash_store import CachedHashStore
+from ledger.hash_stores.file_hash_store import FileHashStore
+from ledger.hash_stores.memory_hash_store import MemoryHashStore
+from ledger.test.test_file_hash_store import generateHashes
+from plenum.common.config_util import getConfig
+from plenum.common.constants import HS_FILE, HS_MEMORY
+from storage.helper import initHashStore
+
+
+@pytest.fixture()
+def cached_tree(tempdir):
+    tree = CompactMerkleTree(hashStore=CachedHashStore(FileHashStore(tempdir),
+                                                       max_nodes=16))
+    for i in range(100):
+        tree.append(str(i).encode())
+    return tree
+
+
+def test_hits_and_misses(cached_tree):
+    hash_store = cached_tree.hashStore
+    hash_store.take_stats()
+
+    pos = hash_store.getNodePosition(12, 2)
+    node = hash_store.readNode(pos)
+    assert node == hash_store.hash_store.readNode(pos)
+    assert hash_store.take_stats() == (0, 1)
+    assert hash_store.readNodeByTree(12, 2) == node
+    assert hash_store.take_stats() == (1, 0)
+    assert hash_store.take_stats() == (0, 0)
+
+
+def test_size_is_bounded(cached_tree):
+    hash_store = cached_tree.hashStore
+    for pos in range(1, cached_tree.nodeCount + 1):
+        hash_store.readNode(pos)
+    assert len(hash_store._nodes) == hash_store.max_nodes
+
+    # Recently used nodes stay in the cache
+    hash_store.take_stats()
+    hash_store.readNode(cached_tree.nodeCount)
+    assert hash_store.take_stats() == (1, 0)
+    hash_store.readNode(1)
+    assert hash_store.take_stats() == (0, 1)
+
+
+def test_proofs_are_served_from_cache(tempdir):
+    hash_store = CachedHashStore(FileHashStore(tempdir, "cached"))
+    cached_tree = CompactMerkleTree(hashStore=hash_store)
+    plain_tree = CompactMerkleTree(hashStore=FileHashStore(tempdir, "plain"))
+    for i in range(100):
+        cached_tree.append(str(i).encode())
+        plain_tree.append(str(i).encode())
+
+    hash_store.take_stats()
+    for size in (60, 100):
+        for seq_no in range(size):
+            assert cached_tree.inclusion_proof(seq_no, size) == \
+                plain_tree.inclusion_proof(seq_no, size)
+    _, misses = hash_store.take_stats()
+    assert 0 < misses <= cached_tree.nodeCount
+
+    # Every node is read from the disk only once
+    CompactMerkleTree.merkle_tree_hash.cache_clear()
+    for seq_no in range(100):
+        cached_tree.inclusion_proof(seq_no, 100)
+    hits, misses = hash_store.take_stats()
+    assert hits > 0
+    assert misses == 0
+
+
+def test_reset_drops_cache(cached_tree):
+    hash_store = cached_tree.hashStore
+    hash_store.readNode(1)
+    assert hash_store.reset()
+    assert hash_store.leafCount == 0
+    assert not hash_store._nodes
+
+    for leaf in generateHashes(2):
+        hash_store.writeLeaf(leaf)
+    hash_store.writeNode((2, 1, generateHashes(1)[0]))
+    assert hash_store.readNode(1) == hash_store.hash_store.readNode(1)
+
+
+def test_wrapped_store_is_accessible(tempdir):
+    file_hash_store = FileHashStore(tempdir)
+    hash_store = CachedHashStore(file_hash_store)
+    assert hash_store.is_persistent
+    assert hash_store.nodesFile is file_hash_store.nodesFile
+    hash_store.close()
+    assert hash_store.closed
+    hash_store.open()
+    assert not hash_store.closed
+
+    with pytest.raises(ValueError):
+        CachedHashStore(file_hash_store, max_nodes=0)
+
+
+def test_init_hash_store_adds_cache(tempdir):
+    config = getConfig()
+    hash_store = initHashStore(tempdir, "domain", config, hs_type=HS_FILE)
+    assert isinstance(hash_store, CachedHashStore)
+    assert isinstance(hash_store.hash_store, FileHashStore)
+    assert hash_store.max_nodes == config.MERKLE_NODE_CACHE_SIZE
+
+    assert isinstance(initHashStore(tempdir, "pool", config, hs_type=HS_MEMORY),
+                      MemoryHashStore)
@@ -1,5 +1,6 @@
 import base64
 import itertools
+import os
 from binascii import hexlify
 from collections import OrderedDict
 
@@ -336,3 +337,50 @@ def test_add_get_txns(ledger_no_genesis):
                                                               2) if i <= j]:
         for s, t in ledger.getAllTxn(frm=frm, to=to):
             assert txns[s - 1] == t
+
+
+def test_get_serialized_txns(ledger, genesis_txns, genesis_txn_file):
+    offset = len(genesis_txns) if genesis_txn_file else 0
+    for i in range(7):
+        ledger.add(random_txn(i))
+
+    for frm, to in [(None, None), (2, 5), (offset + 3, None), (4, 4)]:
+        serialized = list(ledger.getAllTxn(frm=frm, to=to, serialized=True))
+        assert [(s, ledger.txn_serializer.deserialize(t))
+                for s, t in serialized] == \
+            list(ledger.getAllTxn(frm=frm, to=to))
+        for seq_no, txn in serialized:
+            assert txn == ledger._transactionLog.get(str(seq_no))
+
+
+def test_add_batch_same_as_add(create_ledger_callable, tempdir,
+                               txn_serializer, hash_serializer):
+    batch_dir = os.path.join(tempdir, 'batch')
+    os.makedirs(batch_dir)
+    ledger = create_ledger_callable(txn_serializer, hash_serializer, tempdir)
+    batch_ledger = create_ledger_callable(txn_serializer, hash_serializer, batch_dir)
+    txns = [random_txn(i) for i in range(23)]
+
+    merkle_infos = [ledger.add(txn) for txn in txns[:3]]
+    merkle_infos += [ledger.add(txn) for txn in txns[3:]]
+    batch_merkle_infos = batch_ledger.add_batch(txns[:3])
+    batch_merkle_infos += batch_ledger.add_batch(txns[3:])
+    assert batch_ledger.add_batch([]) == []
+
+    assert merkle_infos == batch_merkle_infos
+    assert ledger.size == batch_ledger.size
+    assert ledger.root_hash == batch_ledger.root_hash
+    assert ledger.tree.leafCount == batch_ledger.tree.leafCount
+    assert ledger.tree.nodeCount == batch_ledger.tree.nodeCount
+    assert list(ledger.getAllTxn()) == list(batch_ledger.getAllTxn())
+    for seq_no in range(1, len(txns) + 1):
+        assert ledger.merkleInfo(seq_no) == batch_ledger.merkleInfo(seq_no)
+        assert ledger.auditProof(seq_no) == batch_ledger.auditProof(seq_no)
+
+    # Hash store written by batches is good enough to recover the tree from
+    batch_ledger.stop()
+    restarted_ledger = create_ledger_callable(txn_serializer, hash_serializer, batch_dir)
+    assert restarted_ledger.root_hash == ledger.root_hash
+    assert restarted_ledger.tree.hashes == ledger.tree.hashes
+    ledger.stop()
+    restarted_ledger.stop()
@@ -0,0 +1,145 @@
+import pytest
+
+from common.serializers.json_serializer import JsonSerializer
+from ledger.compact_merkle_tree import CompactMerkleTree
+from ledger.hash_stores.file_hash_store import FileHashStore
+from ledger.ledger import Ledger
+from ledger.merkle_frontier_store import MerkleFrontierStore
+from ledger.test.helper import random_txn
+from ledger.util import ConsistencyVerificationFailed
+from storage.chunked_file_store import ChunkedFileStore
+from storage.kv_store_leveldb_int_keys import KeyValueStorageLeveldbIntKeys
+
+
+@pytest.fixture(scope="function", params=['ChunkedFileStorage', 'LeveldbStorage'])
+def create_ledger(request, tempdir):
+    def _create():
+        if request.param == 'ChunkedFileStorage':
+            store = ChunkedFileStore(tempdir, 'transactions',
+                                     isLineNoKey=True,
+                                     chunkSize=5,
+                                     storeContentHash=False,
+                                     ensureDurability=False)
+        else:
+            store = KeyValueStorageLeveldbIntKeys(tempdir, 'transactions')
+        return Ledger(CompactMerkleTree(hashStore=FileHashStore(dataDir=tempdir)),
+                      dataDir=tempdir,
+                      transactionLogStore=store,
+                      txn_serializer=JsonSerializer(),
+                      hash_serializer=JsonSerializer(),
+                      frontier_store=MerkleFrontierStore(tempdir))
+
+    return _create
+
+
+def full_recovery_root(ledger):
+    tree = CompactMerkleTree()
+    tree.extend([ledger._txnLogEntryToLeaf(entry)
+                 for _, entry in ledger._transactionLog.iterator()])
+    return tree.tree_size, tree.root_hash
+
+
+def test_save_and_load(tempdir):
+    store = MerkleFrontierStore(tempdir, "test")
+    assert store.load() is None
+
+    tree = CompactMerkleTree()
+    for size in (1, 2, 7, 8, 13):
+        while tree.tree_size < size:
+            tree.append(str(tree.tree_size).encode())
+        store.save(tree.tree_size, tree.hashes)
+        assert store.load() == (tree.tree_size, tree.hashes)
+
+    store.save(0, ())
+    assert store.load() == (0, ())
+
+    store.reset()
+    assert store.load() is None
+
+
+def test_damaged_frontier_is_ignored(tempdir):
+    store = MerkleFrontierStore(tempdir, "test")
+    tree = CompactMerkleTree()
+    tree.extend([str(i).encode() for i in range(5)])
+    store.save(tree.tree_size, tree.hashes)
+
+    with open(store.db_path, "r+b") as f:
+        f.seek(20)
+        byte = f.read(1)
+        f.seek(20)
+        f.write(bytes([byte[0] ^ 0xff]))
+    assert store.load() is None
+
+    with open(store.db_path, "wb") as f:
+        f.write(b"abc")
+    assert store.load() is None
+
+
+def test_recover_from_frontier(create_ledger, monkeypatch):
+    ledger = create_ledger()
+    ledger.add_batch([random_txn(i) for i in range(23)])
+    ledger.stop()
+
+    # Neither the hash store is walked nor the whole log is replayed
+    monkeypatch.setattr(Ledger, 'recoverTreeFromHashStore',
+                        lambda self: pytest.fail("recovered from hash store"))
+    monkeypatch.setattr(Ledger, 'recoverTreeFromTxnLog',
+                        lambda self: pytest.fail("recovered from txn log"))
+    restarted = create_ledger()
+    assert restarted.size == ledger.size
+    assert restarted.root_hash == ledger.root_hash
+    assert restarted.tree.hashes == ledger.tree.hashes
+    restarted.stop()
+
+
+def test_recover_from_frontier_with_tail(create_ledger, monkeypatch):
+    ledger = create_ledger()
+    ledger.add_batch([random_txn(i) for i in range(11)])
+    # Added one by one, so the saved frontier is behind the hash store
+    for i in range(11, 16):
+        ledger.add(random_txn(i))
+    # The last transaction did not make it to the hash store
+    ledger._transactionLog.put(str(17), ledger.serialize_for_txn_log(random_txn(16)))
+    ledger.stop()
+
+    monkeypatch.setattr(Ledger, 'recoverTreeFromTxnLog',
+                        lambda self: pytest.fail("recovered from txn log"))
+    restarted = create_ledger()
+    assert restarted.size == 17
+    assert (restarted.size, restarted.tree.root_hash) == \
+        full_recovery_root(restarted)
+    assert restarted.tree.leafCount == 17
+
+    restarted.add(random_txn(17))
+    assert (restarted.size, restarted.tree.root_hash) == \
+        full_recovery_root(restarted)
+    restarted.stop()
+
+
+def test_fall_back_to_txn_log_on_wrong_frontier(create_ledger, tempdir):
+    ledger = create_ledger()
+    ledger.add_batch([random_txn(i) for i in range(9)])
+    ledger.stop()
+
+    other = CompactMerkleTree()
+    other.extend([str(i).encode() for i in range(9)])
+    MerkleFrontierStore(tempdir).save(other.tree_size, other.hashes)
+
+    restarted = create_ledger()
+    assert restarted.root_hash == ledger.root_hash
+    # Frontier is saved again after recovery
+    assert MerkleFrontierStore(tempdir).load() == \
+        (restarted.size, restarted.tree.hashes)
+    restarted.stop()
+
+
+def test_verify_tree(create_ledger):
+    ledger = create_ledger()
+    ledger.add_batch([random_txn(i) for i in range(13)])
+    assert list(ledger.verify_tree(batch_size=4)) == [4, 8, 12, 13]
+
+    # A leaf which is not in the transaction log
+    ledger._addToTree(random_txn(50))
+    with pytest.raises(ConsistencyVerificationFailed):
+        list(ledger.verify_tree(batch_size=4))
+    ledger.stop()
@@ -0,0 +1,109 @@
+import pytest
+
+from ledger.compact_merkle_tree import CompactMerkleTree
+from ledger.hash_stores.file_hash_store import FileHashStore
+from ledger.hash_stores.mmap_file_hash_store import MmapFileHashStore
+from ledger.test.test_file_hash_store import generateHashes
+
+
+@pytest.fixture(scope="module")
+def nodesLeaves():
+    return [(i, 1, h) for i, h in enumerate(generateHashes(10))], \
+        generateHashes(10)
+
+
+def writtenMfhs(tempdir, nodes, leaves):
+    mfhs = MmapFileHashStore(tempdir)
+    assert mfhs.is_persistent
+    for leaf in leaves:
+        mfhs.writeLeaf(leaf)
+    for node in nodes:
+        mfhs.writeNode(node)
+    return mfhs
+
+
+def test_read_after_write(nodesLeaves, tempdir):
+    nodes, leaves = nodesLeaves
+    mfhs = MmapFileHashStore(tempdir)
+
+    # Reads interleaved with writes make the store re-map the files
+    for i, leaf in enumerate(leaves):
+        mfhs.writeLeaf(leaf)
+        assert leaf == mfhs.readLeaf(i + 1)
+    for i, node in enumerate(nodes):
+        mfhs.writeNode(node)
+        assert node[2] == mfhs.readNode(i + 1)
+
+    with pytest.raises(IndexError):
+        mfhs.readLeaf(len(leaves) + 1)
+    with pytest.raises(IndexError):
+        mfhs.readNode(len(nodes) + 1)
+
+
+def test_range_reads(nodesLeaves, tempdir):
+    nodes, leaves = nodesLeaves
+    mfhs = writtenMfhs(tempdir, nodes, leaves)
+
+    assert mfhs.readLeafsBuffer(1, len(leaves)) == b''.join(leaves)
+    assert mfhs.readNodesBuffer(3, 7) == b''.join(n[2] for n in nodes[2:7])
+    assert mfhs.readLeafs(2, 5) == leaves[1:5]
+    assert mfhs.readNodes(1, len(nodes)) == [n[2] for n in nodes]
+
+    with pytest.raises(IndexError):
+        mfhs.readLeafs(5, 2)
+    with pytest.raises(IndexError):
+        mfhs.readLeafs(1, len(leaves) + 1)
+
+
+def test_compatible_with_file_hash_store(nodesLeaves, tempdir):
+    nodes, leaves = nodesLeaves
+    fhs = FileHashStore(tempdir)
+    for leaf in leaves:
+        fhs.writeLeaf(leaf)
+    for node in nodes:
+        fhs.writeNode(node)
+    fhs.close()
+
+    mfhs = MmapFileHashStore(tempdir)
+    assert mfhs.leafCount == len(leaves)
+    assert mfhs.nodeCount == len(nodes)
+    for i, leaf in enumerate(leaves):
+        assert leaf == mfhs.readLeaf(i + 1)
+    for i, node in enumerate(nodes):
+        assert node[2] == mfhs.readNode(i + 1)
+
+
+def test_reset_and_reopen(nodesLeaves, tempdir):
+    nodes, leaves = nodesLeaves
+    mfhs = writtenMfhs(tempdir, nodes, leaves)
+    assert mfhs.readLeaf(1) == leaves[0]
+
+    mfhs.reset()
+    assert mfhs.leafCount == 0
+    assert mfhs.nodeCount == 0
+    with pytest.raises(IndexError):
+        mfhs.readLeaf(1)
+
+    mfhs.writeLeaf(leaves[1])
+    assert mfhs.readLeaf(1) == leaves[1]
+
+    mfhs.close()
+    assert mfhs.closed
+    mfhs.open()
+    assert mfhs.readLeaf(1) == leaves[1]
+
+
+def test_proofs_same_as_file_hash_store(tempdir):
+    fhs_tree = CompactMerkleTree(hashStore=FileHashStore(tempdir, "fhs"))
+    mfhs_tree = CompactMerkleTree(hashStore=MmapFileHashStore(tempdir, "mfhs"))
+    for i in range(1, 40):
+        leaf = str(i).encode()
+        fhs_tree.append(leaf)
+        mfhs_tree.append(leaf)
+        assert fhs_tree.root_hash == mfhs_tree.root_hash
+        for seq_no in range(1, i + 1):
+            assert fhs_tree.inclusion_proof(seq_no - 1, i) == \
+                mfhs_tree.inclusion_proof(seq_no - 1, i)
+        if i > 1:
+            assert fhs_tree.consistency_proof(i // 2, i) == \
+                mfhs_tree.consistency_proof(i // 2, i)
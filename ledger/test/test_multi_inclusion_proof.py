@@ -0,0 +1,114 @@
+import random
+
+import pytest
+
+from common.serializers.msgpack_serializer import MsgPackSerializer
+from ledger import error
+from ledger.compact_merkle_tree import CompactMerkleTree
+from ledger.hash_stores.file_hash_store import FileHashStore
+from ledger.merkle_verifier import MerkleVerifier
+from ledger.test.helper import create_ledger_leveldb_storage, random_txn
+from ledger.util import STH, F
+
+TREE_SIZE = 45
+
+
+@pytest.fixture(scope="module")
+def tree_and_leaves(tdir):
+    tree = CompactMerkleTree(hashStore=FileHashStore(tdir))
+    leaves = [str(i).encode() for i in range(TREE_SIZE)]
+    for leaf in leaves:
+        tree.append(leaf)
+    return tree, leaves
+
+
+def index_sets(size):
+    rnd = random.Random(size)
+    yield [0]
+    yield [size - 1]
+    yield list(range(size))
+    yield range(size // 3, size // 2 + 1)
+    for count in (2, 5, size // 2):
+        yield rnd.sample(range(size), max(min(count, size), 1))
+
+
+def test_multi_inclusion_proof_verifies(tree_and_leaves):
+    tree, leaves = tree_and_leaves
+    verifier = MerkleVerifier()
+    for size in range(1, TREE_SIZE + 1):
+        sth = STH(size, tree.merkle_tree_hash(0, size))
+        for indices in index_sets(size):
+            proof = tree.multi_inclusion_proof(indices, size)
+            assert verifier.verify_leaves_inclusion(
+                [leaves[i] for i in indices], indices, proof, sth)
+
+            # Nothing is repeated and nothing more than the separate audit
+            # paths have is sent
+            separate = {h for i in indices
+                        for h in tree.inclusion_proof(i, size)}
+            assert len(proof) == len(set(proof))
+            assert set(proof) <= separate
+
+
+def test_single_leaf_proof_is_audit_path(tree_and_leaves):
+    tree, _ = tree_and_leaves
+    for size in range(1, TREE_SIZE + 1):
+        for i in range(size):
+            assert sorted(tree.multi_inclusion_proof([i], size)) == \
+                sorted(tree.inclusion_proof(i, size))
+
+
+def test_range_proof_is_small(tree_and_leaves):
+    tree, _ = tree_and_leaves
+    # Only the subtrees on the two sides of the range are needed
+    assert len(tree.multi_inclusion_proof(range(16, 32), TREE_SIZE)) == 2
+    assert tree.multi_inclusion_proof(range(TREE_SIZE), TREE_SIZE) == []
+
+
+def test_bad_multi_inclusion_proofs(tree_and_leaves):
+    tree, leaves = tree_and_leaves
+    verifier = MerkleVerifier()
+    sth = STH(TREE_SIZE, tree.root_hash)
+    indices = [3, 4, 20, 44]
+    proof = tree.multi_inclusion_proof(indices, TREE_SIZE)
+    items = [leaves[i] for i in indices]
+
+    with pytest.raises(error.ProofError):
+        verifier.verify_leaves_inclusion(items, indices, proof[:-1], sth)
+    with pytest.raises(error.ProofError):
+        verifier.verify_leaves_inclusion(items, indices, proof + proof[:1], sth)
+    with pytest.raises(error.ProofError):
+        verifier.verify_leaves_inclusion(items, indices, proof[::-1], sth)
+    with pytest.raises(error.ProofError):
+        verifier.verify_leaves_inclusion(items[::-1], indices, proof, sth)
+    with pytest.raises(ValueError):
+        verifier.verify_leaves_inclusion(items, indices[:-1], proof, sth)
+    with pytest.raises(ValueError):
+        verifier.verify_leaves_inclusion(items, [3, 4, 20, TREE_SIZE],
+                                         proof, sth)
+    with pytest.raises(IndexError):
+        tree.multi_inclusion_proof([TREE_SIZE], TREE_SIZE)
+
+
+def test_ledger_multi_audit_proof(tempdir):
+    ledger = create_ledger_leveldb_storage(MsgPackSerializer(),
+                                           MsgPackSerializer(), tempdir)
+    txns = [random_txn(i) for i in range(20)]
+    for txn in txns:
+        ledger.add(txn)
+
+    seq_nos = [2, 3, 4, 5, 11, 17]
+    proof = ledger.multiAuditProof(seq_nos)
+    assert proof[F.ledgerSize.name] == ledger.size
+    assert proof[F.rootHash.name] == ledger.root_hash
+
+    sth = STH(ledger.size, ledger.strToHash(proof[F.rootHash.name]))
+    audit_path = [ledger.strToHash(h) for h in proof[F.auditPath.name]]
+    leaves = [ledger.serialize_for_tree(ledger.getBySeqNo(s)) for s in seq_nos]
+    assert MerkleVerifier().verify_leaves_inclusion(
+        leaves, [s - 1 for s in seq_nos], audit_path, sth)
+
+    separate = sum(len(ledger.auditProof(s)[F.auditPath.name])
+                   for s in seq_nos)
+    assert len(audit_path) < separate
+    ledger.stop()
@@ -0,0 +1,98 @@
+import pytest
+
+from ledger.compact_merkle_tree import CompactMerkleTree
+from ledger.hash_stores.file_hash_store import FileHashStore
+from ledger.hash_stores.memory_hash_store import MemoryHashStore
+from ledger.parallel_tree_hasher import ParallelTreeHasher
+from ledger.tree_hasher import TreeHasher
+
+
+class SmallSubtreesMerkleTree(CompactMerkleTree):
+    SUBTREE_SIZE = 8
+
+
+@pytest.fixture(scope="module")
+def parallel_hasher():
+    hasher = ParallelTreeHasher(workers=2, min_parallel_leaves=16,
+                                chunk_size=4)
+    yield hasher
+    hasher.shutdown()
+
+
+def leaves(count, offset=0):
+    return [str(i).encode() * (i % 7 + 1)
+            for i in range(offset, offset + count)]
+
+
+def test_hashes_same_as_tree_hasher(parallel_hasher):
+    hasher = TreeHasher()
+    for count in (1, 5, 16, 33, 64, 100):
+        assert parallel_hasher.hash_leaves(leaves(count)) == \
+            hasher.hash_leaves(leaves(count))
+        assert parallel_hasher._hash_full(leaves(count), 0, count) == \
+            hasher._hash_full(leaves(count), 0, count)
+        assert parallel_hasher._hash_full(leaves(count), 1, count) == \
+            hasher._hash_full(leaves(count), 1, count)
+
+    subtrees = [leaves(8, i * 8) for i in range(4)]
+    assert parallel_hasher.hash_full_subtrees(subtrees) == \
+        hasher.hash_full_subtrees(subtrees)
+    assert parallel_hasher.hash_full_tree(leaves(64)) == \
+        hasher.hash_full_tree(leaves(64))
+
+
+def test_full_subtree_nodes_same_as_appends():
+    hasher = TreeHasher()
+    tree = CompactMerkleTree(hasher=hasher)
+    for leaf in leaves(16):
+        tree.append(leaf)
+
+    leaf_hashes, nodes, root_hash = hasher._hash_full_subtree(leaves(16))
+    assert leaf_hashes == tree.hashStore.readLeafs(1, 16)
+    assert nodes == tree.hashStore.readNodes(1, tree.nodeCount)
+    assert root_hash == tree.root_hash
+
+    with pytest.raises(ValueError):
+        hasher._hash_full_subtree(leaves(6))
+
+
+@pytest.mark.parametrize("hasher_type", ["sequential", "parallel"])
+def test_extend_same_as_appends(hasher_type, parallel_hasher, tempdir):
+    hasher = parallel_hasher if hasher_type == "parallel" else TreeHasher()
+    tree = CompactMerkleTree(hashStore=FileHashStore(tempdir, "append"))
+    extended_tree = SmallSubtreesMerkleTree(
+        hasher=hasher, hashStore=FileHashStore(tempdir, "extend"))
+
+    offset = 0
+    for count in (3, 30, 1, 64, 7):
+        new_leaves = leaves(count, offset)
+        offset += count
+        for leaf in new_leaves:
+            tree.append(leaf)
+        extended_tree.extend(new_leaves)
+
+        assert tree.tree_size == extended_tree.tree_size
+        assert tree.hashes == extended_tree.hashes
+        assert tree.root_hash == extended_tree.root_hash
+        assert tree.leafCount == extended_tree.leafCount
+        assert tree.nodeCount == extended_tree.nodeCount
+        for pos in range(1, tree.leafCount + 1):
+            assert tree.hashStore.readLeaf(pos) == \
+                extended_tree.hashStore.readLeaf(pos)
+        for pos in range(1, tree.nodeCount + 1):
+            assert tree.hashStore.readNode(pos) == \
+                extended_tree.hashStore.readNode(pos)
+
+
+def test_extend_writes_nodes_by_position(parallel_hasher):
+    tree = CompactMerkleTree(hashStore=MemoryHashStore())
+    extended_tree = SmallSubtreesMerkleTree(hasher=parallel_hasher,
+                                            hashStore=MemoryHashStore())
+    for leaf in leaves(70):
+        tree.append(leaf)
+    extended_tree.extend(leaves(70))
+
+    # Db based hash stores put nodes by the position calculated from
+    # start and height, so these have to match too
+    assert tree.hashStore.readNodes(1, tree.nodeCount) == \
+        extended_tree.hashStore.readNodes(1, extended_tree.nodeCount)
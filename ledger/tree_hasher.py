@@ -27,6 +27,40 @@ class TreeHasher(object):
         hasher.update(b"\x01" + left + right)
         return hasher.digest()
 
+    def hash_leaves(self, leaves):
+        """Hash a list of leaves, returns a list of their hashes."""
+        return [self.hash_leaf(leaf) for leaf in leaves]
+
+    def hash_full_subtrees(self, subtrees):
+        """Hash lists of leaves each forming a full (i.e. size 2^k) subtree.
+
+        Returns:
+            list of (leaf_hashes, nodes, root_hash) for every subtree, where
+            nodes are (start, height, node_hash) of the subtree's nodes in the
+            order appending its leaves one by one would create them, and
+            start is 1-based and relative to the subtree.
+        """
+        return [self._hash_full_subtree(leaves) for leaves in subtrees]
+
+    def _hash_full_subtree(self, leaves):
+        leaf_hashes = self.hash_leaves(leaves)
+        nodes = []
+        # (hash, height) of full subtrees built so far, same as
+        # CompactMerkleTree.hashes
+        stack = []
+        for i, node_hash in enumerate(leaf_hashes):
+            height = 1
+            while stack and stack[-1][1] == height:
+                left_hash, _ = stack.pop()
+                node_hash = self.hash_children(left_hash, node_hash)
+                nodes.append((i + 1, height, node_hash))
+                height += 1
+            stack.append((node_hash, height))
+        if len(stack) != 1:
+            raise ValueError("invalid subtree with size != 2^k: %s" %
+                             len(leaves))
+        return leaf_hashes, nodes, stack[0][0]
+
     def _hash_full(self, leaves, l_idx, r_idx):
         """Hash the leaves between (l_idx, r_idx) as a valid entire tree.
 
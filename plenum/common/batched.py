@@ -161,6 +161,11 @@ class Batched(MessageProcessor):
     def doProcessReceived(self, msg, frm, ident):
         if OP_FIELD_NAME in msg and msg[OP_FIELD_NAME] == BATCH:
             if f.MSGS.nm in msg and isinstance(msg[f.MSGS.nm], list):
+                # Health messages are not batched when sent, so batches
+                # are rarely rebuilt
+                if self.pingMessage not in msg[f.MSGS.nm] and \
+                        self.pongMessage not in msg[f.MSGS.nm]:
+                    return msg
                 # Removing ping and pong messages from Batch
                 relevantMsgs = []
                 for m in msg[f.MSGS.nm]:
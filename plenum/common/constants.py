@@ -49,6 +49,8 @@ LEDGER_STATUS = "LEDGER_STATUS"
 CONSISTENCY_PROOF = "CONSISTENCY_PROOF"
 CATCHUP_REQ = "CATCHUP_REQ"
 CATCHUP_REP = "CATCHUP_REP"
+STATE_SNAPSHOT_REQ = "STATE_SNAPSHOT_REQ"
+STATE_SNAPSHOT_REP = "STATE_SNAPSHOT_REP"
 MESSAGE_REQUEST = 'MESSAGE_REQUEST'
 MESSAGE_RESPONSE = 'MESSAGE_RESPONSE'
 OBSERVED_DATA = 'OBSERVED_DATA'
@@ -227,6 +229,8 @@ class KeyValueStorageType(IntEnum):
     Rocksdb = 3
     ChunkedBinaryFile = 4
     BinaryFile = 5
+    # Column family of a RocksDB database shared by the node's storages
+    RocksdbColumnFamily = 6
 
 
 class PreVCStrategies(IntEnum):
@@ -253,6 +257,7 @@ NODE_TXN_STORE_SUFFIX = "TS"
 NODE_HASH_STORE_SUFFIX = "HS"
 
 HS_FILE = "file"
+HS_MMAP_FILE = "mmap_file"
 HS_MEMORY = "memory"
 HS_LEVELDB = 'leveldb'
 HS_ROCKSDB = 'rocksdb'
@@ -64,6 +64,18 @@ class Ledger(_Ledger):
         merkle_info.pop(F.seqNo.name, None)
         return merkle_info
 
+    def add_batch(self, txns, with_merkle_info=True):
+        seq_no = self.seqNo
+        for txn in txns:
+            seq_no += 1
+            if get_seq_no(txn) is None:
+                append_txn_metadata(txn, seq_no=seq_no)
+        merkle_infos = super().add_batch(txns, with_merkle_info=with_merkle_info)
+        # seqNo is part of the transaction itself, so no need to duplicate it here
+        for merkle_info in merkle_infos:
+            merkle_info.pop(F.seqNo.name, None)
+        return merkle_infos
+
     def _append_seq_no(self, txns, start_seq_no):
         # TODO: Fix name `start_seq_no`, it is misleading. The seq no start from `start_seq_no`+1
         seq_no = start_seq_no
@@ -80,10 +92,10 @@ class Ledger(_Ledger):
         numbers of the committed txns
         """
         committedSize = self.size
-        committedTxns = []
-        for txn in self.uncommittedTxns[:count]:
-            txn.update(self.append(txn))
-            committedTxns.append(txn)
+        committedTxns = self.uncommittedTxns[:count]
+        for txn, merkle_info in zip(committedTxns,
+                                    self.add_batch(committedTxns)):
+            txn.update(merkle_info)
         self.uncommittedTxns = self.uncommittedTxns[count:]
         logger.debug('Committed {} txns, {} are uncommitted'.
                      format(len(committedTxns), len(self.uncommittedTxns)))
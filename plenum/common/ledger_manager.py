@@ -7,7 +7,8 @@ from plenum.common.channel import create_direct_channel, Router
 from plenum.common.config_util import getConfig
 from plenum.common.ledger import Ledger
 from plenum.common.ledger_info import LedgerInfo
-from plenum.common.messages.node_messages import LedgerStatus, CatchupRep, ConsistencyProof, CatchupReq
+from plenum.common.messages.node_messages import LedgerStatus, CatchupRep, ConsistencyProof, CatchupReq, \
+    StateSnapshotReq, StateSnapshotRep
 from plenum.common.metrics_collector import MetricsCollector, NullMetricsCollector, measure_time, MetricsName
 from plenum.server.catchup.node_catchup_data import CatchupNodeDataProvider
 from plenum.server.catchup.node_leecher_service import NodeLeecherService
@@ -42,10 +43,10 @@ class LedgerManager:
         provider = CatchupNodeDataProvider(owner)
 
         self._client_seeder_inbox, rx = create_direct_channel()
-        self._client_seeder = ClientSeederService(rx, provider)
+        self._client_seeder = ClientSeederService(rx, provider, config)
 
         self._node_seeder_inbox, rx = create_direct_channel()
-        self._node_seeder = NodeSeederService(rx, provider)
+        self._node_seeder = NodeSeederService(rx, provider, config)
 
         leecher_outbox_tx, leecher_outbox_rx = create_direct_channel()
         router = Router(leecher_outbox_rx)
@@ -131,6 +132,15 @@ class LedgerManager:
     def processCatchupRep(self, rep: CatchupRep, frm: str):
         self._node_leecher_inbox.put_nowait((rep, frm))
 
+    def processStateSnapshotReq(self, req: StateSnapshotReq, frm: str):
+        self._node_seeder_inbox.put_nowait((req, frm))
+
+    def processStateSnapshotRep(self, rep: StateSnapshotRep, frm: str):
+        self._node_leecher_inbox.put_nowait((rep, frm))
+
+    def state_synced_from_snapshot(self, ledger_id: int) -> bool:
+        return self._node_leecher.state_synced_from_snapshot(ledger_id)
+
     def _on_ledger_sync_start(self, msg: LedgerCatchupStart):
         pass
 
@@ -6,13 +6,14 @@ from plenum.common.constants import BATCH, BLACKLIST, REQACK, REQNACK, REJECT, \
     VIEW_CHANGE_DONE, CURRENT_STATE, MESSAGE_REQUEST, MESSAGE_RESPONSE, OBSERVED_DATA, \
     BATCH_COMMITTED, OPERATION_SCHEMA_IS_STRICT, BACKUP_INSTANCE_FAULTY, VIEW_CHANGE_START, \
     PROPOSED_VIEW_NO, VIEW_CHANGE_CONTINUE, VIEW_CHANGE, VIEW_CHANGE_ACK, NEW_VIEW, \
-    OLD_VIEW_PREPREPARE_REQ, OLD_VIEW_PREPREPARE_REP
+    OLD_VIEW_PREPREPARE_REQ, OLD_VIEW_PREPREPARE_REP, STATE_SNAPSHOT_REQ, STATE_SNAPSHOT_REP
 from plenum.common.messages.client_request import ClientMessageValidator
 from plenum.common.messages.fields import NonNegativeNumberField, IterableField, \
     SerializedValueField, SignatureField, AnyValueField, TimestampField, \
     LedgerIdField, MerkleRootField, Base58Field, LedgerInfoField, AnyField, ChooseField, AnyMapField, \
     LimitedLengthStringField, BlsMultiSignatureField, ProtocolVersionField, BooleanField, \
-    IntegerField, BatchIDField, ViewChangeField, MapField, StringifiedNonNegativeNumberField
+    IntegerField, BatchIDField, ViewChangeField, MapField, StringifiedNonNegativeNumberField, \
+    NonEmptyStringField
 from plenum.common.messages.message_base import MessageBase
 from plenum.common.types import f
 from plenum.config import NAME_FIELD_LIMIT, DIGEST_FIELD_LIMIT, SENDER_CLIENT_FIELD_LIMIT, HASH_FIELD_LIMIT, \
@@ -417,6 +418,30 @@ class CatchupRep(MessageBase):
     )
 
 
+class StateSnapshotReq(MessageBase):
+    """
+    Purpose: ask for trie nodes of the state with the given root, every
+    requested node is sent along with the nodes of its subtree
+    """
+    typename = STATE_SNAPSHOT_REQ
+    schema = (
+        (f.LEDGER_ID.nm, LedgerIdField()),
+        (f.STATE_ROOT.nm, MerkleRootField()),
+        (f.HASHES.nm, IterableField(Base58Field(byte_lengths=(32,)),
+                                    min_length=1, max_length=1000)),
+    )
+
+
+class StateSnapshotRep(MessageBase):
+    typename = STATE_SNAPSHOT_REP
+    schema = (
+        (f.LEDGER_ID.nm, LedgerIdField()),
+        (f.STATE_ROOT.nm, MerkleRootField()),
+        # base64 encoded trie nodes
+        (f.TRIE_NODES.nm, IterableField(NonEmptyStringField())),
+    )
+
+
 class ViewChangeDone(MessageBase):
     """
     Node sends this kind of message when view change steps done and it is
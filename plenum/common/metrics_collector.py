@@ -96,6 +96,17 @@ class MetricsName(IntEnum):
     PROPAGATES_PHASE_REQ_TIMEOUTS = 75
     ORDERING_PHASE_REQ_TIMEOUTS = 76
     AUTH_RULES_FROM_STATE_COUNT = 77
+    # Number of merkle tree node reads served from and missed by the caches
+    # of ledger hash stores
+    MERKLE_NODE_CACHE_HITS = 78
+    MERKLE_NODE_CACHE_MISSES = 79
+    # Number of state trie node reads served from and missed by the caches
+    # of decoded trie nodes
+    STATE_TRIE_NODE_CACHE_HITS = 80
+    STATE_TRIE_NODE_CACHE_MISSES = 81
+    # Number of state trie nodes deleted by pruning and the space they took
+    STATE_PRUNED_NODES = 82
+    STATE_PRUNED_BYTES = 83
 
     # Node service statistics
     NODE_PROD_TIME = 100
@@ -128,6 +139,7 @@ class MetricsName(IntEnum):
     PROCESS_ORDERED_TIME = 213
     MONITOR_REQUEST_ORDERED_TIME = 214
     EXECUTE_BATCH_TIME = 215
+    VERIFY_SIGNATURES_BATCH_TIME = 216
 
     # Replica specific metrics
     SERVICE_REPLICA_QUEUES_TIME = 300
@@ -80,6 +80,7 @@ class f:  # provides a namespace for reusable field constants
     TXN = Field("txn", Any)
     NODES = Field('nodes', Dict[str, HA])
     CONS_PROOF = Field("consProof", Any)
+    TRIE_NODES = Field("trieNodes", List[str])
     MSG_TYPE = Field("msg_type", str)
     PARAMS = Field("params", dict)
     PRIMARY = Field("primary", dict)
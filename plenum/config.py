@@ -55,6 +55,59 @@ hashStore = {
     "type": HS_ROCKSDB
 }
 
+# Number of merkle tree node hashes kept in memory for every ledger, the
+# upper nodes of the tree are on the audit path of almost every proof.
+# 0 disables the cache
+MERKLE_NODE_CACHE_SIZE = 4096
+
+# Memory (in bytes) for decoded state trie nodes of every ledger's state,
+# upper levels of the trie and hot keys are read by almost every request.
+# 0 disables the cache
+STATE_TRIE_NODE_CACHE_SIZE = 16 * 1024 * 1024
+
+# Number of serialized state proofs against the committed root kept for
+# every ledger's state, replies for popular keys (TAA, AML, pool nodes)
+# reuse them until the next commit. 0 disables the cache
+STATE_PROOF_CACHE_SIZE = 1000
+
+# Number of decoded state roots of every ledger's state kept for reads of
+# the state as of some time in the past. 0 disables the cache
+STATE_ROOT_CACHE_SIZE = 100
+
+# Keep timestamps and state roots of the timestamp store in memory, so that
+# finding the state root as of some time is a binary search
+STATE_TS_STORE_INDEX = True
+
+# Pruning of state trie nodes which are not reachable from the roots still
+# in use. Every STATE_PRUNING_PERIOD seconds the state of each ledger is
+# pruned, STATE_PRUNING_NODES_PER_STEP nodes every
+# STATE_PRUNING_STEP_INTERVAL seconds. Roots of the last
+# STATE_PRUNING_KEEP_ROOTS batches are kept, as well as the roots of the
+# timestamp store for the last STATE_PRUNING_KEEP_TS_ROOTS_FOR seconds
+# (None keeps all of them, so that state can be read at any time)
+STATE_PRUNING_ENABLED = False
+STATE_PRUNING_PERIOD = 24 * 60 * 60
+STATE_PRUNING_STEP_INTERVAL = 0.1
+STATE_PRUNING_NODES_PER_STEP = 1000
+STATE_PRUNING_KEEP_ROOTS = 100
+STATE_PRUNING_KEEP_TS_ROOTS_FOR = None
+
+# Number of threads verifying signatures of the requests and node messages
+# received during a looper tick, all at once before they are processed.
+# 0 means signatures are verified in the node's thread as messages come
+SIG_VERIFICATION_WORKERS = 0
+
+# Number of verification keys of clients read from the state, and of
+# verifiers made of them, kept for authentication of their next requests.
+# 0 disables the cache
+VERKEY_CACHE_SIZE = 10000
+
+# Requests with verified signatures are remembered until they are executed,
+# so that PROPAGATEs of them are not verified again. At most this number of
+# them is kept, each for at most this number of seconds
+VERIFIED_REQS_CACHE_SIZE = 100000
+VERIFIED_REQS_TTL = 600
+
 primaryStorage = None
 
 domainStateStorage = KeyValueStorageType.Rocksdb
@@ -107,6 +160,24 @@ rocksdb_state_signature_config = rocksdb_default_config.copy()
 rocksdb_state_ts_db_config = rocksdb_default_config.copy()
 # Change state_ts_db config here if you fully understand what's going on
 
+# Storages of KeyValueStorageType.RocksdbColumnFamily type are hosted as
+# column families of one RocksDB database (named sharedRocksdbName) in the
+# same directory, which share the WAL and the block cache, so that writes to
+# several of them can be a single atomic batch. Setting storage types of
+# ledgers (transactionLogDefaultStorage), states, reqIdToTxnStorage,
+# stateTsStorage, stateSignatureStorage and nodeStatusStorage to it puts
+# all of them in one database. Options of the shared database are taken
+# from db_shared_config instead of the configs of the storages.
+sharedRocksdbName = 'node_db'
+rocksdb_shared_config = rocksdb_default_config.copy()
+
+# Writes of a committed batch to states, seqNoDB and timestamp store are
+# collected and written together when the batch is committed: in one batch
+# per storage, or in a single atomic batch for storages hosted in the shared
+# RocksDB database (DB_GROUP_COMMIT_SYNC makes it synced to disk)
+DB_GROUP_COMMIT = False
+DB_GROUP_COMMIT_SYNC = False
+
 # FIXME: much more clear solution is to check which key-value storage type is
 # used for each storage and set corresponding config, but for now only RocksDB
 # tuning is supported (now other storage implementations ignore this parameter)
@@ -119,6 +190,7 @@ db_seq_no_db_config = rocksdb_seq_no_db_config
 db_node_status_db_config = rocksdb_node_status_db_config
 db_state_signature_config = rocksdb_state_signature_config
 db_state_ts_db_config = rocksdb_state_ts_db_config
+db_shared_config = rocksdb_shared_config
 
 DefaultPluginPath = {
     # PLUGIN_BASE_DIR_PATH: "<abs path of plugin directory can be given here,
@@ -244,6 +316,23 @@ ExpectedConnectTime = 3.3 if sys.platform == 'win32' else 2
 # repository
 EnsureLedgerDurability = False
 
+# Number of worker processes used for hashing big ranges of transactions
+# (recovery of a merkle tree from transaction log, catchup). 0 means hashing
+# in the node process only
+MERKLE_HASHING_WORKERS = 0
+
+# Save the frontier of each ledger's merkle tree on every commit, so that on
+# start the tree is restored without reading whole hash stores and
+# transaction logs
+SAVE_MERKLE_FRONTIER = True
+
+# Re-hash transaction logs after start to check the restored merkle trees.
+# This is done in the background, `LEDGER_TREE_VERIFICATION_BATCH_SIZE`
+# transactions every `LEDGER_TREE_VERIFICATION_INTERVAL` seconds
+VERIFY_LEDGER_TREES_ON_START = False
+LEDGER_TREE_VERIFICATION_BATCH_SIZE = 1000
+LEDGER_TREE_VERIFICATION_INTERVAL = 0.1
+
 log_override_tags = dict(cli={}, demo={})
 
 # Number of messages zstack accepts at once
@@ -296,6 +385,44 @@ NEW_VIEW_TIMEOUT = 30  # in secs
 
 CATCHUP_BATCH_SIZE = 5  # Minimum number of txns in single catchup request
 
+# Number of catchup requests which can be in flight to each node. With 0 the
+# missing range is split among nodes once and asked again after a timeout.
+# Otherwise requests are sent in a sliding window, the earliest ranges to the
+# fastest nodes, and the size of requests to each node follows how fast it
+# replies
+CATCHUP_WINDOW_SIZE = 0
+CATCHUP_INITIAL_BATCH_SIZE = 50
+CATCHUP_MAX_BATCH_SIZE = 1000
+# Requests to a node grow while it replies faster than half of this time and
+# shrink when it replies slower
+CATCHUP_TARGET_REPLY_TIME = 1  # seconds
+# How often requests in the window are checked for timeouts
+# (CatchupTransactionsTimeout)
+CATCHUP_WINDOW_CHECK_INTERVAL = 1  # seconds
+
+# Seeders assemble CATCHUP_REP messages from serialized transactions,
+# already split into parts fitting into a network message
+BUILD_CATCHUP_REP_SERIALIZED = True
+# Memory (in bytes) for transactions already serialized for CATCHUP_REP, so
+# that many nodes catching up the same ranges do not make a seeder decode and
+# encode them again
+CATCHUP_REP_TXN_CACHE_SIZE = 32 * 1024 * 1024
+# Number of consistency proofs up to the requested `catchupTill` kept by a
+# seeder
+CATCHUP_CONS_PROOF_CACHE_SIZE = 1024
+
+# Ledgers whose state is caught up by fetching the trie of the state root
+# from the last audit txn instead of applying every caught up txn to the
+# state. Every node of the pool has to serve STATE_SNAPSHOT_REQ for this.
+STATE_SNAPSHOT_CATCHUP_LEDGERS = []
+# Number of subtrees asked for in one STATE_SNAPSHOT_REQ
+STATE_SNAPSHOT_HASHES_PER_REQ = 16
+# Maximum number of trie nodes in one STATE_SNAPSHOT_REP, it is also limited
+# by MSG_LEN_LIMIT
+STATE_SNAPSHOT_MAX_NODES_PER_REP = 1000
+# How long to wait for STATE_SNAPSHOT_REP before asking another node
+STATE_SNAPSHOT_REQ_TIMEOUT = 5  # seconds
+
 # permissions for keyring dirs/files
 WALLET_DIR_MODE = 0o700  # drwx------
 WALLET_FILE_MODE = 0o600  # -rw-------
@@ -44,6 +44,16 @@ class DbHashStore(HashStore):
         seqNo = self.getNodePosition(start, height)
         self.nodesDb.put(str(seqNo), nodeHash)
 
+    def writeLeafs(self, leafHashes):
+        start = self.leafCount + 1
+        self.leavesDb.setBatch([(str(start + i), leafHash)
+                                for i, leafHash in enumerate(leafHashes)])
+        self.leafCount += len(leafHashes)
+
+    def writeNodes(self, nodes):
+        self.nodesDb.setBatch([(str(self.getNodePosition(start, height)), nodeHash)
+                               for start, height, nodeHash in nodes])
+
     def readLeaf(self, seqNo):
         return self._readOne(seqNo, self.leavesDb)
 
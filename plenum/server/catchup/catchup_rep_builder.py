@@ -0,0 +1,111 @@
+from collections import OrderedDict
+from typing import Callable, List, Iterable, Tuple
+
+from plenum.common.constants import OP_FIELD_NAME, CATCHUP_REP
+from plenum.common.ledger import Ledger
+from plenum.common.types import f
+from plenum.server.catchup.utils import CatchupDataProvider
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+# Length of a base58 encoded 32 byte hash is at most 44 characters, in a
+# JSON list it is also quoted and separated by a comma
+MAX_PROOF_HASH_LEN = 44 + 3
+
+
+class CatchupRepBuilder:
+    """
+    Builds CATCHUP_REP messages already serialized and split into parts
+    which fit into a network message.
+
+    The size of every part is known while it is assembled, so unlike
+    splitting a too large CatchupRep in halves and serializing each of them
+    again, every transaction is serialized exactly once. Serialized
+    transactions are kept in a cache limited by its total size, so a range
+    requested by several nodes is read from the ledger as raw bytes and never
+    decoded again.
+    """
+
+    def __init__(self,
+                 provider: CatchupDataProvider,
+                 msg_len_limit: int,
+                 make_cons_proof: Callable[[int, Ledger, int, int], List[str]],
+                 txn_cache_size: int = 0):
+        self._provider = provider
+        self._msg_len_limit = msg_len_limit
+        self._make_cons_proof = make_cons_proof
+        self._txn_cache_size = txn_cache_size
+        self._txns = OrderedDict()
+        self._txns_size = 0
+
+    def build(self, ledger_id: int, ledger: Ledger,
+              start: int, end: int, catchup_till: int) -> List[bytes]:
+        header = '{{"{}":"{}","{}":{},"{}":{{'.format(
+            OP_FIELD_NAME, CATCHUP_REP,
+            f.LEDGER_ID.nm, ledger_id,
+            f.TXNS.nm).encode()
+        # Consistency proof has at most two hashes per level of the tree
+        proof_room = len(self._tail([])) + \
+            2 * catchup_till.bit_length() * MAX_PROOF_HASH_LEN
+        room = self._msg_len_limit - len(header) - proof_room
+
+        reps = []
+        parts = []
+        parts_size = 0
+        last_seq_no = None
+        for seq_no, part in self._serialized_txns(ledger_id, ledger, start, end):
+            if parts and parts_size + len(part) > room:
+                reps.append(self._make_rep(header, parts, ledger_id, ledger,
+                                           last_seq_no, catchup_till))
+                parts = []
+                parts_size = 0
+            parts.append(part)
+            # Adding one for the separating comma
+            parts_size += len(part) + 1
+            last_seq_no = seq_no
+        if parts:
+            reps.append(self._make_rep(header, parts, ledger_id, ledger,
+                                       last_seq_no, catchup_till))
+        return reps
+
+    def clear(self):
+        self._txns.clear()
+        self._txns_size = 0
+
+    def _make_rep(self, header: bytes, parts: List[bytes], ledger_id: int,
+                  ledger: Ledger, last_seq_no: int, catchup_till: int) -> bytes:
+        cons_proof = self._make_cons_proof(ledger_id, ledger,
+                                           last_seq_no, catchup_till)
+        return b''.join((header, b','.join(parts), self._tail(cons_proof)))
+
+    @staticmethod
+    def _tail(cons_proof: List[str]) -> bytes:
+        return '}},"{}":[{}]}}'.format(
+            f.CONS_PROOF.nm,
+            ','.join('"{}"'.format(h) for h in cons_proof)).encode()
+
+    def _serialized_txns(self, ledger_id: int, ledger: Ledger,
+                         start: int, end: int) -> Iterable[Tuple[int, bytes]]:
+        for seq_no, raw_txn in ledger.getAllTxn(start, end, serialized=True):
+            key = (ledger_id, seq_no)
+            part = self._txns.get(key)
+            if part is not None:
+                self._txns.move_to_end(key)
+            else:
+                txn = ledger.txn_serializer.deserialize(raw_txn)
+                txn = self._provider.update_txn_with_extra_data(txn)
+                part = '"{}":{}'.format(seq_no, json.dumps(txn)).encode()
+                self._cache(key, part)
+            yield seq_no, part
+
+    def _cache(self, key, part: bytes):
+        if len(part) > self._txn_cache_size:
+            return
+        self._txns[key] = part
+        self._txns_size += len(part)
+        while self._txns_size > self._txn_cache_size:
+            _, evicted = self._txns.popitem(last=False)
+            self._txns_size -= len(evicted)
@@ -1,3 +1,4 @@
+from bisect import insort
 from collections import defaultdict
 from heapq import merge
 from random import shuffle
@@ -8,13 +9,37 @@ from plenum.common.constants import CATCH_UP_PREFIX
 from plenum.common.ledger import Ledger
 from plenum.common.messages.node_messages import CatchupRep, CatchupReq
 from plenum.common.metrics_collector import MetricsCollector, MetricsName
-from plenum.common.timer import TimerService
+from plenum.common.timer import TimerService, RepeatingTimer
 from plenum.server.catchup.utils import CatchupDataProvider, LedgerCatchupComplete, CatchupTill, LedgerCatchupStart
 from stp_core.common.log import getlogger
 
 logger = getlogger()
 
 
+class InFlightCatchupReq:
+    def __init__(self, start: int, end: int, sent_at: float):
+        self.start = start
+        self.end = end
+        self.sent_at = sent_at
+        self.received = 0
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start + 1
+
+
+class SeederWindow:
+    """
+    Catchup requests sent to a node and not replied yet, with the size of
+    the next request to this node and the rate it has been replying at
+    """
+
+    def __init__(self, req_size: int):
+        self.req_size = req_size
+        self.in_flight = []  # type: List[InFlightCatchupReq]
+        self.throughput = None  # type: Optional[float]
+
+
 class CatchupRepService:
     def __init__(self,
                  ledger_id: int,
@@ -44,6 +69,19 @@ class CatchupRepService:
         self._received_catchup_replies_from = defaultdict(list)  # type: Dict[int, List]
         self._received_catchup_txns = []  # type: List[Tuple[int, Any]]
 
+        # Windowed catchup: the first sequence number not requested yet,
+        # ranges to be requested again and requests in flight to every node
+        self._window_size = config.CATCHUP_WINDOW_SIZE if config is not None else 0
+        self._next_seq_no_to_request = None  # type: Optional[int]
+        self._ranges_to_retry = []  # type: List[Tuple[int, int]]
+        self._windows = {}  # type: Dict[str, SeederWindow]
+        self._check_windows_timer = None
+        if self._window_size > 0:
+            self._check_windows_timer = RepeatingTimer(self._timer,
+                                                       config.CATCHUP_WINDOW_CHECK_INTERVAL,
+                                                       self._check_windows,
+                                                       active=False)
+
     def __repr__(self):
         return "{}:CatchupRepService:{}".format(self._provider.node_name(), self._ledger_id)
 
@@ -72,6 +110,12 @@ class CatchupRepService:
                         ' found any connected nodes'.format(CATCH_UP_PREFIX, self, self._ledger_id))
             return
 
+        if self._window_size > 0:
+            self._next_seq_no_to_request = max(self._catchup_till.start_size, self._ledger.size) + 1
+            self._fill_windows()
+            self._check_windows_timer.start()
+            return
+
         reqs = self._send_catchup_reqs(self._provider.eligible_nodes(),
                                        self._catchup_till.start_size + 1, self._catchup_till.final_size)
         timeout = self._catchup_timeout(reqs)
@@ -82,9 +126,13 @@ class CatchupRepService:
             return
 
         self._wait_catchup_rep_from.discard(frm)
+        if self._window_size > 0:
+            self._track_windowed_rep(rep, frm)
 
         txns = self._get_interesting_txns_from_catchup_rep(rep)
         if len(txns) == 0:
+            if self._window_size > 0:
+                self._fill_windows()
             return
 
         logger.info("{} found {} interesting transactions in the catchup from {}".format(self, len(txns), frm))
@@ -106,11 +154,14 @@ class CatchupRepService:
 
         if self._ledger.size >= self._catchup_till.final_size:
             self._finish()
+        elif self._window_size > 0:
+            self._fill_windows()
 
     def _finish(self, last_3pc: Optional[Tuple[int, int]] = None):
         num_caught_up = self._catchup_till.final_size - self._catchup_till.start_size if self._catchup_till else 0
 
         self._wait_catchup_rep_from.clear()
+        self._clear_windows()
 
         self._is_working = False
         self._received_catchup_txns.clear()
@@ -207,6 +258,147 @@ class CatchupRepService:
 
         return reqs
 
+    def _fill_windows(self):
+        """
+        Send catchup requests to every node until its window is full or
+        there is nothing left to request. Earlier ranges are needed first
+        to extend the ledger, so they go to the nodes replying faster.
+        """
+        if not self._is_working:
+            return
+
+        seeders = self._window_seeders()
+        for node in [n for n in self._windows if n not in seeders]:
+            # Node is not eligible anymore, so nothing is expected from it
+            for req in self._windows.pop(node).in_flight:
+                self._retry_range(req.start, req.end)
+
+        shuffle(seeders)
+        seeders.sort(key=lambda n: self._window(n).throughput or 0, reverse=True)
+        sent = True
+        while sent:
+            sent = False
+            for node in seeders:
+                window = self._window(node)
+                if len(window.in_flight) >= self._window_size:
+                    continue
+                txns_range = self._next_range_to_request(window.req_size)
+                if txns_range is None:
+                    return
+                self._send_windowed_req(node, window, *txns_range)
+                sent = True
+
+    def _window_seeders(self) -> List[str]:
+        eligible_nodes = self._provider.eligible_nodes()
+        seeders = [node for node in eligible_nodes
+                   if self._nodes_ledger_sizes.get(node, 0) >= self._catchup_till.final_size]
+        # As in `_send_catchup_reqs`, trying all eligible nodes as a last resort
+        return seeders if seeders else list(eligible_nodes)
+
+    def _window(self, node: str) -> SeederWindow:
+        window = self._windows.get(node)
+        if window is None:
+            window = SeederWindow(self._config.CATCHUP_INITIAL_BATCH_SIZE)
+            self._windows[node] = window
+        return window
+
+    def _next_range_to_request(self, size: int) -> Optional[Tuple[int, int]]:
+        while self._ranges_to_retry:
+            start, end = self._ranges_to_retry.pop(0)
+            start = max(start, self._ledger.size + 1)
+            if start > end:
+                continue
+            if end - start + 1 > size:
+                insort(self._ranges_to_retry, (start + size, end))
+                end = start + size - 1
+            return start, end
+
+        start = max(self._next_seq_no_to_request, self._ledger.size + 1)
+        if start > self._catchup_till.final_size:
+            return None
+        end = min(start + size - 1, self._catchup_till.final_size)
+        self._next_seq_no_to_request = end + 1
+        return start, end
+
+    def _retry_range(self, start: int, end: int):
+        start = max(start, self._ledger.size + 1)
+        if start <= end:
+            insort(self._ranges_to_retry, (start, end))
+
+    def _send_windowed_req(self, node: str, window: SeederWindow, start: int, end: int):
+        req = CatchupReq(ledgerId=self._ledger_id,
+                         seqNoStart=start,
+                         seqNoEnd=end,
+                         catchupTill=self._catchup_till.final_size)
+        window.in_flight.append(InFlightCatchupReq(start, end, self._timer.get_current_time()))
+        self._wait_catchup_rep_from.add(node)
+        self._provider.send_to(req, node)
+
+    def _track_windowed_rep(self, rep: CatchupRep, frm: str):
+        window = self._windows.get(frm)
+        if window is None:
+            return
+
+        # A reply can be split by the seeder, so a request is complete once
+        # all of its transactions are received
+        seq_nos = [int(s) for s in rep.txns]
+        now = self._timer.get_current_time()
+        for req in list(window.in_flight):
+            req.received += sum(1 for s in seq_nos if req.start <= s <= req.end)
+            if req.received >= req.size:
+                window.in_flight.remove(req)
+                self._adapt_req_size(window, req, now - req.sent_at)
+
+    def _adapt_req_size(self, window: SeederWindow, req: InFlightCatchupReq, reply_time: float):
+        reply_time = max(reply_time, 0.001)
+        throughput = req.size / reply_time
+        window.throughput = throughput if window.throughput is None \
+            else (window.throughput + throughput) / 2
+
+        target_time = self._config.CATCHUP_TARGET_REPLY_TIME
+        if reply_time < target_time / 2 and req.size >= window.req_size:
+            window.req_size = min(2 * window.req_size, self._config.CATCHUP_MAX_BATCH_SIZE)
+        elif reply_time > target_time:
+            window.req_size = max(window.req_size // 2, self._config.CATCHUP_BATCH_SIZE)
+
+    def _check_windows(self):
+        if not self._is_working:
+            return
+
+        now = self._timer.get_current_time()
+        timeout = self._config.CatchupTransactionsTimeout
+        for node, window in self._windows.items():
+            expired = [req for req in window.in_flight if now - req.sent_at >= timeout]
+            for req in expired:
+                logger.info("{} did not get transactions from {} to {} from {} in {} seconds, "
+                            "requesting them again".format(self, req.start, req.end, node, timeout))
+                window.in_flight.remove(req)
+                window.req_size = max(window.req_size // 2, self._config.CATCHUP_BATCH_SIZE)
+                self._retry_range(req.start, req.end)
+
+        all_requested = self._next_seq_no_to_request > self._catchup_till.final_size
+        if all_requested and not self._ranges_to_retry and \
+                not any(window.in_flight for window in self._windows.values()):
+            self._retry_missing_ranges()
+        self._fill_windows()
+
+    def _retry_missing_ranges(self):
+        # Transactions which failed verification are dropped, so everything
+        # neither in the ledger nor received is requested again
+        start = self._ledger.size + 1
+        received = [seq_no for seq_no, _ in self._received_catchup_txns]
+        for seq_no in received + [self._catchup_till.final_size + 1]:
+            if seq_no > start:
+                self._retry_range(start, seq_no - 1)
+            start = max(start, seq_no + 1)
+
+    def _clear_windows(self):
+        if self._check_windows_timer is not None:
+            self._check_windows_timer.stop()
+        self._next_seq_no_to_request = None
+        self._ranges_to_retry.clear()
+        self._windows.clear()
+
     def _catchup_timeout(self, num_requests: int):
         return num_requests * self._config.CatchupTransactionsTimeout
 
@@ -355,8 +547,7 @@ class CatchupRepService:
             seq_no = txns[0][0]
             result, node_name, to_be_processed = self._has_valid_catchup_replies(seq_no, txns)
             if result:
-                for _, txn in txns[:to_be_processed]:
-                    self._add_txn(txn)
+                self._add_txns([txn for _, txn in txns[:to_be_processed]])
                 self._remove_processed_catchup_reply(node_name, seq_no)
                 num_processed += to_be_processed
                 txns = txns[to_be_processed:]
@@ -433,9 +624,13 @@ class CatchupRepService:
                 if str(seq_no) in rep.txns:
                     return frm, rep
 
-    def _add_txn(self, txn):
-        self._ledger.add(self._provider.transform_txn_for_ledger(txn))
-        self._provider.notify_transaction_added_to_ledger(self._ledger_id, txn)
+    def _add_txns(self, txns):
+        # Merkle info is not needed here, so the ledger is free to hash
+        # the whole range at once
+        self._ledger.add_batch([self._provider.transform_txn_for_ledger(txn) for txn in txns],
+                               with_merkle_info=False)
+        for txn in txns:
+            self._provider.notify_transaction_added_to_ledger(self._ledger_id, txn)
 
     def _remove_processed_catchup_reply(self, node: str, seq_no: str):
         for i, rep in enumerate(self._received_catchup_replies_from[node]):
@@ -448,5 +643,6 @@ class CatchupRepService:
         self._catchup_till = None
 
         self._wait_catchup_rep_from.clear()
+        self._clear_windows()
         self._received_catchup_replies_from.clear()
         self._received_catchup_txns.clear()
@@ -6,7 +6,9 @@ from plenum.common.metrics_collector import MetricsCollector
 from plenum.common.timer import TimerService
 from plenum.server.catchup.catchup_rep_service import CatchupRepService
 from plenum.server.catchup.cons_proof_service import ConsProofService
-from plenum.server.catchup.utils import CatchupDataProvider, LedgerCatchupStart, LedgerCatchupComplete, CatchupTill
+from plenum.server.catchup.state_snapshot_service import StateSnapshotService
+from plenum.server.catchup.utils import CatchupDataProvider, LedgerCatchupStart, LedgerCatchupComplete, CatchupTill, \
+    StateSnapshotComplete
 from stp_core.common.log import getlogger
 
 logger = getlogger()
@@ -32,11 +34,15 @@ class LedgerLeecherService:
         self._state = LedgerState.not_synced  # TODO: Improve enum
         self._catchup_till = None  # type: Optional[CatchupTill]
         self._num_txns_caught_up = 0
+        # Root of the state synced from a snapshot during this catchup
+        self._state_root = None  # type: Optional[str]
+        self._pending_catchup_start = None  # type: Optional[LedgerCatchupStart]
 
         services_tx, services_rx = create_direct_channel()
         router = Router(services_rx)
         router.add(LedgerCatchupStart, self._on_catchup_start)
         router.add(LedgerCatchupComplete, self._on_catchup_complete)
+        router.add(StateSnapshotComplete, self._on_state_snapshot_complete)
 
         self._cons_proof_service = ConsProofService(ledger_id=ledger_id,
                                                     config=config,
@@ -54,6 +60,14 @@ class LedgerLeecherService:
                                                       metrics=self.metrics,
                                                       provider=self._provider)
 
+        self._state_snapshot_service = StateSnapshotService(ledger_id=ledger_id,
+                                                            config=config,
+                                                            input=input,
+                                                            output=services_tx,
+                                                            timer=self._timer,
+                                                            metrics=self.metrics,
+                                                            provider=self._provider)
+
     def __repr__(self):
         return "{}:LedgerLeecherService:{}".format(self._provider.node_name(), self._ledger_id)
 
@@ -69,13 +83,24 @@ class LedgerLeecherService:
     def num_txns_caught_up(self) -> int:
         return self._num_txns_caught_up
 
+    @property
+    def state_synced_from_snapshot(self) -> bool:
+        """
+        Whether txns caught up now are already applied to the state
+        """
+        return self._state_root is not None
+
     def start(self,
               request_ledger_statuses: bool = True,
               till: Optional[CatchupTill] = None,
-              nodes_ledger_sizes: Optional[Dict[str, int]] = None):
+              nodes_ledger_sizes: Optional[Dict[str, int]] = None,
+              state_root: Optional[str] = None):
 
         self._catchup_till = till
         self._num_txns_caught_up = 0
+        self._state_root = None
+        if till is not None and till.start_size < till.final_size:
+            self._state_root = state_root
         self._provider.notify_catchup_start(self._ledger_id)
         if till is None:
             self._state = LedgerState.not_synced
@@ -93,6 +118,9 @@ class LedgerLeecherService:
         self._state = LedgerState.not_synced
         self._catchup_till = None
         self._num_txns_caught_up = 0
+        self._state_root = None
+        self._pending_catchup_start = None
+        self._state_snapshot_service.reset()
 
     def _on_catchup_start(self, msg: LedgerCatchupStart):
         self._state = LedgerState.syncing
@@ -103,8 +131,22 @@ class LedgerLeecherService:
         self._num_txns_caught_up = msg.num_caught_up
         self._state = LedgerState.synced
         self._catchup_till = None
+        self._state_root = None
         self._output.put_nowait(msg)
 
+    def _on_state_snapshot_complete(self, msg: StateSnapshotComplete):
+        msg, self._pending_catchup_start = self._pending_catchup_start, None
+        if msg is not None:
+            self._catchup_rep_service.start(msg)
+
     def _start_catchup(self, msg: LedgerCatchupStart):
         self._output.put_nowait(msg)
-        self._catchup_rep_service.start(msg)
+        if self._state_root is None:
+            self._catchup_rep_service.start(msg)
+            return
+
+        # State goes first: if the node stops before txns are caught up, the
+        # next catchup finds the state already there, while a state lagging
+        # behind a complete ledger would never be caught up
+        self._pending_catchup_start = msg
+        self._state_snapshot_service.start(self._state_root)
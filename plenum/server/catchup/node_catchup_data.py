@@ -5,6 +5,7 @@ from ledger.merkle_verifier import MerkleVerifier
 from plenum.common.constants import CONFIG_LEDGER_ID
 from plenum.common.ledger import Ledger
 from plenum.server.catchup.utils import CatchupDataProvider
+from state.pruning_state import PruningState
 from state.state import State
 
 
@@ -28,6 +29,9 @@ class CatchupNodeDataProvider(CatchupDataProvider):
     def config_state(self) -> State:
         return self._state_info(CONFIG_LEDGER_ID)
 
+    def state(self, ledger_id: int) -> Optional[PruningState]:
+        return self._state_info(ledger_id)
+
     def verifier(self, ledger_id: int) -> MerkleVerifier:
         info = self._ledger_info(ledger_id)
         return info.verifier if info is not None else None
@@ -3,7 +3,7 @@ from typing import Dict, Optional
 
 from plenum.common.channel import TxChannel, RxChannel, create_direct_channel, Router
 from plenum.common.constants import POOL_LEDGER_ID, AUDIT_LEDGER_ID, AUDIT_TXN_LEDGERS_SIZE, AUDIT_TXN_LEDGER_ROOT, \
-    CONFIG_LEDGER_ID
+    CONFIG_LEDGER_ID, AUDIT_TXN_STATE_ROOT
 from plenum.common.ledger import Ledger
 from plenum.common.metrics_collector import MetricsCollector
 from plenum.common.timer import TimerService
@@ -49,6 +49,8 @@ class NodeLeecherService:
 
         self._state = self.State.Idle
         self._catchup_till = {}  # type: Dict[int, CatchupTill]
+        # State roots matching `final_hash` of ledgers synced from a state snapshot
+        self._state_roots = {}  # type: Dict[int, str]
         self._nodes_ledger_sizes = {}  # type: Dict[int, Dict[str, int]]
 
         # TODO: Get rid of this, theoretically most ledgers can be synced in parallel
@@ -82,12 +84,17 @@ class NodeLeecherService:
             leecher.reset()
 
         self._catchup_till.clear()
+        self._state_roots.clear()
         self._nodes_ledger_sizes.clear()
         if is_initial:
             self._enter_state(self.State.PreSyncingPool)
         else:
             self._enter_state(self.State.SyncingAudit)
 
+    def state_synced_from_snapshot(self, ledger_id: int) -> bool:
+        leecher = self._leechers.get(ledger_id)
+        return leecher is not None and leecher.state_synced_from_snapshot
+
     def num_txns_caught_up_in_last_catchup(self) -> int:
         return sum(leecher.num_txns_caught_up for leecher in self._leechers.values())
 
@@ -181,7 +188,8 @@ class NodeLeecherService:
             leecher.start()
         else:
             leecher.start(till=catchup_till,
-                          nodes_ledger_sizes=self._calc_nodes_ledger_sizes(ledger_id))
+                          nodes_ledger_sizes=self._calc_nodes_ledger_sizes(ledger_id),
+                          state_root=self._state_roots.get(ledger_id))
 
     def _calc_catchup_till(self) -> Dict[int, CatchupTill]:
         audit_ledger = self._provider.ledger(AUDIT_LEDGER_ID)
@@ -190,6 +198,8 @@ class NodeLeecherService:
             return {}
 
         catchup_till = {}
+        self._state_roots.clear()
+        snapshot_ledgers = self._config.STATE_SNAPSHOT_CATCHUP_LEDGERS
         last_audit_txn = get_payload_data(last_audit_txn)
         for ledger_id, final_size in last_audit_txn[AUDIT_TXN_LEDGERS_SIZE].items():
             ledger = self._provider.ledger(ledger_id)
@@ -200,6 +210,7 @@ class NodeLeecherService:
             start_size = ledger.size
 
             final_hash = last_audit_txn[AUDIT_TXN_LEDGER_ROOT].get(ledger_id)
+            state_root = last_audit_txn[AUDIT_TXN_STATE_ROOT].get(ledger_id)
             if final_hash is None:
                 if final_size != ledger.size:
                     logger.error("{} has corrupted audit ledger: "
@@ -224,6 +235,10 @@ class NodeLeecherService:
                                  "which doesn't contain txn root".
                                  format(self, ledger_id, audit_ledger.size, final_hash, audit_ledger.size - final_hash))
                     return {}
+                state_root = audit_txn[AUDIT_TXN_STATE_ROOT].get(ledger_id)
+
+            if ledger_id in snapshot_ledgers and state_root is not None:
+                self._state_roots[ledger_id] = state_root
 
             catchup_till[ledger_id] = CatchupTill(start_size=start_size,
                                                   final_size=final_size,
@@ -1,10 +1,15 @@
 from abc import abstractmethod
-from typing import Any, Tuple, Optional
+from base64 import b64encode
+from collections import OrderedDict
+from typing import Any, Tuple, Optional, List
 
 from plenum.common.channel import RxChannel, Router
+from plenum.common.config_util import getConfig
 from plenum.common.ledger import Ledger
-from plenum.common.messages.node_messages import CatchupReq, CatchupRep, ConsistencyProof, LedgerStatus
+from plenum.common.messages.node_messages import CatchupReq, CatchupRep, ConsistencyProof, LedgerStatus, \
+    StateSnapshotReq, StateSnapshotRep
 from plenum.common.util import SortedDict
+from plenum.server.catchup.catchup_rep_builder import CatchupRepBuilder
 from plenum.server.catchup.utils import CatchupDataProvider, build_ledger_status
 from stp_core.common.log import getlogger
 
@@ -12,11 +17,25 @@ logger = getlogger()
 
 
 class SeederService:
-    def __init__(self, input: RxChannel, provider: CatchupDataProvider):
+    def __init__(self, input: RxChannel, provider: CatchupDataProvider, config=None):
         router = Router(input)
         router.add(LedgerStatus, self.process_ledger_status)
         router.add(CatchupReq, self.process_catchup_req)
         self._provider = provider
+        self._config = config or getConfig()
+
+        # Nodes catching up request the same ranges up to the same
+        # `catchupTill`, so consistency proofs for them are made only once
+        self._cons_proofs = OrderedDict()
+        self._cons_proofs_limit = self._config.CATCHUP_CONS_PROOF_CACHE_SIZE
+
+        self._rep_builder = None
+        if self._config.BUILD_CATCHUP_REP_SERIALIZED:
+            self._rep_builder = CatchupRepBuilder(
+                provider,
+                msg_len_limit=self._config.MSG_LEN_LIMIT,
+                make_cons_proof=self._get_consistency_proof,
+                txn_cache_size=self._config.CATCHUP_REP_TXN_CACHE_SIZE)
 
     def __repr__(self):
         return self._provider.node_name()
@@ -82,8 +101,13 @@ class SeederService:
                                    .format(req.catchupTill, ledger.size), logMethod=logger.warning)
             return
 
-        cons_proof = ledger.tree.consistency_proof(end, req.catchupTill)
-        cons_proof = [Ledger.hashToStr(p) for p in cons_proof]
+        if self._rep_builder is not None:
+            for rep in self._rep_builder.build(ledger_id, ledger, start, end,
+                                               req.catchupTill):
+                self._provider.send_to(rep, frm)
+            return
+
+        cons_proof = self._get_consistency_proof(ledger_id, ledger, end, req.catchupTill)
 
         txns = {}
         for seq_no, txn in ledger.getAllTxn(start, end):
@@ -91,7 +115,7 @@ class SeederService:
 
         txns = SortedDict(txns)  # TODO: Do we really need them sorted on the sending side?
         rep = CatchupRep(ledger_id, txns, cons_proof)
-        message_splitter = self._make_splitter_for_catchup_rep(ledger, req.catchupTill)
+        message_splitter = self._make_splitter_for_catchup_rep(ledger_id, ledger, req.catchupTill)
         self._provider.send_to(rep, frm, message_splitter)
 
     def _get_ledger_and_id(self, req: Any) -> Tuple[int, Optional[Ledger]]:
@@ -104,6 +128,22 @@ class SeederService:
         string_proof = [Ledger.hashToStr(p) for p in proof]
         return string_proof
 
+    def _get_consistency_proof(self, ledger_id: int, ledger: Ledger,
+                               seq_no_start: int, seq_no_end: int) -> List[str]:
+        # Transactions are never removed from a ledger, so a proof between
+        # two of its sizes stays valid
+        key = (ledger_id, seq_no_start, seq_no_end)
+        proof = self._cons_proofs.get(key)
+        if proof is not None:
+            self._cons_proofs.move_to_end(key)
+            return proof
+        proof = self._make_consistency_proof(ledger, seq_no_start, seq_no_end)
+        if self._cons_proofs_limit > 0:
+            self._cons_proofs[key] = proof
+            if len(self._cons_proofs) > self._cons_proofs_limit:
+                self._cons_proofs.popitem(last=False)
+        return proof
+
     def _build_consistency_proof(self, ledger_id: int,
                                  seq_no_start: int, seq_no_end: int) -> Optional[ConsistencyProof]:
         ledger = self._provider.ledger(ledger_id)
@@ -131,7 +171,7 @@ class SeederService:
             old_root = Ledger.hashToStr(old_root)
             proof = [old_root, ]
         else:
-            proof = self._make_consistency_proof(ledger, seq_no_start, seq_no_end)
+            proof = self._get_consistency_proof(ledger_id, ledger, seq_no_start, seq_no_end)
             old_root = ledger.tree.merkle_tree_hash(0, seq_no_start)
             old_root = Ledger.hashToStr(old_root)
 
@@ -149,7 +189,7 @@ class SeederService:
                                 new_root,
                                 proof)
 
-    def _make_splitter_for_catchup_rep(self, ledger, initial_seq_no):
+    def _make_splitter_for_catchup_rep(self, ledger_id, ledger, initial_seq_no):
 
         def _split(message):
             txns = list(message.txns.items())
@@ -162,13 +202,12 @@ class SeederService:
             left_last_seq_no = left[-1][0]
             right = txns[divider:]
             right_last_seq_no = right[-1][0]
-            left_cons_proof = self._make_consistency_proof(ledger,
-                                                           left_last_seq_no,
+            left_cons_proof = self._get_consistency_proof(ledger_id, ledger,
+                                                          left_last_seq_no,
+                                                          initial_seq_no)
+            right_cons_proof = self._get_consistency_proof(ledger_id, ledger,
+                                                           right_last_seq_no,
                                                            initial_seq_no)
-            right_cons_proof = self._make_consistency_proof(ledger,
-                                                            right_last_seq_no,
-                                                            initial_seq_no)
-            ledger_id = message.ledgerId
 
             left_rep = CatchupRep(ledger_id, SortedDict(left), left_cons_proof)
             right_rep = CatchupRep(ledger_id, SortedDict(right), right_cons_proof)
@@ -182,8 +221,8 @@ class SeederService:
 
 
 class ClientSeederService(SeederService):
-    def __init__(self, input: RxChannel, provider: CatchupDataProvider):
-        SeederService.__init__(self, input, provider)
+    def __init__(self, input: RxChannel, provider: CatchupDataProvider, config=None):
+        SeederService.__init__(self, input, provider, config)
 
     def _on_ledger_status_up_to_date(self, ledger_id: int, frm: str):
         ledger_status = build_ledger_status(ledger_id, self._provider)
@@ -191,8 +230,37 @@ class ClientSeederService(SeederService):
 
 
 class NodeSeederService(SeederService):
-    def __init__(self, input: RxChannel, provider: CatchupDataProvider):
-        SeederService.__init__(self, input, provider)
+    # Room for everything in STATE_SNAPSHOT_REP except trie nodes
+    STATE_SNAPSHOT_REP_OVERHEAD = 256
+
+    def __init__(self, input: RxChannel, provider: CatchupDataProvider, config=None):
+        SeederService.__init__(self, input, provider, config)
+        Router(input).add(StateSnapshotReq, self.process_state_snapshot_req)
+
+    def process_state_snapshot_req(self, req: StateSnapshotReq, frm: str):
+        logger.debug("{} received state snapshot request: {} from {}".format(self, req, frm))
+
+        state = self._provider.state(req.ledgerId)
+        if state is None:
+            self._provider.discard(req, reason="it references ledger without state",
+                                   logMethod=logger.warning)
+            return
+
+        nodes = []
+        # Nothing is sent if this node doesn't know the state, so that the
+        # requesting node asks another one
+        if state.has_trie_node(Ledger.strToHash(req.stateRootHash)):
+            room = self._config.MSG_LEN_LIMIT - self.STATE_SNAPSHOT_REP_OVERHEAD
+            hashes = [Ledger.strToHash(h) for h in req.hashes]
+            for node in state.get_trie_nodes(hashes, self._config.STATE_SNAPSHOT_MAX_NODES_PER_REP):
+                node = b64encode(node).decode()
+                # Quotes and a separating comma
+                room -= len(node) + 3
+                if room < 0:
+                    break
+                nodes.append(node)
+
+        self._provider.send_to(StateSnapshotRep(req.ledgerId, req.stateRootHash, nodes), frm)
 
     def _on_ledger_status_up_to_date(self, ledger_id: int, frm: str):
         pass
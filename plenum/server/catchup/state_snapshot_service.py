@@ -0,0 +1,153 @@
+from base64 import b64decode
+from binascii import Error as Base64Error
+from typing import Optional, Dict, List, Tuple
+
+from plenum.common.channel import RxChannel, TxChannel, Router
+from plenum.common.constants import CATCH_UP_PREFIX
+from plenum.common.ledger import Ledger
+from plenum.common.messages.node_messages import StateSnapshotReq, StateSnapshotRep
+from plenum.common.metrics_collector import MetricsCollector
+from plenum.common.timer import TimerService, RepeatingTimer
+from plenum.server.catchup.utils import CatchupDataProvider, StateSnapshotComplete
+from state.state_snapshot import StateSnapshotReceiver
+from stp_core.common.log import getlogger
+
+logger = getlogger()
+
+
+class StateSnapshotService:
+    """
+    Catches up the state of a ledger by fetching the trie with the state
+    root from the audit ledger from other nodes, so that caught up txns
+    don't have to be applied to the state one by one.
+
+    The audit ledger is caught up and verified against other nodes before
+    any other ledger, so its state root is trusted and every trie node
+    received is checked against it. Subtrees which are already in the
+    local state are not requested.
+    """
+
+    def __init__(self,
+                 ledger_id: int,
+                 config: object,
+                 input: RxChannel,
+                 output: TxChannel,
+                 timer: TimerService,
+                 metrics: MetricsCollector,
+                 provider: CatchupDataProvider):
+        Router(input).add(StateSnapshotRep, self.process_state_snapshot_rep)
+
+        self._ledger_id = ledger_id
+        self._config = config
+        self._output = output
+        self._timer = timer
+        self.metrics = metrics
+        self._provider = provider
+
+        self._state_root = None  # type: Optional[str]
+        self._receiver = None  # type: Optional[StateSnapshotReceiver]
+        # Requested hashes and time of the request for every node asked
+        self._in_flight = {}  # type: Dict[str, Tuple[List[bytes], float]]
+        # Nodes which do not have the requested state
+        self._useless_nodes = set()
+        self._check_timer = RepeatingTimer(self._timer,
+                                           config.STATE_SNAPSHOT_REQ_TIMEOUT,
+                                           self._check_requests,
+                                           active=False)
+
+    def __repr__(self):
+        return "{}:StateSnapshotService:{}".format(self._provider.node_name(), self._ledger_id)
+
+    def is_working(self) -> bool:
+        return self._receiver is not None
+
+    def start(self, state_root: str):
+        logger.info("{} started syncing state {}".format(self, state_root))
+
+        state = self._provider.state(self._ledger_id)
+        self._state_root = state_root
+        self._receiver = StateSnapshotReceiver(state, Ledger.strToHash(state_root))
+        if self._receiver.is_complete:
+            self._finish()
+            return
+
+        self._check_timer.start()
+        self._send_reqs()
+
+    def reset(self):
+        self._check_timer.stop()
+        self._state_root = None
+        self._receiver = None
+        self._in_flight.clear()
+        self._useless_nodes.clear()
+
+    def process_state_snapshot_rep(self, rep: StateSnapshotRep, frm: str):
+        if self._receiver is None or rep.ledgerId != self._ledger_id or \
+                rep.stateRootHash != self._state_root:
+            return
+        req = self._in_flight.pop(frm, None)
+        if req is None:
+            return
+
+        try:
+            nodes = [b64decode(node) for node in rep.trieNodes]
+        except (Base64Error, ValueError):
+            self._provider.discard(rep, reason="it contains invalid trie nodes",
+                                   logMethod=logger.warning)
+            nodes = []
+
+        accepted = self._receiver.add_nodes(nodes)
+        # Reply is cut once it is big enough, the rest will be asked again
+        self._receiver.request_again(req[0])
+        if accepted == 0:
+            logger.info("{} got no trie nodes of state {} from {}".format(self, self._state_root, frm))
+            self._useless_nodes.add(frm)
+
+        if self._receiver.is_complete:
+            self._finish()
+        else:
+            self._send_reqs()
+
+    def _send_reqs(self):
+        nodes = [node for node in self._provider.eligible_nodes()
+                 if node not in self._in_flight and node not in self._useless_nodes]
+        now = self._timer.get_current_time()
+        for node in nodes:
+            hashes = self._receiver.next_hashes_to_request(self._config.STATE_SNAPSHOT_HASHES_PER_REQ)
+            if not hashes:
+                return
+            self._in_flight[node] = (hashes, now)
+            self._provider.send_to(StateSnapshotReq(self._ledger_id,
+                                                    self._state_root,
+                                                    [Ledger.hashToStr(h) for h in hashes]),
+                                   node)
+
+    def _check_requests(self):
+        if self._receiver is None:
+            return
+
+        now = self._timer.get_current_time()
+        for node, (hashes, sent_at) in list(self._in_flight.items()):
+            if now - sent_at >= self._config.STATE_SNAPSHOT_REQ_TIMEOUT:
+                logger.info("{} got no reply from {} for state {}".format(self, node, self._state_root))
+                del self._in_flight[node]
+                self._receiver.request_again(hashes)
+                self._useless_nodes.add(node)
+
+        # All nodes had a chance, they may have got the state since then
+        if not self._in_flight and \
+                not set(self._provider.eligible_nodes()) - self._useless_nodes:
+            self._useless_nodes.clear()
+        self._send_reqs()
+
+    def _finish(self):
+        receiver = self._receiver
+        receiver.install()
+        self.reset()
+
+        logger.info("{}{} synced state {} of ledger {}, received {} trie nodes"
+                    .format(CATCH_UP_PREFIX, self, Ledger.hashToStr(receiver.root_hash),
+                            self._ledger_id, receiver.nodes_received),
+                    extra={'cli': True})
+        self._output.put_nowait(StateSnapshotComplete(ledger_id=self._ledger_id,
+                                                      num_nodes=receiver.nodes_received))
@@ -6,6 +6,7 @@ from ledger.merkle_verifier import MerkleVerifier
 from plenum.common.constants import CURRENT_PROTOCOL_VERSION
 from plenum.common.ledger import Ledger
 from plenum.common.messages.node_messages import LedgerStatus
+from state.pruning_state import PruningState
 from state.state import State
 from stp_core.common.log import getlogger
 
@@ -27,6 +28,10 @@ LedgerCatchupComplete = NamedTuple('LedgerCatchupComplete',
 
 NodeCatchupComplete = NamedTuple('NodeCatchupComplete', [])
 
+StateSnapshotComplete = NamedTuple('StateSnapshotComplete',
+                                   [('ledger_id', int),
+                                    ('num_nodes', int)])
+
 
 class CatchupDataProvider(ABC):
     @abstractmethod
@@ -49,6 +54,10 @@ class CatchupDataProvider(ABC):
     def config_state(self) -> State:
         pass
 
+    @abstractmethod
+    def state(self, ledger_id: int) -> Optional[PruningState]:
+        pass
+
     @abstractmethod
     def verifier(self, ledger_id: int) -> MerkleVerifier:
         pass
@@ -1,7 +1,9 @@
 """
 Clients are authenticated with a digital signature.
 """
+import threading
 from abc import abstractmethod
+from collections import OrderedDict
 from typing import Dict, Optional
 
 import base58
@@ -78,8 +80,83 @@ class ClientAuthNr:
         :return: the verification key
         """
 
+    def invalidate_verkey(self, identifier):
+        """
+        Forget the verification key of the identifier if it is cached, called
+        when a transaction changing the key is applied
+        """
+
+    def clear_verkeys(self):
+        """
+        Forget all cached verification keys, called when the state is
+        reverted or replaced
+        """
+
+
+class VerkeyCache:
+    """
+    Keeps verification keys of the most recently authenticated identifiers
+    read from the state and verifiers made of them, so that repeat clients
+    skip both the state lookup and the decoding of the key.
+
+    A verifier is kept by identifier and verification key, so it is never
+    stale. A verification key is kept by identifier until a transaction
+    changing it is applied or the state is reverted.
+
+    The cache is used by threads of signature verification, so it is
+    guarded by a lock.
+    """
+
+    def __init__(self, max_size: int):
+        if max_size < 1:
+            raise ValueError("max_size must be positive, got {}"
+                             .format(max_size))
+        self.max_size = max_size
+        self._verkeys = OrderedDict()  # type: OrderedDict
+        self._verifiers = OrderedDict()  # type: OrderedDict
+        self._lock = threading.Lock()
+
+    def get_verkey(self, identifier) -> Optional[str]:
+        with self._lock:
+            verkey = self._verkeys.get(identifier)
+            if verkey is not None:
+                self._verkeys.move_to_end(identifier)
+            return verkey
+
+    def add_verkey(self, identifier, verkey: str):
+        with self._lock:
+            self._add(self._verkeys, identifier, verkey)
+
+    def get_verifier(self, verifier, verkey, identifier) -> Verifier:
+        key = (identifier, verkey, verifier)
+        with self._lock:
+            vr = self._verifiers.get(key)
+            if vr is not None:
+                self._verifiers.move_to_end(key)
+                return vr
+        # Decoding of the key is left out of the lock
+        vr = verifier(verkey, identifier=identifier)
+        with self._lock:
+            self._add(self._verifiers, key, vr)
+        return vr
+
+    def invalidate(self, identifier):
+        with self._lock:
+            self._verkeys.pop(identifier, None)
+
+    def clear(self):
+        with self._lock:
+            self._verkeys.clear()
+
+    def _add(self, cache: OrderedDict, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.max_size:
+            cache.popitem(last=False)
+
 
 class NaclAuthNr(ClientAuthNr):
+    verkey_cache = None  # type: Optional[VerkeyCache]
 
     def authenticate_multi(self, msg: Dict, signatures: Dict[str, str],
                            threshold: Optional[int] = None, verifier: Verifier = DidVerifier):
@@ -105,7 +182,10 @@ class NaclAuthNr(ClientAuthNr):
             if verkey is None:
                 raise CouldNotAuthenticate(idr)
 
-            vr = verifier(verkey, identifier=idr)
+            if self.verkey_cache is not None:
+                vr = self.verkey_cache.get_verifier(verifier, verkey, idr)
+            else:
+                vr = verifier(verkey, identifier=idr)
             if vr.verify(sig_decoded, ser):
                 correct_sigs_from.append(idr)
                 if len(correct_sigs_from) == threshold:
@@ -136,11 +216,13 @@ class SimpleAuthNr(NaclAuthNr):
     secure system.
     """
 
-    def __init__(self, state=None):
+    def __init__(self, state=None, verkey_cache_size=0):
         # key: some identifier, value: verification key
         self.clients = {}  # type: Dict[str, Dict]
         self.state = state
         self.specific_verkey_validation = {NYM: self.nym_specific_auth}
+        if verkey_cache_size > 0:
+            self.verkey_cache = VerkeyCache(verkey_cache_size)
 
     def addIdr(self, identifier, verkey, role=None):
         if identifier in self.clients:
@@ -154,6 +236,10 @@ class SimpleAuthNr(NaclAuthNr):
     def getVerkey(self, ident, request):
         nym = self.clients.get(ident)
         if not nym:
+            if self.verkey_cache is not None:
+                verkey = self.verkey_cache.get_verkey(ident)
+                if verkey is not None:
+                    return verkey
             # Querying uncommitted identities since a batch might contain
             # both identity creation request and a request by that newly
             # created identity, also its possible to have multiple uncommitted
@@ -165,8 +251,18 @@ class SimpleAuthNr(NaclAuthNr):
                 # non-ledger request, so we need to look for verkey in request
                 verkey = self.get_verkey_specific(request)
                 return verkey
+            if self.verkey_cache is not None and nym.get(VERKEY) is not None:
+                self.verkey_cache.add_verkey(ident, nym[VERKEY])
         return nym.get(VERKEY)
 
+    def invalidate_verkey(self, identifier):
+        if self.verkey_cache is not None:
+            self.verkey_cache.invalidate(identifier)
+
+    def clear_verkeys(self):
+        if self.verkey_cache is not None:
+            self.verkey_cache.clear()
+
     def authenticate(self,
                      msg: Dict,
                      identifier: Optional[str] = None,
@@ -271,6 +367,7 @@ class CoreAuthMixin:
 
 
 class CoreAuthNr(CoreAuthMixin, SimpleAuthNr):
-    def __init__(self, write_types, query_types, action_types, state=None):
-        SimpleAuthNr.__init__(self, state)
+    def __init__(self, write_types, query_types, action_types, state=None,
+                 verkey_cache_size=0):
+        SimpleAuthNr.__init__(self, state, verkey_cache_size)
         CoreAuthMixin.__init__(self, write_types, query_types, action_types)
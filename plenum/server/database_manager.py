@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 from typing import Dict, Optional
 
 from common.exceptions import LogicError
@@ -6,15 +7,25 @@ from plenum.common.constants import BLS_LABEL, TS_LABEL, IDR_CACHE_LABEL, ATTRIB
 from plenum.common.ledger import Ledger
 from plenum.server.txn_version_controller import TxnVersionController
 from state.state import State
+from storage.group_commit import GroupCommit, GroupCommitStorage
+from storage.kv_store import KeyValueStorage
 
 
 class DatabaseManager():
-    def __init__(self):
+    def __init__(self, group_commit=False, group_commit_sync=False):
+        """
+        :param group_commit: whether writes of a batch to the storages
+            wrapped by `coordinated_storage` are written together when the
+            batch is committed, see `batch_commit`
+        :param group_commit_sync: whether those writes are synced to disk,
+            for storages in one shared RocksDB database
+        """
         self.databases = {}  # type: Dict[int, Database]
         self.stores = {}
         self.trackers = {}
         self._init_db_list()
         self._txn_version_controller = TxnVersionController()
+        self._group_commit = GroupCommit(sync=group_commit_sync) if group_commit else None
 
     def _init_db_list(self):
         self._ledgers = {lid: db.ledger for lid, db in self.databases.items()}
@@ -79,6 +90,34 @@ class DatabaseManager():
             return None
         return self.stores[label]
 
+    def coordinated_storage(self, storage: KeyValueStorage) -> KeyValueStorage:
+        """
+        Return the storage to be used by a store whose writes made while a
+        batch is committed are to be written along with the other stores
+        """
+        if self._group_commit is None:
+            return storage
+        return GroupCommitStorage(storage, self._group_commit)
+
+    @contextmanager
+    def batch_commit(self):
+        """
+        Writes to coordinated storages made inside are collected and written
+        in one batch per storage when it ends, or in one atomic batch for
+        storages which are column families of one RocksDB database. If it
+        ends with an exception, none of the writes is made
+        """
+        if self._group_commit is None or self._group_commit.is_open:
+            yield
+            return
+        self._group_commit.begin()
+        try:
+            yield
+        except BaseException:
+            self._group_commit.discard()
+            raise
+        self._group_commit.commit()
+
     def is_taa_acceptance_required(self, lid):
         if lid not in self.databases:
             return False
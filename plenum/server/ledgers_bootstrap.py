@@ -7,6 +7,9 @@ from ledger.compact_merkle_tree import CompactMerkleTree
 from ledger.genesis_txn.genesis_txn_initiator import GenesisTxnInitiator
 from ledger.genesis_txn.genesis_txn_initiator_from_file import GenesisTxnInitiatorFromFile
 from ledger.genesis_txn.genesis_txn_initiator_from_mem import GenesisTxnInitiatorFromMem
+from ledger.merkle_frontier_store import MerkleFrontierStore
+from ledger.parallel_tree_hasher import ParallelTreeHasher
+from ledger.tree_hasher import TreeHasher
 from plenum.common.constants import AUDIT_LEDGER_ID, POOL_LEDGER_ID, CONFIG_LEDGER_ID, DOMAIN_LEDGER_ID, \
     NODE_PRIMARY_STORAGE_SUFFIX, BLS_LABEL, HS_MEMORY
 from plenum.common.ledger import Ledger
@@ -61,6 +64,7 @@ class LedgersBootstrap:
         self.pool_genesis = None  # type: Optional[GenesisTxnInitiator]
         self.domain_genesis = None  # type: Optional[GenesisTxnInitiator]
         # TODO: ^^^
+        self._tree_hasher = None  # type: Optional[TreeHasher]
 
     def set_data_location(self, data_location: str):
         self.data_location = data_location
@@ -211,6 +215,21 @@ class LedgersBootstrap:
         for l_id in ledger_ids:
             self._init_state_from_ledger(l_id)
 
+    @property
+    def tree_hasher(self) -> TreeHasher:
+        # One hasher (and so one pool of hashing processes) is shared by
+        # all ledgers
+        if self._tree_hasher is None:
+            workers = self.config.MERKLE_HASHING_WORKERS
+            self._tree_hasher = ParallelTreeHasher(workers=workers) if workers \
+                else TreeHasher()
+        return self._tree_hasher
+
+    def shutdown_tree_hasher(self):
+        # Hashing processes would outlive the node otherwise
+        if isinstance(self._tree_hasher, ParallelTreeHasher):
+            self._tree_hasher.shutdown()
+
     def _create_ledger(self, name: str, genesis: Optional[GenesisTxnInitiator] = None) -> Ledger:
         hs_type = HS_MEMORY if self.data_location is None else None
         hash_store = initHashStore(self.data_location, name, self.config, hs_type=hs_type)
@@ -220,12 +239,18 @@ class LedgersBootstrap:
         if self.data_location is None:
             txn_log_storage = KeyValueStorageInMemory()
 
-        return Ledger(CompactMerkleTree(hashStore=hash_store),
+        frontier_store = None
+        if self.data_location is not None and self.config.SAVE_MERKLE_FRONTIER:
+            frontier_store = MerkleFrontierStore(self.data_location, name,
+                                                 ensureDurability=self.config.EnsureLedgerDurability)
+
+        return Ledger(CompactMerkleTree(hasher=self.tree_hasher, hashStore=hash_store),
                       dataDir=self.data_location,
                       fileName=txn_file_name,
                       transactionLogStore=txn_log_storage,
                       ensureDurability=self.config.EnsureLedgerDurability,
-                      genesis_txn_initiator=genesis)
+                      genesis_txn_initiator=genesis,
+                      frontier_store=frontier_store)
 
     def _create_domain_ledger(self) -> Ledger:
         if self.config.primaryStorage is None:
@@ -244,11 +269,14 @@ class LedgersBootstrap:
         db_name = getattr(self.config, "{}StateDbName".format(name))
         if self.data_location is not None:
             return PruningState(
-                initKeyValueStorage(
+                self.db_manager.coordinated_storage(initKeyValueStorage(
                     storage_name,
                     self.data_location,
                     db_name,
-                    db_config=self.config.db_state_config))
+                    db_config=self.config.db_state_config)),
+                node_cache_size=self.config.STATE_TRIE_NODE_CACHE_SIZE,
+                proof_cache_size=self.config.STATE_PROOF_CACHE_SIZE,
+                root_cache_size=self.config.STATE_ROOT_CACHE_SIZE)
         else:
             return PruningState(KeyValueStorageInMemory())
 
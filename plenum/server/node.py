@@ -46,7 +46,9 @@ from stp_core.network.exceptions import RemoteNotFound
 from stp_core.network.network_interface import NetworkInterface
 from stp_core.types import HA
 from stp_zmq.zstack import ZStack, Quota
+from ledger.hash_stores.cached_hash_store import CachedHashStore
 from ledger.hash_stores.hash_store import HashStore
+from ledger.util import ConsistencyVerificationFailed
 
 from plenum.common.config_util import getConfig
 from plenum.common.constants import POOL_LEDGER_ID, DOMAIN_LEDGER_ID, \
@@ -73,7 +75,7 @@ from plenum.common.messages.node_message_factory import node_message_factory
 from plenum.common.messages.node_messages import Batch, \
     RequestAck, RequestNack, Reject, Ordered, \
     Propagate, PrePrepare, Prepare, Commit, Checkpoint, Reply, InstanceChange, LedgerStatus, \
-    ConsistencyProof, CatchupReq, CatchupRep, \
+    ConsistencyProof, CatchupReq, CatchupRep, StateSnapshotReq, StateSnapshotRep, \
     MessageReq, MessageRep, ThreePhaseType, BatchCommitted, \
     ObservedData, BackupInstanceFaulty, OldViewPrePrepareRequest, OldViewPrePrepareReply, \
     ViewChange, ViewChangeAck, NewView
@@ -119,6 +121,8 @@ from plenum.server.quorums import Quorums
 from plenum.server.replicas import Replicas, MASTER_REPLICA_INDEX
 from plenum.server.req_authenticator import ReqAuthenticator
 from plenum.server.router import Router
+from plenum.server.signature_verification_stage import SignatureVerificationStage
+from plenum.server.state_pruning_service import StatePruningService
 from plenum.server.suspicion_codes import Suspicions
 from plenum.server.validator_info_tool import ValidatorNodeInfoTool
 
@@ -182,7 +186,8 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         self._info_tool = self._info_tool_class(self)
 
         # init database and request managers
-        self.db_manager = DatabaseManager()
+        self.db_manager = DatabaseManager(group_commit=self.config.DB_GROUP_COMMIT,
+                                          group_commit_sync=self.config.DB_GROUP_COMMIT_SYNC)
         self.init_req_managers()
         # init storages and request handlers
         self.bootstrapper = self._bootstrap_node(bootstrap_cls, storage)
@@ -202,6 +207,9 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         self.total_read_request_number = 0
 
         self.clientAuthNr = clientAuthNr or self.defaultAuthNr()
+        self.write_manager.subscribe_to_state_updates(
+            on_txn_applied=self._invalidate_verkey,
+            on_state_reverted=self.clientAuthNr.clear_verkeys)
 
         self.addGenesisNyms()
 
@@ -283,6 +291,25 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         if config.GC_STATS_REPORT_INTERVAL > 0:
             self.startRepeating(self.report_gc_stats, config.GC_STATS_REPORT_INTERVAL)
 
+        # State is pruned only while the node participates, catchup may
+        # install state which shares nodes with garbage
+        self.state_pruning_service = StatePruningService(config=self.config,
+                                                         timer=self.timer,
+                                                         db_manager=self.db_manager,
+                                                         can_prune=lambda: self.isParticipating)
+        if self.config.STATE_PRUNING_ENABLED:
+            self.state_pruning_service.start()
+
+        # Signatures of messages received during a looper tick are verified
+        # at once by a pool of threads, if there is one
+        self.sig_verification_stage = None
+        if self.config.SIG_VERIFICATION_WORKERS > 0:
+            self.sig_verification_stage = SignatureVerificationStage(
+                verify=lambda msg: self.verifySignature(msg, measure_time=False),
+                needs_verification=lambda msg: not isinstance(msg, self.authnWhitelist),
+                workers=self.config.SIG_VERIFICATION_WORKERS,
+                metrics=self.metrics)
+
         self.white_list_init()
 
         # Map of request identifier, request id to client name. Used for
@@ -419,6 +446,8 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
             ConsistencyProof,
             CatchupReq,
             CatchupRep,
+            StateSnapshotReq,
+            StateSnapshotRep,
             MessageReq,
             MessageRep,
             ObservedData,
@@ -450,6 +479,8 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
             (ConsistencyProof, self.ledgerManager.processConsistencyProof),
             (CatchupReq, self.ledgerManager.processCatchupReq),
             (CatchupRep, self.ledgerManager.processCatchupRep),
+            (StateSnapshotReq, self.ledgerManager.processStateSnapshotReq),
+            (StateSnapshotRep, self.ledgerManager.processStateSnapshotRep),
             (ObservedData, self.send_to_observer),
             (BackupInstanceFaulty, self.backup_instance_faulty_processor.process_backup_instance_faulty_msg)
         )
@@ -677,31 +708,32 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
 
     def _get_state_ts_db_storage(self):
 
-        domainTsStorage = initKeyValueStorageIntKeys(
+        domainTsStorage = self.db_manager.coordinated_storage(initKeyValueStorageIntKeys(
             self.config.stateTsStorage,
             self.dataLocation,
             self.config.stateTsDbName,
-            db_config=self.config.db_state_ts_db_config)
+            db_config=self.config.db_state_ts_db_config))
 
-        configTsStorage = initKeyValueStorageIntKeys(
+        configTsStorage = self.db_manager.coordinated_storage(initKeyValueStorageIntKeys(
             self.config.stateTsStorage,
             self.dataLocation,
             self.config.configStateTsDbName,
-            db_config=self.config.db_state_ts_db_config)
+            db_config=self.config.db_state_ts_db_config))
 
         return StateTsDbStorage(self.name,
                                 {
                                     DOMAIN_LEDGER_ID: domainTsStorage,
                                     CONFIG_LEDGER_ID: configTsStorage
-                                })
+                                },
+                                index=self.config.STATE_TS_STORE_INDEX)
 
     def loadSeqNoDB(self):
         return ReqIdrToTxn(
-            initKeyValueStorage(
+            self.db_manager.coordinated_storage(initKeyValueStorage(
                 self.config.reqIdToTxnStorage,
                 self.dataLocation,
                 self.config.seqNoDbName,
-                db_config=self.config.db_seq_no_db_config)
+                db_config=self.config.db_seq_no_db_config))
         )
 
     def loadNodeStatusDB(self):
@@ -930,6 +962,8 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
             # Start the ledgers
             for ledger in self.ledgers:
                 ledger.start(loop)
+            if self.config.VERIFY_LEDGER_TREES_ON_START:
+                self.start_ledger_trees_verification()
 
             if self.nodeStatusDB and self.nodeStatusDB.closed:
                 self.nodeStatusDB.open()
@@ -951,6 +985,35 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
 
         self.logNodeInfo()
 
+    def start_ledger_trees_verification(self):
+        """
+        Re-hash transaction logs of the ledgers, one ledger and a batch of
+        transactions at a time, to check the merkle trees restored on start
+        """
+        batch_size = self.config.LEDGER_TREE_VERIFICATION_BATCH_SIZE
+        verifications = [(lid, self.getLedger(lid).verify_tree(batch_size))
+                         for lid in self.ledger_ids
+                         if lid in self.ledgerManager.ledgerRegistry]
+
+        def verify_next_batch():
+            lid, verification = verifications[0]
+            try:
+                next(verification)
+                return
+            except StopIteration:
+                logger.info("{} verified merkle tree of ledger {}"
+                            .format(self, lid))
+            except ConsistencyVerificationFailed:
+                logger.error("{} found that merkle tree of ledger {} does "
+                             "not match its transaction log".format(self, lid))
+            verifications.pop(0)
+            if not verifications:
+                self.stopRepeating(verify_next_batch)
+
+        if verifications:
+            self.startRepeating(verify_next_batch,
+                                self.config.LEDGER_TREE_VERIFICATION_INTERVAL)
+
     def schedule_node_status_dump(self):
         # one-shot dump right after start
         self._schedule(action=self._info_tool.dump_general_info,
@@ -1010,6 +1073,10 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         self.nodestack.stop()
         self.clientstack.stop()
 
+        self.state_pruning_service.stop()
+        if self.sig_verification_stage is not None:
+            self.sig_verification_stage.stop()
+        self.bootstrapper.shutdown_tree_hasher()
         self.closeAllKVStores()
 
         self._info_tool.stop()
@@ -1104,6 +1171,9 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
 
         self.metrics.add_event(MetricsName.NODE_STACK_MESSAGES_PROCESSED, n)
 
+        if self.sig_verification_stage is not None:
+            self.sig_verification_stage.service()
+
         await self.processNodeInBox()
         return n
 
@@ -1118,6 +1188,9 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         c = await self.clientstack.service(limit, self.quota_control.client_quota)
         self.metrics.add_event(MetricsName.CLIENT_STACK_MESSAGES_PROCESSED, c)
 
+        if self.sig_verification_stage is not None:
+            self.sig_verification_stage.service()
+
         await self.processClientInBox()
         return c
 
@@ -1465,7 +1538,12 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
             if vmsg:
                 logger.trace("{} msg validated {}".format(self, wrappedMsg),
                              extra={"tags": ["node-msg-validation"]})
-                self.unpackNodeMsg(*vmsg)
+                if self._defer_sig_verification(vmsg[0]):
+                    self.sig_verification_stage.add(*vmsg,
+                                                    on_verified=self._on_node_msg_verified,
+                                                    on_failed=self._on_node_msg_not_verified)
+                else:
+                    self.unpackNodeMsg(*vmsg)
             else:
                 logger.debug("{} invalidated msg {}".format(self, wrappedMsg),
                              extra={"tags": ["node-msg-validation"]})
@@ -1497,13 +1575,34 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
             except Exception as ex:
                 raise InvalidNodeMsg(str(ex))
 
-        try:
-            self.verifySignature(message)
-        except BaseExc as ex:
-            raise SuspiciousNode(frm, ex, message) from ex
+        if not self._defer_sig_verification(message):
+            try:
+                self.verifySignature(message)
+            except BaseExc as ex:
+                raise SuspiciousNode(frm, ex, message) from ex
         logger.debug("{} received node message from {}: {}".format(self, frm, message), extra={"cli": False})
         return message, frm
 
+    def _defer_sig_verification(self, msg) -> bool:
+        # Batches are unpacked right away, the messages in them are deferred
+        # in turn, so the order of messages from a sender is kept
+        return self.sig_verification_stage is not None and \
+            not isinstance(msg, Batch)
+
+    def _on_node_msg_verified(self, msg, frm):
+        try:
+            self.unpackNodeMsg(msg, frm)
+        except SuspiciousNode as ex:
+            self.reportSuspiciousNodeEx(ex)
+        except Exception as ex:
+            self.discard(msg, ex, logger.info)
+
+    def _on_node_msg_not_verified(self, msg, frm, ex):
+        if isinstance(ex, BaseExc):
+            self.reportSuspiciousNodeEx(SuspiciousNode(frm, ex, msg))
+        else:
+            self.discard(msg, ex, logger.info)
+
     def unpackNodeMsg(self, msg, frm) -> None:
         """
         If the message is a batch message validate each message in the batch,
@@ -1563,16 +1662,31 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         try:
             vmsg = self.validateClientMsg(wrappedMsg)
             if vmsg:
-                self.unpackClientMsg(*vmsg)
+                if self._defer_sig_verification(vmsg[0]):
+                    self.sig_verification_stage.add(*vmsg,
+                                                    on_verified=self._on_client_msg_verified,
+                                                    on_failed=self._on_client_msg_not_verified)
+                else:
+                    self.unpackClientMsg(*vmsg)
         except BlowUp:
             raise
         except Exception as ex:
-            msg, frm = wrappedMsg
-            friendly = friendlyEx(ex)
-            if isinstance(ex, SuspiciousClient):
-                self.reportSuspiciousClient(frm, friendly)
+            self._on_client_msg_not_verified(*wrappedMsg, ex)
 
-            self.handleInvalidClientMsg(ex, wrappedMsg)
+    def _on_client_msg_verified(self, msg, frm):
+        try:
+            self.unpackClientMsg(msg, frm)
+        except BlowUp:
+            raise
+        except Exception as ex:
+            self._on_client_msg_not_verified(msg, frm, ex)
+
+    def _on_client_msg_not_verified(self, msg, frm, ex):
+        friendly = friendlyEx(ex)
+        if isinstance(ex, SuspiciousClient):
+            self.reportSuspiciousClient(frm, friendly)
+
+        self.handleInvalidClientMsg(ex, (msg, frm))
 
     def handleInvalidClientMsg(self, ex, wrappedMsg):
         msg, frm = wrappedMsg
@@ -1654,7 +1768,8 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
 
         self.replicas.send_to_internal_bus(PreSigVerification(cMsg),
                                            self.master_replica.instId)
-        self.verifySignature(cMsg)
+        if not self._defer_sig_verification(cMsg):
+            self.verifySignature(cMsg)
         logger.trace("{} received CLIENT message: {}".
                      format(self.clientstack.name, cMsg))
         return cMsg, frm
@@ -1750,7 +1865,8 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         self.postRecvTxnFromCatchup(ledger_id, txn)
         if self.write_manager.is_valid_type(typ):
             state = self.getState(ledger_id)
-            if state:
+            # State synced from a snapshot already has the caught up txns
+            if state and not self.ledgerManager.state_synced_from_snapshot(ledger_id):
                 self.write_manager.restore_state(txn, ledger_id)
                 if self.stateTsDbStorage and \
                         (ledger_id == DOMAIN_LEDGER_ID or ledger_id == CONFIG_LEDGER_ID):
@@ -2324,6 +2440,21 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         self.metrics.add_event(MetricsName.DOMAIN_LEDGER_UNCOMMITTED_SIZE, len(self.domainLedger.uncommittedTxns))
         self.metrics.add_event(MetricsName.CONFIG_LEDGER_UNCOMMITTED_SIZE, len(self.configLedger.uncommittedTxns))
 
+        node_cache_stats = [ledger.tree.hashStore.take_stats() for ledger in self.ledgers
+                            if isinstance(ledger.tree.hashStore, CachedHashStore)]
+        self.metrics.add_event(MetricsName.MERKLE_NODE_CACHE_HITS, sum(hits for hits, _ in node_cache_stats))
+        self.metrics.add_event(MetricsName.MERKLE_NODE_CACHE_MISSES, sum(misses for _, misses in node_cache_stats))
+
+        trie_cache_stats = [state.take_node_cache_stats() for state in self.states.values()
+                            if isinstance(state, PruningState)]
+        self.metrics.add_event(MetricsName.STATE_TRIE_NODE_CACHE_HITS, sum(hits for hits, _ in trie_cache_stats))
+        self.metrics.add_event(MetricsName.STATE_TRIE_NODE_CACHE_MISSES,
+                               sum(misses for _, misses in trie_cache_stats))
+
+        pruned_nodes, pruned_bytes = self.state_pruning_service.take_stats()
+        self.metrics.add_event(MetricsName.STATE_PRUNED_NODES, pruned_nodes)
+        self.metrics.add_event(MetricsName.STATE_PRUNED_BYTES, pruned_bytes)
+
         # Collections metrics
         def sum_for_values(obj):
             # We don't want to get 0 if we have huge dictionary of empty queues, hence +1
@@ -2621,12 +2752,14 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         logger.debug('{} ordered previous view batch {} by instance {}'.
                      format(self, pp_seqno, inst_id))
 
-    def verifySignature(self, msg):
+    def verifySignature(self, msg, measure_time=True):
         """
         Validate the signature of the request
         Note: Batch is whitelisted because the inner messages are checked
 
         :param msg: a message requiring signature verification
+        :param measure_time: whether the time taken is added to the metrics,
+            which must not be done from threads other than the node's one
         :return: None; raises an exception if the signature is not valid
         """
         if isinstance(msg, self.authnWhitelist):
@@ -2646,7 +2779,10 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         if not isinstance(req, Mapping):
             req = req.as_dict
 
-        with self.metrics.measure_time(MetricsName.VERIFY_SIGNATURE_TIME):
+        if measure_time:
+            with self.metrics.measure_time(MetricsName.VERIFY_SIGNATURE_TIME):
+                identifiers = self.authNr(req).authenticate(req, key=key)
+        else:
             identifiers = self.authNr(req).authenticate(req, key=key)
 
         logger.debug("{} authenticated {} signature on {} request {}".
@@ -2752,8 +2888,9 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
 
     def commitAndSendReplies(self, three_pc_batch: ThreePcBatch) -> List:
         logger.trace('{} going to commit and send replies to client'.format(self))
-        committed_txns = self.write_manager.commit_batch(three_pc_batch)
-        self.updateSeqNoMap(committed_txns, three_pc_batch.ledger_id)
+        with self.db_manager.batch_commit():
+            committed_txns = self.write_manager.commit_batch(three_pc_batch)
+            self.updateSeqNoMap(committed_txns, three_pc_batch.ledger_id)
         updated_committed_txns = list(map(self.update_txn_with_extra_data, committed_txns))
         self.sendRepliesToClients(updated_committed_txns, three_pc_batch.pp_time)
         return committed_txns
@@ -2825,6 +2962,13 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
                                                             verkey=v.verkey,
                                                             role=role)
 
+    def _invalidate_verkey(self, txn):
+        if get_type(txn) != NYM:
+            return
+        txn_data = get_payload_data(txn)
+        if VERKEY in txn_data:
+            self.clientAuthNr.invalidate_verkey(txn_data[TARGET_NYM])
+
     def addGenesisNyms(self):
         # THIS SHOULD NOT BE DONE FOR PRODUCTION
         for _, txn in self.domainLedger.getAllTxn():
@@ -2836,10 +2980,12 @@ class Node(HasActionQueue, Motor, Propagator, MessageProcessor, HasFileStorage,
         return CoreAuthNr(self.write_manager.txn_types,
                           self.read_manager.txn_types,
                           self.action_manager.txn_types,
-                          state=state)
+                          state=state,
+                          verkey_cache_size=self.config.VERKEY_CACHE_SIZE)
 
     def defaultAuthNr(self) -> ReqAuthenticator:
-        req_authnr = ReqAuthenticator()
+        req_authnr = ReqAuthenticator(max_verified_reqs=self.config.VERIFIED_REQS_CACHE_SIZE,
+                                      verified_req_ttl=self.config.VERIFIED_REQS_TTL)
         req_authnr.register_authenticator(self.init_core_authenticator())
         return req_authnr
 
@@ -1,5 +1,8 @@
+import threading
+import time
+from collections import OrderedDict
 from copy import deepcopy
-from typing import Optional
+from typing import Dict, NamedTuple, Optional, Set
 
 from plenum.common.constants import TXN_TYPE
 from common.error import error
@@ -7,15 +10,35 @@ from plenum.common.exceptions import NoAuthenticatorFound
 from plenum.common.types import OPERATION, f
 from plenum.server.client_authn import ClientAuthNr
 
+VerifiedReq = NamedTuple('VerifiedReq', [('signature', Optional[str]),
+                                         ('signatures', Optional[dict]),
+                                         ('identifiers', Set[str]),
+                                         ('verified_at', float)])
+
 
 class ReqAuthenticator:
     """
     Maintains a list of authenticators. The first authenticator in the list
     of authenticators is the core authenticator
     """
-    def __init__(self):
+    def __init__(self, max_verified_reqs: int = 100000,
+                 verified_req_ttl: float = 600,
+                 get_current_time=time.perf_counter):
+        """
+        :param max_verified_reqs: maximum number of verified requests kept,
+            the oldest ones are forgotten first
+        :param verified_req_ttl: number of seconds a verified request is
+            kept for, unless it is executed earlier
+        """
         self._authenticators = []
-        self._verified_reqs = {}    # type: Dict[str, Dict[str, List[str]]]
+        self._max_verified_reqs = max_verified_reqs
+        self._verified_req_ttl = verified_req_ttl
+        self._get_current_time = get_current_time
+        # Verified requests by their keys, which are digests of the requests
+        # serialized for signing, in the order they were verified. Requests
+        # are authenticated in threads of signature verification as well
+        self._verified_reqs = OrderedDict()  # type: Dict[str, VerifiedReq]
+        self._lock = threading.Lock()
 
     def register_authenticator(self, authenticator: ClientAuthNr):
         self._authenticators.append(authenticator)
@@ -31,8 +54,10 @@ class ReqAuthenticator:
         """
         identifiers = set()
         typ = req_data.get(OPERATION, {}).get(TXN_TYPE)
-        if key and self._check_and_verify_existing_req(req_data, key):
-            return self._verified_reqs[key]['identifiers']
+        if key:
+            verified = self._get_verified_identifiers(req_data, key)
+            if verified is not None:
+                return verified
 
         for authenticator in self._authenticators:
             if authenticator.is_query(typ):
@@ -46,15 +71,41 @@ class ReqAuthenticator:
         if not identifiers:
             raise NoAuthenticatorFound
         if key:
-            self._verified_reqs[key] = {'signature': req_data.get(f.SIG.nm)}
-            self._verified_reqs[key]['identifiers'] = identifiers
+            self._add_verified_req(req_data, key, identifiers)
         return identifiers
 
-    def _check_and_verify_existing_req(self, req_data: dict, key: str):
-        if key in self._verified_reqs:
-            if req_data.get(f.SIG.nm) == self._verified_reqs[key]['signature']:
-                return True
-        return False
+    def _add_verified_req(self, req_data: dict, key: str, identifiers: Set[str]):
+        verified = VerifiedReq(signature=req_data.get(f.SIG.nm),
+                               signatures=req_data.get(f.SIGS.nm),
+                               identifiers=identifiers,
+                               verified_at=self._get_current_time())
+        with self._lock:
+            self._verified_reqs.pop(key, None)
+            self._verified_reqs[key] = verified
+            while self._verified_reqs:
+                oldest = next(iter(self._verified_reqs.values()))
+                if len(self._verified_reqs) <= self._max_verified_reqs and \
+                        verified.verified_at - oldest.verified_at <= self._verified_req_ttl:
+                    break
+                self._verified_reqs.popitem(last=False)
+
+    def _get_verified_identifiers(self, req_data: dict, key: str) -> Optional[Set[str]]:
+        """
+        Return identifiers of the request if it was verified with the same
+        signatures and not too long ago, None otherwise
+        """
+        now = self._get_current_time()
+        with self._lock:
+            verified = self._verified_reqs.get(key)
+            if verified is None:
+                return None
+            if now - verified.verified_at > self._verified_req_ttl:
+                self._verified_reqs.pop(key, None)
+                return None
+        if req_data.get(f.SIG.nm) != verified.signature or \
+                req_data.get(f.SIGS.nm) != verified.signatures:
+            return None
+        return verified.identifiers
 
     @property
     def core_authenticator(self):
@@ -67,6 +118,14 @@ class ReqAuthenticator:
             if isinstance(authnr, authnr_type):
                 return authnr
 
+    def invalidate_verkey(self, identifier):
+        for authnr in self._authenticators:
+            authnr.invalidate_verkey(identifier)
+
+    def clear_verkeys(self):
+        for authnr in self._authenticators:
+            authnr.clear_verkeys()
+
     def clean_from_verified(self, key):
-        if key in self._verified_reqs:
-            self._verified_reqs.pop(key)
+        with self._lock:
+            self._verified_reqs.pop(key, None)
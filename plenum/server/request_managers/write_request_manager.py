@@ -1,6 +1,6 @@
 from _sha256 import sha256
 from datetime import datetime, time
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from common.exceptions import LogicError
 from common.serializers.serialization import pool_state_serializer, config_state_serializer
@@ -42,6 +42,10 @@ class WriteRequestManager(RequestManager):
         self.config = getConfig()
         # TODO: combine dictionary request_handlers with _request_handlers_with_version.
         self._request_handlers_with_version = {}  # type: Dict[Tuple[int, str], List[WriteRequestHandler]]
+        # Handlers of txns applied to the states and of the states being
+        # reverted or replaced, for caches of data read from the states
+        self._txn_applied_handlers = []  # type: List[Callable[[Any], None]]
+        self._state_reverted_handlers = []  # type: List[Callable[[], None]]
 
     def is_valid_ledger_id(self, ledger_id):
         return ledger_id in self.ledger_ids
@@ -91,6 +95,20 @@ class WriteRequestManager(RequestManager):
         if isinstance(handler, PrimaryBatchHandler):
             self.primary_reg_handler = handler
 
+    def subscribe_to_state_updates(self,
+                                   on_txn_applied: Callable[[Any], None],
+                                   on_state_reverted: Callable[[], None]):
+        self._txn_applied_handlers.append(on_txn_applied)
+        self._state_reverted_handlers.append(on_state_reverted)
+
+    def _txn_applied(self, txn):
+        for handler in self._txn_applied_handlers:
+            handler(txn)
+
+    def _state_reverted(self):
+        for handler in self._state_reverted_handlers:
+            handler()
+
     def remove_batch_handler(self, ledger_id):
         del self.batch_handlers[ledger_id]
         self.ledger_ids.remove(ledger_id)
@@ -141,6 +159,7 @@ class WriteRequestManager(RequestManager):
         updated_state = None
         for handler in handlers:
             updated_state = handler.update_state(txn, updated_state, None, is_committed=True)
+        self._txn_applied(txn)
         state = self.database_manager.get_state(ledger_id)
         if state:
             state.commit(rootHash=state.headHash)
@@ -152,6 +171,7 @@ class WriteRequestManager(RequestManager):
         start, txn, updated_state = handlers[0].apply_request(request, batch_ts, None)
         for handler in handlers[1:]:
             _, _, updated_state = handler.apply_request(request, batch_ts, updated_state)
+        self._txn_applied(txn)
         return start, txn
 
     def apply_forced_request(self, request):
@@ -191,6 +211,7 @@ class WriteRequestManager(RequestManager):
         prev_handler_result = handlers[0].post_batch_rejected(ledger_id, None)
         for handler in handlers[1:]:
             prev_handler_result = handler.post_batch_rejected(ledger_id, prev_handler_result)
+        self._state_reverted()
 
     def transform_txn_for_ledger(self, txn):
         handlers = self.request_handlers.get(get_type(txn), None)
@@ -284,6 +305,8 @@ class WriteRequestManager(RequestManager):
         # ToDo: ugly thing, needs to be refactored
         self.audit_b_handler.on_catchup_finished()
         self.node_reg_handler.on_catchup_finished()
+        # States may be synced from a snapshot during catchup
+        self._state_reverted()
 
     def get_lid_for_request(self, request: Request):
         if request.operation.get(TXN_TYPE) is None:
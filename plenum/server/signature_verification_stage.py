@@ -0,0 +1,91 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+from plenum.common.metrics_collector import MetricsCollector, MetricsName, NullMetricsCollector
+
+OnVerified = Callable[[Any, str], None]
+OnFailed = Callable[[Any, str, Exception], None]
+
+
+class SignatureVerificationStage:
+    """
+    Collects messages received during a looper tick whose signatures have
+    to be verified and verifies them at once on a pool of threads, as
+    Ed25519 verification releases the GIL. Messages are then passed on in
+    the order they were added, whether they needed verification or not,
+    so that the order of messages from a sender is kept.
+
+    Metrics collectors are not thread safe, so `verify` must not use one,
+    the time taken to verify all the messages is measured by the stage.
+    """
+
+    def __init__(self,
+                 verify: Callable[[Any], None],
+                 needs_verification: Callable[[Any], bool],
+                 workers: int,
+                 metrics: MetricsCollector = NullMetricsCollector()):
+        """
+        :param verify: verifies signatures of a message, raises if they
+            are not valid
+        :param needs_verification: whether a message has signatures
+        :param workers: number of verifying threads
+        """
+        self._verify = verify
+        self._metrics = metrics
+        self._needs_verification = needs_verification
+        self._workers = workers
+        self._executor = None  # type: Optional[ThreadPoolExecutor]
+        self._pending = []  # type: List[Tuple[Any, str, OnVerified, OnFailed]]
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def add(self, msg, frm: str, on_verified: OnVerified, on_failed: OnFailed):
+        self._pending.append((msg, frm, on_verified, on_failed))
+
+    def service(self) -> int:
+        """
+        Verify all the added messages and pass them on
+
+        :return: the number of messages passed on
+        """
+        pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+
+        needed = [self._needs_verification(msg) for msg, _, _, _ in pending]
+        to_verify = [item[0] for item, need in zip(pending, needed) if need]
+        with self._metrics.measure_time(MetricsName.VERIFY_SIGNATURES_BATCH_TIME):
+            if len(to_verify) > 1:
+                results = list(self.executor.map(self._try_verify, to_verify))
+            else:
+                results = [self._try_verify(msg) for msg in to_verify]
+        results = iter(results)
+
+        for (msg, frm, on_verified, on_failed), need in zip(pending, needed):
+            ex = next(results) if need else None
+            if ex is None:
+                on_verified(msg, frm)
+            else:
+                on_failed(msg, frm, ex)
+        return len(pending)
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers,
+                                                thread_name_prefix='sig_verification')
+        return self._executor
+
+    def _try_verify(self, msg) -> Optional[Exception]:
+        try:
+            self._verify(msg)
+        except Exception as ex:
+            return ex
+        return None
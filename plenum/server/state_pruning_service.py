@@ -0,0 +1,153 @@
+from itertools import chain
+from typing import Callable, Dict, Iterable, List, Optional
+
+from common.serializers.serialization import state_roots_serializer
+from plenum.common.constants import AUDIT_LEDGER_ID, AUDIT_TXN_STATE_ROOT
+from plenum.common.timer import TimerService, RepeatingTimer
+from plenum.common.txn_util import get_payload_data
+from plenum.common.util import get_utc_epoch
+from plenum.server.database_manager import DatabaseManager
+from state.pruning_state import PruningState
+from state.state_pruner import StatePruner
+from stp_core.common.log import getlogger
+
+logger = getlogger()
+
+
+class StatePruningService:
+    """
+    Deletes state trie nodes which are no longer needed, one ledger's state
+    at a time and a limited number of nodes per timer tick, so that ordering
+    is not blocked.
+
+    Roots kept are the state roots of the last `STATE_PRUNING_KEEP_ROOTS`
+    committed and all uncommitted audit txns, the current roots of the
+    state and the roots of the timestamp store which are not older than
+    `STATE_PRUNING_KEEP_TS_ROOTS_FOR` seconds (all of them if it is None),
+    as they are used for reads of the state in the past.
+    """
+
+    def __init__(self,
+                 config: object,
+                 timer: TimerService,
+                 db_manager: DatabaseManager,
+                 can_prune: Callable[[], bool]):
+        self._config = config
+        self._timer = timer
+        self._db_manager = db_manager
+        self._can_prune = can_prune
+
+        self._pruners = {}  # type: Dict[int, StatePruner]
+        # Time of the start of the last pruning cycle of every ledger's state
+        self._last_started = {}  # type: Dict[int, float]
+        self._current = None  # type: Optional[int]
+        self._pruned_nodes = 0
+        self._pruned_bytes = 0
+        self._step_timer = RepeatingTimer(self._timer,
+                                          config.STATE_PRUNING_STEP_INTERVAL,
+                                          self._step,
+                                          active=False)
+
+    def start(self):
+        self._step_timer.start()
+
+    def stop(self):
+        self._step_timer.stop()
+        self._reset()
+
+    def take_stats(self):
+        """
+        Return the number of deleted trie nodes and the number of bytes
+        they took since the last call
+        """
+        stats = self._pruned_nodes, self._pruned_bytes
+        self._pruned_nodes = 0
+        self._pruned_bytes = 0
+        return stats
+
+    def _reset(self):
+        for pruner in self._pruners.values():
+            pruner.stop()
+        self._current = None
+
+    def _step(self):
+        if not self._can_prune():
+            # State is going to be rebuilt or installed from a snapshot,
+            # nodes marked so far can't be relied upon
+            if self._current is not None:
+                logger.info("{} abandoned pruning of state of ledger {}".format(self, self._current))
+                # so that it is started again as soon as possible
+                self._last_started.pop(self._current, None)
+            self._reset()
+            return
+
+        if self._current is None:
+            self._current = self._next_ledger_to_prune()
+            if self._current is None:
+                return
+            self._start_pruning(self._current)
+
+        pruner = self._pruners[self._current]
+        running = pruner.step(self._config.STATE_PRUNING_NODES_PER_STEP)
+        nodes, size = pruner.take_stats()
+        self._pruned_nodes += nodes
+        self._pruned_bytes += size
+        if not running:
+            logger.info("{} finished pruning of state of ledger {}".format(self, self._current))
+            self._current = None
+
+    def _next_ledger_to_prune(self) -> Optional[int]:
+        now = self._timer.get_current_time()
+        due = []
+        for ledger_id, state in self._db_manager.states.items():
+            if not isinstance(state, PruningState):
+                continue
+            last_started = self._last_started.get(ledger_id)
+            if last_started is None:
+                return ledger_id
+            if now - last_started >= self._config.STATE_PRUNING_PERIOD:
+                due.append((last_started, ledger_id))
+        return min(due)[1] if due else None
+
+    def _start_pruning(self, ledger_id: int):
+        state = self._db_manager.get_state(ledger_id)
+        pruner = self._pruners.get(ledger_id)
+        if pruner is None:
+            pruner = self._pruners[ledger_id] = StatePruner(state)
+        self._last_started[ledger_id] = self._timer.get_current_time()
+
+        # Roots from the audit ledger are collected right away, as they
+        # move from uncommitted to committed txns while pruning
+        roots = [state.committedHeadHash, state.headHash]
+        roots.extend(self._audit_state_roots(ledger_id))
+        logger.info("{} started pruning of state of ledger {}".format(self, ledger_id))
+        pruner.start(chain(roots, self._ts_store_roots(ledger_id)))
+
+    def _audit_state_roots(self, ledger_id: int) -> List[bytes]:
+        audit_ledger = self._db_manager.get_ledger(AUDIT_LEDGER_ID)
+        if audit_ledger is None:
+            return []
+
+        first = max(audit_ledger.size - self._config.STATE_PRUNING_KEEP_ROOTS + 1, 1)
+        txns = [txn for _, txn in audit_ledger.getAllTxn(frm=first, to=audit_ledger.size)] \
+            if audit_ledger.size else []
+        txns.extend(audit_ledger.uncommittedTxns)
+
+        roots = []
+        for txn in txns:
+            # Roots of ledgers not changed by a batch are not in its txn
+            root = get_payload_data(txn)[AUDIT_TXN_STATE_ROOT].get(ledger_id)
+            if isinstance(root, str):
+                roots.append(state_roots_serializer.deserialize(root))
+        return roots
+
+    def _ts_store_roots(self, ledger_id: int) -> Iterable[bytes]:
+        ts_store = self._db_manager.ts_store
+        if ts_store is None:
+            return ()
+        keep_for = self._config.STATE_PRUNING_KEEP_TS_ROOTS_FOR
+        from_ts = None if keep_for is None else get_utc_epoch() - keep_for
+        return ts_store.get_roots(from_ts, ledger_id)
+
+    def __repr__(self):
+        return "StatePruningService"
@@ -4,6 +4,9 @@ from plenum.common.constants import BLS_LABEL, TS_LABEL, IDR_CACHE_LABEL, ATTRIB
 from plenum.test.testing_utils import FakeSomething
 from plenum.server.database_manager import DatabaseManager, Database
 from common.exceptions import LogicError
+from plenum.persistence.req_id_to_txn import ReqIdrToTxn
+from storage.kv_in_memory import KeyValueStorageInMemory
+from storage.state_ts_store import StateTsDbStorage
 
 
 @pytest.fixture(scope='function')
@@ -85,3 +88,50 @@ def test_database():
 
     assert db.ledger == led
     assert db.state == st
+
+
+def test_batch_commit():
+    database_manager = DatabaseManager(group_commit=True)
+    seq_no_kv = KeyValueStorageInMemory()
+    ts_kv = KeyValueStorageInMemory()
+    seq_no_db = ReqIdrToTxn(database_manager.coordinated_storage(seq_no_kv))
+    ts_store = StateTsDbStorage('ts', {1: database_manager.coordinated_storage(ts_kv)})
+
+    with database_manager.batch_commit():
+        seq_no_db.addBatch([('digest', 1, 10, 'full_digest')])
+        ts_store.set(100, b'root', 1)
+        assert seq_no_kv.size == 0
+        assert ts_kv.size == 0
+        assert seq_no_db.get_by_payload_digest('digest') == (1, 10)
+    assert seq_no_kv.size == 2
+    assert ts_kv.get('100') == b'root'
+
+
+def test_failed_batch_commit_writes_nothing():
+    database_manager = DatabaseManager(group_commit=True)
+    seq_no_kv = KeyValueStorageInMemory()
+    ts_kv = KeyValueStorageInMemory()
+    seq_no_db = ReqIdrToTxn(database_manager.coordinated_storage(seq_no_kv))
+    ts_store = StateTsDbStorage('ts', {1: database_manager.coordinated_storage(ts_kv)})
+
+    with pytest.raises(ValueError):
+        with database_manager.batch_commit():
+            seq_no_db.addBatch([('digest', 1, 10, 'full_digest')])
+            ts_store.set(100, b'root', 1)
+            raise ValueError('commit failed')
+    assert seq_no_kv.size == 0
+    assert ts_kv.size == 0
+
+    # Next batch is not affected
+    with database_manager.batch_commit():
+        ts_store.set(200, b'other_root', 1)
+    assert ts_kv.size == 1
+    assert seq_no_db.get_by_payload_digest('digest') == (None, None)
+
+
+def test_batch_commit_disabled(database_manager: DatabaseManager):
+    kv = KeyValueStorageInMemory()
+    assert database_manager.coordinated_storage(kv) is kv
+    with database_manager.batch_commit():
+        kv.put('k', 'v')
+    assert kv.get('k') == b'v'
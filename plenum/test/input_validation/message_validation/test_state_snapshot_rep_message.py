@@ -0,0 +1,25 @@
+from plenum.common.messages.node_messages import StateSnapshotRep
+from collections import OrderedDict
+from plenum.common.messages.fields import \
+    LedgerIdField, MerkleRootField, IterableField
+
+EXPECTED_ORDERED_FIELDS = OrderedDict([
+    ("ledgerId", LedgerIdField),
+    ("stateRootHash", MerkleRootField),
+    ("trieNodes", IterableField),
+])
+
+
+def test_hash_expected_type():
+    assert StateSnapshotRep.typename == "STATE_SNAPSHOT_REP"
+
+
+def test_has_expected_fields():
+    actual_field_names = OrderedDict(StateSnapshotRep.schema).keys()
+    assert list(actual_field_names) == list(EXPECTED_ORDERED_FIELDS.keys())
+
+
+def test_has_expected_validators():
+    schema = dict(StateSnapshotRep.schema)
+    for field, validator in EXPECTED_ORDERED_FIELDS.items():
+        assert isinstance(schema[field], validator)
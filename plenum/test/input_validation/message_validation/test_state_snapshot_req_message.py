@@ -0,0 +1,34 @@
+import pytest
+from plenum.common.ledger import Ledger
+from plenum.common.messages.node_messages import StateSnapshotReq
+from collections import OrderedDict
+from plenum.common.messages.fields import \
+    LedgerIdField, MerkleRootField, IterableField
+
+EXPECTED_ORDERED_FIELDS = OrderedDict([
+    ("ledgerId", LedgerIdField),
+    ("stateRootHash", MerkleRootField),
+    ("hashes", IterableField),
+])
+
+
+def test_hash_expected_type():
+    assert StateSnapshotReq.typename == "STATE_SNAPSHOT_REQ"
+
+
+def test_has_expected_fields():
+    actual_field_names = OrderedDict(StateSnapshotReq.schema).keys()
+    assert list(actual_field_names) == list(EXPECTED_ORDERED_FIELDS.keys())
+
+
+def test_has_expected_validators():
+    schema = dict(StateSnapshotReq.schema)
+    for field, validator in EXPECTED_ORDERED_FIELDS.items():
+        assert isinstance(schema[field], validator)
+
+
+def test_no_hashes_are_invalid():
+    root = Ledger.hashToStr(b'\x01' * 32)
+    StateSnapshotReq(1, root, [root])
+    with pytest.raises(TypeError):
+        StateSnapshotReq(1, root, [])
@@ -0,0 +1,174 @@
+import json
+import logging
+from typing import List, Any, Optional, Callable
+
+import pytest
+
+from common.serializers.msgpack_serializer import MsgPackSerializer
+from ledger.merkle_verifier import MerkleVerifier
+from ledger.test.helper import random_txn, create_ledger_leveldb_storage
+# noinspection PyUnresolvedReferences
+from ledger.test.conftest import tempdir  # noqa
+from plenum.common.channel import create_direct_channel
+from plenum.common.ledger import Ledger
+from plenum.common.messages.node_messages import CatchupRep, CatchupReq
+from plenum.server.catchup.seeder_service import NodeSeederService
+from plenum.server.catchup.utils import CatchupDataProvider
+from state.pruning_state import PruningState
+from state.state import State
+
+LEDGER_ID = 0
+LEDGER_SIZE = 60
+
+
+class FakeSeederProvider(CatchupDataProvider):
+    def __init__(self, ledger):
+        self._ledger = ledger
+        self.sent = []
+        self.extra_data_calls = 0
+
+    def node_name(self) -> str:
+        return 'Seeder'
+
+    def all_nodes_names(self) -> List[str]:
+        pass
+
+    def ledgers(self) -> List[int]:
+        return [LEDGER_ID]
+
+    def ledger(self, ledger_id: int) -> Ledger:
+        if ledger_id == LEDGER_ID:
+            return self._ledger
+
+    def config_state(self) -> State:
+        pass
+
+    def state(self, ledger_id: int) -> Optional[PruningState]:
+        pass
+
+    def verifier(self, ledger_id: int) -> MerkleVerifier:
+        pass
+
+    def eligible_nodes(self) -> List[str]:
+        pass
+
+    def update_txn_with_extra_data(self, txn: dict) -> dict:
+        self.extra_data_calls += 1
+        txn['extra'] = 'data'
+        return txn
+
+    def transform_txn_for_ledger(self, txn: dict) -> dict:
+        pass
+
+    def notify_catchup_start(self, ledger_id: int):
+        pass
+
+    def notify_catchup_complete(self, ledger_id: int):
+        pass
+
+    def notify_transaction_added_to_ledger(self, ledger_id: int, txn: dict):
+        pass
+
+    def send_to(self, msg: Any, to: str, message_splitter: Optional[Callable] = None):
+        self.sent.append(msg)
+
+    def send_to_nodes(self, msg: Any, nodes=None):
+        pass
+
+    def blacklist_node(self, node_name: str, reason: str):
+        pass
+
+    def discard(self, msg, reason, logMethod=logging.error, cliOutput=False):
+        pass
+
+
+@pytest.fixture()
+def ledger(tempdir):
+    ledger = create_ledger_leveldb_storage(MsgPackSerializer(), MsgPackSerializer(), tempdir)
+    for i in range(LEDGER_SIZE):
+        ledger.add(random_txn(i))
+    yield ledger
+    ledger.stop()
+
+
+@pytest.fixture()
+def create_seeder(ledger, tconf, monkeypatch):
+    def _create(serialized=True, msg_len_limit=None, txn_cache_size=None):
+        monkeypatch.setattr(tconf, 'BUILD_CATCHUP_REP_SERIALIZED', serialized)
+        if msg_len_limit is not None:
+            monkeypatch.setattr(tconf, 'MSG_LEN_LIMIT', msg_len_limit)
+        if txn_cache_size is not None:
+            monkeypatch.setattr(tconf, 'CATCHUP_REP_TXN_CACHE_SIZE', txn_cache_size)
+        provider = FakeSeederProvider(ledger)
+        _, rx = create_direct_channel()
+        return NodeSeederService(rx, provider, tconf), provider
+
+    return _create
+
+
+def as_received(msg):
+    if isinstance(msg, CatchupRep):
+        msg = json.dumps(msg._asdict())
+    return CatchupRep(**json.loads(msg))
+
+
+def test_serialized_catchup_rep_same_as_catchup_rep(create_seeder):
+    req = CatchupReq(LEDGER_ID, 3, 40, LEDGER_SIZE)
+    seeder, provider = create_seeder(serialized=False)
+    seeder.process_catchup_req(req, 'Node1')
+    fast_seeder, fast_provider = create_seeder(serialized=True)
+    fast_seeder.process_catchup_req(req, 'Node1')
+
+    assert len(fast_provider.sent) == 1
+    assert isinstance(fast_provider.sent[0], bytes)
+    assert as_received(fast_provider.sent[0]) == as_received(provider.sent[0])
+
+
+def test_serialized_catchup_rep_is_split(create_seeder, ledger):
+    msg_len_limit = 3000
+    seeder, provider = create_seeder(msg_len_limit=msg_len_limit)
+    seeder.process_catchup_req(CatchupReq(LEDGER_ID, 3, 50, LEDGER_SIZE), 'Node1')
+
+    assert len(provider.sent) > 1
+    seq_nos = []
+    for msg in provider.sent:
+        assert len(msg) <= msg_len_limit
+        rep = as_received(msg)
+        txns = sorted(int(seq_no) for seq_no in rep.txns)
+        assert rep.consProof == \
+            seeder._make_consistency_proof(ledger, txns[-1], LEDGER_SIZE)
+        seq_nos += txns
+    assert seq_nos == list(range(3, 51))
+
+
+def test_serialized_txns_are_cached(create_seeder):
+    req = CatchupReq(LEDGER_ID, 11, 30, LEDGER_SIZE)
+    seeder, provider = create_seeder()
+    seeder.process_catchup_req(req, 'Node1')
+    assert provider.extra_data_calls == 20
+    seeder.process_catchup_req(req, 'Node2')
+    assert provider.extra_data_calls == 20
+    assert provider.sent[0] == provider.sent[1]
+
+    seeder, provider = create_seeder(txn_cache_size=0)
+    seeder.process_catchup_req(req, 'Node1')
+    seeder.process_catchup_req(req, 'Node2')
+    assert provider.extra_data_calls == 40
+    assert provider.sent[0] == provider.sent[1]
+
+
+def test_consistency_proofs_are_cached(create_seeder, ledger, monkeypatch):
+    seeder, provider = create_seeder()
+    proofs = []
+    make_proof = ledger.tree.consistency_proof
+
+    def consistency_proof(first, second):
+        proofs.append((first, second))
+        return make_proof(first, second)
+
+    monkeypatch.setattr(ledger.tree, 'consistency_proof', consistency_proof)
+    for frm in ('Node1', 'Node2', 'Node3'):
+        seeder.process_catchup_req(CatchupReq(LEDGER_ID, 1, 20, LEDGER_SIZE), frm)
+        seeder.process_catchup_req(CatchupReq(LEDGER_ID, 21, 40, LEDGER_SIZE), frm)
+    assert proofs == [(20, LEDGER_SIZE), (40, LEDGER_SIZE)]
+    assert len(set(provider.sent)) == 2
@@ -17,6 +17,7 @@ from plenum.common.messages.node_messages import ConsistencyProof
 from plenum.common.metrics_collector import NullMetricsCollector
 from plenum.server.catchup.catchup_rep_service import CatchupRepService
 from plenum.server.catchup.utils import CatchupDataProvider, CatchupTill
+from state.pruning_state import PruningState
 from state.state import State
 
 
@@ -53,6 +54,9 @@ def create_fake_catchup_rep_service(ledger: Ledger):
         def config_state(self) -> State:
             pass
 
+        def state(self, ledger_id: int) -> Optional[PruningState]:
+            pass
+
         def verifier(self, ledger_id: int) -> MerkleVerifier:
             pass
 
@@ -0,0 +1,212 @@
+import logging
+from typing import List, Any, Optional, Callable
+
+import pytest
+
+from ledger.merkle_verifier import MerkleVerifier
+from plenum.common.channel import create_direct_channel
+from plenum.common.ledger import Ledger
+from plenum.common.messages.node_messages import StateSnapshotReq, StateSnapshotRep
+from plenum.common.metrics_collector import NullMetricsCollector
+from plenum.server.catchup.seeder_service import NodeSeederService
+from plenum.server.catchup.state_snapshot_service import StateSnapshotService
+from plenum.server.catchup.utils import CatchupDataProvider, StateSnapshotComplete
+from plenum.test.helper import MockTimer
+from state.pruning_state import PruningState
+from state.state import State
+from state.trie.pruning_trie import BLANK_ROOT
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+LEDGER_ID = 1
+NODES = ['Alpha', 'Beta', 'Gamma']
+
+
+class FakeStateProvider(CatchupDataProvider):
+    def __init__(self, name, state):
+        self._name = name
+        self._state = state
+        self.sent = []
+        self.eligible = list(NODES)
+
+    def node_name(self) -> str:
+        return self._name
+
+    def all_nodes_names(self) -> List[str]:
+        return NODES
+
+    def ledgers(self) -> List[int]:
+        return [LEDGER_ID]
+
+    def ledger(self, ledger_id: int) -> Ledger:
+        pass
+
+    def config_state(self) -> State:
+        pass
+
+    def state(self, ledger_id: int) -> Optional[PruningState]:
+        if ledger_id == LEDGER_ID:
+            return self._state
+
+    def verifier(self, ledger_id: int) -> MerkleVerifier:
+        pass
+
+    def eligible_nodes(self) -> List[str]:
+        return self.eligible
+
+    def update_txn_with_extra_data(self, txn: dict) -> dict:
+        return txn
+
+    def transform_txn_for_ledger(self, txn: dict) -> dict:
+        return txn
+
+    def notify_catchup_start(self, ledger_id: int):
+        pass
+
+    def notify_catchup_complete(self, ledger_id: int):
+        pass
+
+    def notify_transaction_added_to_ledger(self, ledger_id: int, txn: dict):
+        pass
+
+    def send_to(self, msg: Any, to: str, message_splitter: Optional[Callable] = None):
+        self.sent.append((msg, to))
+
+    def send_to_nodes(self, msg: Any, nodes=None):
+        pass
+
+    def blacklist_node(self, node_name: str, reason: str):
+        pass
+
+    def discard(self, msg, reason, logMethod=logging.error, cliOutput=False):
+        pass
+
+
+def create_state(size):
+    state = PruningState(KeyValueStorageInMemory())
+    for i in range(size):
+        state.set(str(i).encode(), str(i * i).encode())
+    state.commit(state.headHash)
+    return state
+
+
+@pytest.fixture()
+def seeder(tconf):
+    provider = FakeStateProvider('Alpha', create_state(500))
+    _, rx = create_direct_channel()
+    return NodeSeederService(rx, provider, tconf), provider
+
+
+@pytest.fixture()
+def leecher(tconf):
+    timer = MockTimer()
+    provider = FakeStateProvider('Delta', PruningState(KeyValueStorageInMemory()))
+    output, output_rx = create_direct_channel()
+    completed = []
+    output_rx.subscribe(lambda msg: completed.append(msg))
+    _, rx = create_direct_channel()
+    service = StateSnapshotService(ledger_id=LEDGER_ID,
+                                   config=tconf,
+                                   input=rx,
+                                   output=output,
+                                   timer=timer,
+                                   metrics=NullMetricsCollector(),
+                                   provider=provider)
+    return service, provider, timer, completed
+
+
+def serve(seeder, leecher, silent=()):
+    seeder_service, seeder_provider = seeder
+    service, provider, _, _ = leecher
+    while True:
+        sent = [(req, to) for req, to in provider.sent if to not in silent]
+        provider.sent = [(req, to) for req, to in provider.sent if to in silent]
+        if not sent:
+            return
+        for req, to in sent:
+            seeder_service.process_state_snapshot_req(req, to)
+            rep, _ = seeder_provider.sent.pop()
+            service.process_state_snapshot_rep(rep, to)
+
+
+def test_seeder_sends_subtrees(seeder):
+    service, provider = seeder
+    state = provider.state(LEDGER_ID)
+    root = Ledger.hashToStr(state.committedHeadHash)
+    service.process_state_snapshot_req(StateSnapshotReq(LEDGER_ID, root, [root]), 'Delta')
+
+    rep, to = provider.sent.pop()
+    assert to == 'Delta'
+    assert isinstance(rep, StateSnapshotRep)
+    assert rep.stateRootHash == root
+    assert 1 < len(rep.trieNodes) <= service._config.STATE_SNAPSHOT_MAX_NODES_PER_REP
+
+
+def test_seeder_reply_fits_message(seeder, tconf, monkeypatch):
+    monkeypatch.setattr(tconf, 'MSG_LEN_LIMIT', 4096)
+    service, provider = seeder
+    state = provider.state(LEDGER_ID)
+    root = Ledger.hashToStr(state.committedHeadHash)
+    service.process_state_snapshot_req(StateSnapshotReq(LEDGER_ID, root, [root]), 'Delta')
+
+    rep, _ = provider.sent.pop()
+    assert rep.trieNodes
+    assert sum(len(node) + 3 for node in rep.trieNodes) <= 4096
+
+
+def test_seeder_without_state_sends_nothing(seeder):
+    service, provider = seeder
+    unknown = Ledger.hashToStr(b'\x01' * 32)
+    service.process_state_snapshot_req(StateSnapshotReq(LEDGER_ID, unknown, [unknown]), 'Delta')
+
+    rep, _ = provider.sent.pop()
+    assert rep.trieNodes == []
+
+
+def test_state_is_synced_from_seeders(seeder, leecher, tconf, monkeypatch):
+    monkeypatch.setattr(tconf, 'STATE_SNAPSHOT_MAX_NODES_PER_REP', 10)
+    monkeypatch.setattr(tconf, 'STATE_SNAPSHOT_HASHES_PER_REQ', 2)
+    seeder_state = seeder[1].state(LEDGER_ID)
+    service, provider, _, completed = leecher
+    service.start(Ledger.hashToStr(seeder_state.committedHeadHash))
+    # Only the root is known at first
+    assert len(provider.sent) == 1
+
+    seeder[0].process_state_snapshot_req(*provider.sent.pop())
+    service.process_state_snapshot_rep(seeder[1].sent.pop()[0], NODES[0])
+    # Subtrees of the root are spread among nodes
+    assert {to for _, to in provider.sent} == set(NODES)
+
+    serve(seeder, leecher)
+
+    assert len(completed) == 1
+    assert isinstance(completed[0], StateSnapshotComplete)
+    assert completed[0].num_nodes > 0
+    assert not service.is_working()
+    state = provider.state(LEDGER_ID)
+    assert state.committedHeadHash == seeder_state.committedHeadHash
+    assert state.headHash == seeder_state.committedHeadHash
+    assert state.as_dict == seeder_state.as_dict
+
+
+def test_silent_node_is_replaced(seeder, leecher, tconf, monkeypatch):
+    monkeypatch.setattr(tconf, 'STATE_SNAPSHOT_MAX_NODES_PER_REP', 10)
+    seeder_state = seeder[1].state(LEDGER_ID)
+    service, provider, timer, completed = leecher
+    service.start(Ledger.hashToStr(seeder_state.committedHeadHash))
+    _, silent = provider.sent[0]
+
+    serve(seeder, leecher, silent=(silent,))
+    assert not completed
+    timer.sleep(tconf.STATE_SNAPSHOT_REQ_TIMEOUT)
+    serve(seeder, leecher, silent=(silent,))
+
+    assert completed
+    assert provider.state(LEDGER_ID).as_dict == seeder_state.as_dict
+
+
+def test_known_state_is_not_requested(leecher):
+    service, provider, _, completed = leecher
+    service.start(Ledger.hashToStr(BLANK_ROOT))
+
+    assert not provider.sent
+    assert completed == [StateSnapshotComplete(ledger_id=LEDGER_ID, num_nodes=0)]
@@ -0,0 +1,270 @@
+import logging
+import os
+from typing import List, Any, Optional, Callable
+
+import pytest
+
+from common.serializers.msgpack_serializer import MsgPackSerializer
+from ledger.compact_merkle_tree import CompactMerkleTree
+from ledger.hash_stores.file_hash_store import FileHashStore
+from ledger.merkle_verifier import MerkleVerifier
+# noinspection PyUnresolvedReferences
+from ledger.test.conftest import tempdir  # noqa
+from plenum.common.channel import create_direct_channel
+from plenum.common.ledger import Ledger
+from plenum.common.messages.node_messages import CatchupRep
+from plenum.common.metrics_collector import NullMetricsCollector
+from plenum.common.txn_util import init_empty_txn, set_payload_data
+from plenum.common.util import SortedDict
+from plenum.server.catchup.catchup_rep_service import CatchupRepService
+from plenum.server.catchup.utils import CatchupDataProvider, CatchupTill, LedgerCatchupStart, \
+    LedgerCatchupComplete
+from plenum.test.helper import MockTimer
+from state.pruning_state import PruningState
+from state.state import State
+from storage.kv_store_leveldb_int_keys import KeyValueStorageLeveldbIntKeys
+
+LEDGER_ID = 1
+LEDGER_SIZE = 300
+NODES = ['Alpha', 'Beta', 'Gamma']
+
+
+class FakeLeecherProvider(CatchupDataProvider):
+    def __init__(self, ledger):
+        self._ledger = ledger
+        self.sent = []
+        self.blacklisted = []
+
+    def node_name(self) -> str:
+        return 'Delta'
+
+    def all_nodes_names(self) -> List[str]:
+        return NODES + ['Delta']
+
+    def ledgers(self) -> List[int]:
+        return [LEDGER_ID]
+
+    def ledger(self, ledger_id: int) -> Ledger:
+        if ledger_id == LEDGER_ID:
+            return self._ledger
+
+    def config_state(self) -> State:
+        pass
+
+    def state(self, ledger_id: int) -> Optional[PruningState]:
+        pass
+
+    def verifier(self, ledger_id: int) -> MerkleVerifier:
+        return MerkleVerifier()
+
+    def eligible_nodes(self) -> List[str]:
+        return [node for node in NODES if node not in self.blacklisted]
+
+    def update_txn_with_extra_data(self, txn: dict) -> dict:
+        return txn
+
+    def transform_txn_for_ledger(self, txn: dict) -> dict:
+        return txn
+
+    def notify_catchup_start(self, ledger_id: int):
+        pass
+
+    def notify_catchup_complete(self, ledger_id: int):
+        pass
+
+    def notify_transaction_added_to_ledger(self, ledger_id: int, txn: dict):
+        pass
+
+    def send_to(self, msg: Any, to: str, message_splitter: Optional[Callable] = None):
+        self.sent.append((msg, to))
+
+    def send_to_nodes(self, msg: Any, nodes=None):
+        pass
+
+    def blacklist_node(self, node_name: str, reason: str):
+        self.blacklisted.append(node_name)
+
+    def discard(self, msg, reason, logMethod=logging.error, cliOutput=False):
+        pass
+
+
+def create_ledger(data_dir):
+    os.makedirs(data_dir)
+    return Ledger(CompactMerkleTree(hashStore=FileHashStore(dataDir=data_dir)),
+                  dataDir=data_dir,
+                  transactionLogStore=KeyValueStorageLeveldbIntKeys(data_dir, 'transactions'),
+                  txn_serializer=MsgPackSerializer(),
+                  hash_serializer=MsgPackSerializer())
+
+
+@pytest.fixture()
+def seeder_ledger(tempdir):
+    ledger = create_ledger(os.path.join(tempdir, 'seeder'))
+    for i in range(LEDGER_SIZE):
+        ledger.add(set_payload_data(init_empty_txn('1'), {'value': i}))
+    yield ledger
+    ledger.stop()
+
+
+@pytest.fixture()
+def leecher_ledger(tempdir):
+    ledger = create_ledger(os.path.join(tempdir, 'leecher'))
+    yield ledger
+    ledger.stop()
+
+
+@pytest.fixture()
+def window_conf(tconf, monkeypatch):
+    monkeypatch.setattr(tconf, 'CATCHUP_WINDOW_SIZE', 2)
+    monkeypatch.setattr(tconf, 'CATCHUP_INITIAL_BATCH_SIZE', 10)
+    monkeypatch.setattr(tconf, 'CATCHUP_BATCH_SIZE', 5)
+    monkeypatch.setattr(tconf, 'CATCHUP_MAX_BATCH_SIZE', 40)
+    monkeypatch.setattr(tconf, 'CATCHUP_TARGET_REPLY_TIME', 1)
+    monkeypatch.setattr(tconf, 'CatchupTransactionsTimeout', 6)
+    return tconf
+
+
+@pytest.fixture()
+def leecher(window_conf, leecher_ledger, seeder_ledger):
+    timer = MockTimer()
+    provider = FakeLeecherProvider(leecher_ledger)
+    output, output_rx = create_direct_channel()
+    completed = []
+    output_rx.subscribe(lambda msg: completed.append(msg))
+    _, input_rx = create_direct_channel()
+    service = CatchupRepService(ledger_id=LEDGER_ID,
+                                config=window_conf,
+                                input=input_rx,
+                                output=output,
+                                timer=timer,
+                                metrics=NullMetricsCollector(),
+                                provider=provider)
+    catchup_till = CatchupTill(start_size=0,
+                               final_size=seeder_ledger.size,
+                               final_hash=seeder_ledger.root_hash)
+    service.start(LedgerCatchupStart(ledger_id=LEDGER_ID,
+                                     catchup_till=catchup_till,
+                                     nodes_ledger_sizes={node: seeder_ledger.size for node in NODES}))
+    return service, provider, timer, completed
+
+
+def reply(seeder_ledger, req) -> CatchupRep:
+    txns = {str(seq_no): txn for seq_no, txn in seeder_ledger.getAllTxn(req.seqNoStart, req.seqNoEnd)}
+    cons_proof = seeder_ledger.tree.consistency_proof(req.seqNoEnd, req.catchupTill)
+    return CatchupRep(LEDGER_ID, SortedDict(txns), [Ledger.hashToStr(p) for p in cons_proof])
+
+
+def take_sent(provider, node=None):
+    sent = [(req, to) for req, to in provider.sent if node is None or to == node]
+    provider.sent = [(req, to) for req, to in provider.sent if (req, to) not in sent]
+    return sent
+
+
+def answer_all(service, provider, seeder_ledger, timer, delay=0.1, skip=()):
+    while True:
+        sent = [(req, to) for req, to in take_sent(provider) if to not in skip]
+        if not sent:
+            return
+        timer.sleep(delay)
+        for req, to in sent:
+            service.process_catchup_rep(reply(seeder_ledger, req), to)
+
+
+def test_requests_are_sent_in_window(leecher):
+    service, provider, timer, _ = leecher
+    sent = take_sent(provider)
+    assert len(sent) == 2 * len(NODES)
+    for node in NODES:
+        assert sum(1 for _, to in sent if to == node) == 2
+
+    # Requested ranges follow each other from the start of the ledger
+    ranges = sorted((req.seqNoStart, req.seqNoEnd) for req, _ in sent)
+    assert ranges[0][0] == 1
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert start == end + 1
+    assert all(end - start + 1 == 10 for start, end in ranges)
+
+
+def test_prefix_is_applied_while_other_requests_in_flight(leecher, seeder_ledger, leecher_ledger):
+    service, provider, timer, _ = leecher
+    sent = sorted(take_sent(provider), key=lambda s: s[0].seqNoStart)
+
+    # Reply for a later range is kept until the earlier ones come
+    service.process_catchup_rep(reply(seeder_ledger, sent[1][0]), sent[1][1])
+    assert leecher_ledger.size == 0
+
+    service.process_catchup_rep(reply(seeder_ledger, sent[0][0]), sent[0][1])
+    assert leecher_ledger.size == 20
+    assert leecher_ledger.tree.root_hash == seeder_ledger.tree.merkle_tree_hash(0, 20)
+
+    # Nodes which replied get new requests at once
+    assert {to for _, to in take_sent(provider)} == {sent[0][1], sent[1][1]}
+
+
+def test_request_size_follows_reply_time(leecher, seeder_ledger):
+    service, provider, timer, _ = leecher
+    sent = take_sent(provider)
+    fast, slow = NODES[0], NODES[1]
+
+    timer.sleep(0.1)
+    for req, to in sent:
+        if to == fast:
+            service.process_catchup_rep(reply(seeder_ledger, req), to)
+    timer.sleep(2)
+    for req, to in sent:
+        if to == slow:
+            service.process_catchup_rep(reply(seeder_ledger, req), to)
+
+    assert service._windows[fast].req_size == 20
+    assert service._windows[slow].req_size == 5
+    assert service._windows[fast].throughput > service._windows[slow].throughput
+
+
+def test_catchup_completes(leecher, seeder_ledger, leecher_ledger):
+    service, provider, timer, completed = leecher
+    answer_all(service, provider, seeder_ledger, timer)
+
+    assert completed == [LedgerCatchupComplete(ledger_id=LEDGER_ID, num_caught_up=LEDGER_SIZE)]
+    assert leecher_ledger.size == seeder_ledger.size
+    assert leecher_ledger.root_hash == seeder_ledger.root_hash
+    assert not service.is_working()
+    assert not service._windows
+
+
+def test_requests_to_silent_node_are_sent_again(leecher, seeder_ledger, leecher_ledger, window_conf):
+    service, provider, timer, completed = leecher
+    silent = NODES[2]
+    silent_ranges = [(req.seqNoStart, req.seqNoEnd) for req, _ in provider.sent if _ == silent]
+
+    answer_all(service, provider, seeder_ledger, timer, skip=(silent,))
+    assert leecher_ledger.size < silent_ranges[0][0]
+
+    timer.sleep(window_conf.CatchupTransactionsTimeout)
+    answer_all(service, provider, seeder_ledger, timer, skip=(silent,))
+    timer.sleep(window_conf.CatchupTransactionsTimeout)
+    answer_all(service, provider, seeder_ledger, timer, skip=(silent,))
+
+    assert completed
+    assert leecher_ledger.root_hash == seeder_ledger.root_hash
+
+
+def test_ranges_from_blacklisted_node_are_sent_again(leecher, seeder_ledger, leecher_ledger, window_conf):
+    service, provider, timer, completed = leecher
+    sent = sorted(take_sent(provider), key=lambda s: s[0].seqNoStart)
+
+    # First range comes with a wrong proof
+    req, to = sent[0]
+    bad_rep = reply(seeder_ledger, req)
+    bad_rep = CatchupRep(LEDGER_ID, bad_rep.txns, reply(seeder_ledger, sent[1][0]).consProof)
+    service.process_catchup_rep(bad_rep, to)
+    assert provider.blacklisted == [to]
+
+    for req, frm in sent[1:]:
+        if frm != to:
+            service.process_catchup_rep(reply(seeder_ledger, req), frm)
+    answer_all(service, provider, seeder_ledger, timer)
+    timer.sleep(window_conf.CATCHUP_WINDOW_CHECK_INTERVAL)
+    answer_all(service, provider, seeder_ledger, timer)
+
+    assert completed
+    assert leecher_ledger.root_hash == seeder_ledger.root_hash
@@ -1,15 +1,17 @@
 import json
+import sys
+import threading
 
 import pytest
 
 from indy.did import key_for_did
 from plenum.common.constants import TXN_TYPE, DATA, GET_TXN, DOMAIN_LEDGER_ID, NYM
 from plenum.common.exceptions import NoAuthenticatorFound
-from plenum.common.types import f
+from plenum.common.types import f, OPERATION
 from plenum.common.util import randomString
 from plenum.server.client_authn import SimpleAuthNr, CoreAuthNr
 from plenum.server.req_authenticator import ReqAuthenticator
-from plenum.test.helper import sdk_sign_and_submit_op, sdk_send_random_and_check
+from plenum.test.helper import sdk_sign_and_submit_op, sdk_send_random_and_check, MockTimer
 from plenum.test.pool_transactions.helper import new_client_request
 from plenum.test.stasher import delay_rules
 from stp_core.loop.eventually import eventually
@@ -112,3 +114,72 @@ def test_propagate_of_ordered_request_doesnt_stash_requests_in_authenticator(
 
     # Make sure that verified req list will be empty eventually
     looper.run(eventually(check_verified_req_list_is_empty))
+
+
+class CountingAuthNr(CoreAuthNr):
+    def __init__(self):
+        super().__init__([NYM], [], [])
+        self.authenticated = 0
+
+    def authenticate(self, req_data, *args, **kwargs):
+        self.authenticated += 1
+        return {req_data[f.IDENTIFIER.nm]}
+
+
+def verified_req(n, sig='sig'):
+    return {f.IDENTIFIER.nm: 'idr', f.REQ_ID.nm: n, f.SIG.nm: sig,
+            OPERATION: {TXN_TYPE: NYM}}
+
+
+def test_verified_reqs_are_bounded():
+    timer = MockTimer()
+    authnr = CountingAuthNr()
+    req_authnr = ReqAuthenticator(max_verified_reqs=3, verified_req_ttl=10,
+                                  get_current_time=timer.get_current_time)
+    req_authnr.register_authenticator(authnr)
+
+    for n in range(5):
+        req_authnr.authenticate(verified_req(n), key=str(n))
+    assert list(req_authnr._verified_reqs) == ['2', '3', '4']
+
+    # Verified request with the same signature is not authenticated again
+    assert req_authnr.authenticate(verified_req(4), key='4') == {'idr'}
+    assert authnr.authenticated == 5
+    req_authnr.authenticate(verified_req(4, sig='other'), key='4')
+    assert authnr.authenticated == 6
+
+    # Verified requests expire
+    timer.sleep(11)
+    req_authnr.authenticate(verified_req(3), key='3')
+    assert authnr.authenticated == 7
+    assert list(req_authnr._verified_reqs) == ['3']
+
+
+def test_verified_reqs_used_from_threads():
+    req_authnr = ReqAuthenticator(max_verified_reqs=10, verified_req_ttl=10)
+    req_authnr.register_authenticator(CountingAuthNr())
+    errors = []
+
+    def authenticate(first):
+        try:
+            for n in range(5000):
+                key = str((first + n) % 20)
+                assert req_authnr.authenticate(verified_req(key), key=key) == {'idr'}
+                if n % 3 == 0:
+                    req_authnr.clean_from_verified(key)
+        except Exception as ex:
+            errors.append(ex)
+
+    # Switch threads often, so that races show up
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=authenticate, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert not errors
+    assert len(req_authnr._verified_reqs) <= 10
@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from plenum.common.metrics_collector import MetricsName
+from plenum.server.signature_verification_stage import SignatureVerificationStage
+from plenum.test.metrics.helper import MockMetricsCollector
+
+
+class Msg:
+    def __init__(self, n, signed=True, valid=True):
+        self.n = n
+        self.signed = signed
+        self.valid = valid
+
+
+def verify(msg):
+    if not msg.valid:
+        raise ValueError(msg.n)
+
+
+@pytest.fixture(params=[1, 4], ids=['one_worker', 'four_workers'])
+def stage(request):
+    stage = SignatureVerificationStage(verify=verify,
+                                       needs_verification=lambda msg: msg.signed,
+                                       workers=request.param)
+    yield stage
+    stage.stop()
+
+
+def test_messages_passed_on_in_order(stage):
+    passed = []
+    msgs = [Msg(0), Msg(1, signed=False), Msg(2, valid=False), Msg(3), Msg(4, signed=False, valid=False)]
+    for msg in msgs:
+        stage.add(msg, 'frm',
+                  on_verified=lambda msg, frm: passed.append((msg.n, frm, None)),
+                  on_failed=lambda msg, frm, ex: passed.append((msg.n, frm, ex.args)))
+    assert stage.pending_count == len(msgs)
+
+    assert stage.service() == len(msgs)
+    assert passed == [(0, 'frm', None), (1, 'frm', None), (2, 'frm', (2,)),
+                      (3, 'frm', None), (4, 'frm', None)]
+    assert stage.pending_count == 0
+    assert stage.service() == 0
+
+
+def test_messages_verified_in_workers():
+    threads = set()
+
+    def verify_in_thread(msg):
+        threads.add(threading.current_thread().name)
+
+    stage = SignatureVerificationStage(verify=verify_in_thread,
+                                       needs_verification=lambda msg: True,
+                                       workers=2)
+    # Single message is verified in the calling thread
+    stage.add(Msg(0), 'frm', lambda *args: None, lambda *args: None)
+    stage.service()
+    assert threads == {threading.current_thread().name}
+
+    threads.clear()
+    for i in range(10):
+        stage.add(Msg(i), 'frm', lambda *args: None, lambda *args: None)
+    stage.service()
+    assert threads
+    assert all(name.startswith('sig_verification') for name in threads)
+    stage.stop()
+
+
+def test_verification_measured_once_per_service():
+    metrics = MockMetricsCollector()
+    stage = SignatureVerificationStage(verify=verify,
+                                       needs_verification=lambda msg: msg.signed,
+                                       workers=2,
+                                       metrics=metrics)
+    for i in range(10):
+        stage.add(Msg(i, signed=i % 2 == 0), 'frm', lambda *args: None, lambda *args: None)
+    stage.service()
+    stage.stop()
+
+    # Measured in the calling thread, as metrics are not thread safe
+    metrics.flush_accumulated()
+    assert [(event.name, event.count) for event in metrics.events] == \
+        [(MetricsName.VERIFY_SIGNATURES_BATCH_TIME, 1)]
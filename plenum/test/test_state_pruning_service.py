@@ -0,0 +1,94 @@
+import pytest
+
+from plenum.common.constants import DOMAIN_LEDGER_ID, CONFIG_LEDGER_ID, TS_LABEL
+from plenum.server.database_manager import DatabaseManager
+from plenum.server.state_pruning_service import StatePruningService
+from plenum.test.helper import MockTimer
+from state.pruning_state import PruningState
+from storage.kv_in_memory import KeyValueStorageInMemory
+from storage.state_ts_store import StateTsDbStorage
+
+
+def apply_batches(state, count, prefix=b''):
+    for i in range(count):
+        state.set(prefix + str(i % 20).encode(), str(i).encode())
+        state.commit(state.headHash)
+
+
+def run_for(timer, seconds):
+    for _ in range(seconds):
+        timer.sleep(1)
+
+
+@pytest.fixture
+def db_manager():
+    db_manager = DatabaseManager()
+    db_manager.register_new_database(DOMAIN_LEDGER_ID, None, PruningState(KeyValueStorageInMemory()))
+    db_manager.register_new_database(CONFIG_LEDGER_ID, None, PruningState(KeyValueStorageInMemory()))
+    db_manager.register_new_store(TS_LABEL,
+                                  StateTsDbStorage('ts', {DOMAIN_LEDGER_ID: KeyValueStorageInMemory()}))
+    return db_manager
+
+
+@pytest.fixture
+def pruning_conf(tconf, monkeypatch):
+    monkeypatch.setattr(tconf, 'STATE_PRUNING_STEP_INTERVAL', 1)
+    monkeypatch.setattr(tconf, 'STATE_PRUNING_NODES_PER_STEP', 10)
+    monkeypatch.setattr(tconf, 'STATE_PRUNING_PERIOD', 1000)
+    monkeypatch.setattr(tconf, 'STATE_PRUNING_KEEP_TS_ROOTS_FOR', None)
+    return tconf
+
+
+def test_states_of_all_ledgers_are_pruned(pruning_conf, db_manager):
+    timer = MockTimer()
+    service = StatePruningService(pruning_conf, timer, db_manager, can_prune=lambda: True)
+    domain_state = db_manager.get_state(DOMAIN_LEDGER_ID)
+    config_state = db_manager.get_state(CONFIG_LEDGER_ID)
+    apply_batches(domain_state, 50)
+    apply_batches(config_state, 50)
+    ts_root = domain_state.committedHeadHash
+    db_manager.ts_store.set(100, ts_root)
+    apply_batches(domain_state, 50, prefix=b'new')
+    domain_values = domain_state.as_dict
+    config_values = config_state.as_dict
+
+    service.start()
+    run_for(timer, 200)
+
+    pruned_nodes, pruned_bytes = service.take_stats()
+    assert pruned_nodes > 0
+    assert pruned_bytes > 0
+    assert service.take_stats() == (0, 0)
+    assert PruningState(domain_state._kv).as_dict == domain_values
+    assert PruningState(config_state._kv).as_dict == config_values
+    # Roots from the timestamp store are kept
+    assert domain_state.get_for_root_hash(ts_root, b'1') == b'41'
+
+    # Nothing to do until the next period
+    apply_batches(domain_state, 50)
+    run_for(timer, 200)
+    assert service.take_stats() == (0, 0)
+    run_for(timer, 1000)
+    assert service.take_stats()[0] > 0
+
+
+def test_pruning_is_abandoned_when_node_stops_participating(pruning_conf, db_manager):
+    timer = MockTimer()
+    participating = [True]
+    service = StatePruningService(pruning_conf, timer, db_manager,
+                                  can_prune=lambda: participating[0])
+    state = db_manager.get_state(DOMAIN_LEDGER_ID)
+    apply_batches(state, 50)
+
+    service.start()
+    run_for(timer, 2)
+    participating[0] = False
+    run_for(timer, 200)
+    assert service.take_stats() == (0, 0)
+    assert state._db._written is None
+
+    participating[0] = True
+    run_for(timer, 200)
+    assert service.take_stats()[0] > 0
+
+    service.stop()
@@ -0,0 +1,127 @@
+import random
+import time
+from collections import OrderedDict
+
+import pytest
+
+from common.serializers.serialization import domain_state_serializer
+from plenum.common.constants import NYM, VERKEY, TARGET_NYM, TXN_TYPE, CURRENT_PROTOCOL_VERSION
+from plenum.common.exceptions import InsufficientCorrectSignatures
+from plenum.common.request import Request
+from plenum.common.signer_did import DidSigner
+from plenum.server.client_authn import CoreAuthNr
+from plenum.server.req_authenticator import ReqAuthenticator
+from plenum.server.signature_verification_stage import SignatureVerificationStage
+from plenum.server.request_handlers.utils import nym_to_state_key
+from state.pruning_state import PruningState
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+
+class CountingState(PruningState):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reads = 0
+
+    def get(self, key, isCommitted=True):
+        self.reads += 1
+        return super().get(key, isCommitted)
+
+
+class SwitchingDict(OrderedDict):
+    # Lets other threads run between a lookup and what follows it
+    def get(self, key, default=None):
+        value = super().get(key, default)
+        time.sleep(0)
+        return value
+
+
+def set_verkey(state, signer):
+    state.set(nym_to_state_key(signer.identifier),
+              domain_state_serializer.serialize({VERKEY: signer.verkey}))
+
+
+def signed_req(signer, req_id):
+    req = Request(identifier=signer.identifier,
+                  reqId=req_id,
+                  operation={TXN_TYPE: NYM, TARGET_NYM: 'some_dest'},
+                  protocolVersion=CURRENT_PROTOCOL_VERSION)
+    req.signature = signer.sign(req.as_dict)
+    return req.as_dict
+
+
+@pytest.fixture
+def state():
+    return CountingState(KeyValueStorageInMemory())
+
+
+@pytest.fixture
+def req_authnr(state):
+    req_authnr = ReqAuthenticator()
+    req_authnr.register_authenticator(CoreAuthNr([NYM], [], [], state=state,
+                                                 verkey_cache_size=10))
+    return req_authnr
+
+
+def test_verkey_read_from_state_once(state, req_authnr):
+    signer = DidSigner(seed=b'1' * 32)
+    set_verkey(state, signer)
+
+    for req_id in range(5):
+        assert req_authnr.authenticate(signed_req(signer, req_id)) == {signer.identifier}
+    assert state.reads == 1
+
+
+def test_verkey_invalidated_on_rotation(state, req_authnr):
+    signer = DidSigner(seed=b'1' * 32)
+    set_verkey(state, signer)
+    req_authnr.authenticate(signed_req(signer, 1))
+
+    new_signer = DidSigner(identifier=signer.identifier, seed=b'2' * 32)
+    set_verkey(state, new_signer)
+    req_authnr.invalidate_verkey(signer.identifier)
+
+    assert req_authnr.authenticate(signed_req(new_signer, 2)) == {signer.identifier}
+    with pytest.raises(InsufficientCorrectSignatures):
+        req_authnr.authenticate(signed_req(signer, 3))
+
+
+def test_verkeys_cleared_on_revert(state, req_authnr):
+    signer = DidSigner(seed=b'1' * 32)
+    set_verkey(state, signer)
+    req_authnr.authenticate(signed_req(signer, 1))
+
+    req_authnr.clear_verkeys()
+    req_authnr.authenticate(signed_req(signer, 2))
+    assert state.reads == 2
+
+
+def test_verkey_cache_used_from_verification_threads(state, req_authnr):
+    # A few clients more than the cache keeps, in random order, so that
+    # keys are both found and evicted all along
+    rnd = random.Random(1)
+    signers = [DidSigner(seed=str(i).zfill(32).encode()) for i in range(12)]
+    for signer in signers:
+        set_verkey(state, signer)
+    state.commit(state.headHash)
+
+    cache = req_authnr.core_authenticator.verkey_cache
+    cache._verkeys = SwitchingDict()
+    cache._verifiers = SwitchingDict()
+
+    stage = SignatureVerificationStage(verify=req_authnr.authenticate,
+                                       needs_verification=lambda req: True,
+                                       workers=4)
+    verified = []
+    failed = []
+    try:
+        for req_id in range(30):
+            for signer in rnd.sample(signers, len(signers)):
+                stage.add(signed_req(signer, req_id), signer.identifier,
+                          on_verified=lambda req, frm: verified.append(frm),
+                          on_failed=lambda req, frm, ex: failed.append(ex))
+            stage.service()
+    finally:
+        stage.stop()
+
+    assert not failed
+    assert len(verified) == 30 * len(signers)
@@ -2,6 +2,9 @@ from abc import abstractmethod
 
 
 class BaseDB:
+    # Whether `dec_refcount` does anything, tries skip encoding and hashing
+    # of replaced nodes otherwise
+    counts_references = True
 
     @abstractmethod
     def inc_refcount(self, key, value):
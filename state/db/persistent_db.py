@@ -1,12 +1,29 @@
+from typing import Iterable, Tuple, Set, Optional, List
+
 from state.db.db import BaseDB
 from storage.kv_store import KeyValueStorage
 
 
 class PersistentDB(BaseDB):
-    def __init__(self, keyValueStorage: KeyValueStorage):
+    counts_references = False
+
+    def __init__(self, keyValueStorage: KeyValueStorage, write_back=False):
+        """
+        :param write_back: keep written nodes in memory until `flush` writes
+            them in one batch or `discard` drops them
+        """
         self._keyValueStorage = keyValueStorage
+        self._write_back = write_back
+        self._pending = {}
+        # Numbers of the first and the last write of every pending node
+        self._pending_writes = {}
+        self._writes = 0
+        self._written = None  # type: Optional[Set[bytes]]
 
     def get(self, key: bytes) -> bytes:
+        value = self._pending.get(key)
+        if value is not None:
+            return value
         return self._keyValueStorage.get(key)
 
     def _has_key(self, key: bytes):
@@ -24,7 +41,91 @@ class PersistentDB(BaseDB):
         return isinstance(other, self.__class__) and is_k_eq
 
     def inc_refcount(self, key, value):
-        self._keyValueStorage.put(key, value)
+        if self._write_back:
+            self._writes += 1
+            self._pending[key] = value
+            writes = self._pending_writes.get(key)
+            if writes is None:
+                self._pending_writes[key] = [self._writes, self._writes]
+            else:
+                writes[1] = self._writes
+        else:
+            self._keyValueStorage.put(key, value)
+            if self._written is not None:
+                self._written.add(key)
 
     def dec_refcount(self, key):
         pass
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def get_pending(self, key: bytes) -> Optional[bytes]:
+        return self._pending.get(key)
+
+    def flush(self, keys: Optional[Iterable[bytes]] = None):
+        """
+        Write pending nodes with the given keys, all of them by default,
+        in one batch
+        """
+        if keys is None:
+            keys = list(self._pending)
+        batch = [(key, self._pending[key]) for key in keys
+                 if key in self._pending]
+        if batch:
+            self._keyValueStorage.setBatch(batch)
+            if self._written is not None:
+                self._written.update(key for key, _ in batch)
+            self.drop_pending(key for key, _ in batch)
+
+    def drop_pending(self, keys: Iterable[bytes]):
+        for key in keys:
+            self._pending.pop(key, None)
+            self._pending_writes.pop(key, None)
+
+    def pending_written_after(self, key: bytes) -> List[bytes]:
+        """
+        Return keys of pending nodes first written after the pending node
+        with the given key was first written, none if it is not pending
+        """
+        writes = self._pending_writes.get(key)
+        if writes is None:
+            return []
+        return [k for k, (first, _) in self._pending_writes.items()
+                if first > writes[0]]
+
+    def pending_written_before(self, key: bytes) -> List[bytes]:
+        """
+        Return keys of pending nodes last written no later than the pending
+        node with the given key was last written, none if it is not pending
+        """
+        writes = self._pending_writes.get(key)
+        if writes is None:
+            return []
+        return [k for k, (_, last) in self._pending_writes.items()
+                if last <= writes[1]]
+
+    def set_batch(self, batch: Iterable[Tuple[bytes, bytes]]):
+        """
+        Write nodes to the storage right away, bypassing write back
+        """
+        batch = list(batch)
+        self._keyValueStorage.setBatch(batch)
+        if self._written is not None:
+            self._written.update(key for key, _ in batch)
+
+    def track_writes(self) -> Set[bytes]:
+        """
+        Start collecting keys written to the storage, the returned set is
+        filled until `stop_tracking_writes`
+        """
+        self._written = set()
+        return self._written
+
+    def stop_tracking_writes(self):
+        self._written = None
+
+    def discard(self):
+        self._pending = {}
+        self._pending_writes = {}
@@ -1,13 +1,15 @@
 from binascii import unhexlify
-from typing import Optional
+from collections import OrderedDict
+from typing import Optional, Iterable, List, Tuple, Set
 
 from state.db.persistent_db import PersistentDB
 from state.state import State
+from state.trie.node_cache import TrieNodeCache
 from state.trie.pruning_trie import BLANK_ROOT, Trie, BLANK_NODE, \
-    bin_to_nibbles
+    bin_to_nibble_path
 from state.util.fast_rlp import encode_optimized as rlp_encode, \
     decode_optimized as rlp_decode
-from state.util.utils import to_string, isHex
+from state.util.utils import isHex, sha3
 from storage.kv_store import KeyValueStorage
 
 
@@ -25,16 +27,39 @@ class PruningState(State):
     # SOME KEY THAT DOES NOT COLLIDE WITH ANY STATE VARIABLE'S NAME
     rootHashKey = b'\x88\xc8\x88 \x9a\xa7\x89\x1b'
 
-    def __init__(self, keyValueStorage: KeyValueStorage):
+    def __init__(self, keyValueStorage: KeyValueStorage, node_cache_size=0,
+                 proof_cache_size=0, root_cache_size=0):
+        """
+        :param node_cache_size: memory in bytes for decoded trie nodes shared
+            by reads of committed and uncommitted state, 0 disables the cache
+        :param proof_cache_size: number of serialized state proofs against
+            the committed root kept for repeated reads, 0 disables the cache
+        :param root_cache_size: number of decoded roots kept for reads of
+            the state as of past roots, 0 disables the cache
+        """
         self._kv = keyValueStorage
         if self.rootHashKey in self._kv:
             rootHash = bytes(self._kv.get(self.rootHashKey))
         else:
             rootHash = BLANK_ROOT
             self._kv.put(self.rootHashKey, BLANK_ROOT)
+        # Committed root hash is only changed by `commit`, so it is not
+        # read from the storage on every read of committed state
+        self._committed_head_hash = rootHash
+        self._node_cache = TrieNodeCache(node_cache_size) \
+            if node_cache_size > 0 else None
+        # Nodes created by uncommitted updates stay in memory, the ones of
+        # a committed root are written in one batch on commit, the ones of
+        # reverted updates are dropped
+        self._db = PersistentDB(self._kv, write_back=True)
         self._trie = Trie(
-            PersistentDB(self._kv),
-            rootHash)
+            self._db,
+            rootHash,
+            node_cache=self._node_cache)
+        self._proof_cache_size = proof_cache_size
+        self._proof_cache = OrderedDict()
+        self._root_cache_size = root_cache_size
+        self._root_cache = OrderedDict()
 
     @property
     def head(self):
@@ -60,22 +85,48 @@ class PruningState(State):
     def set(self, key: bytes, value: bytes):
         self._trie.update(key, rlp_encode([value]))
 
+    def set_many(self, sorted_items: Iterable[Tuple[bytes, bytes]]):
+        """
+        Sets several keys in one pass over the trie, equivalent to calling
+        `set` for each of them in order but every touched node is encoded
+        just once.
+
+        :param sorted_items: (key, value) pairs sorted by key
+        """
+        self._trie.update_many([(key, rlp_encode([value]))
+                                for key, value in sorted_items])
+
     def get(self, key: bytes, isCommitted: bool = True) -> Optional[bytes]:
         if not isCommitted:
             val = self._trie.get(key)
         else:
             val = self._trie._get(self.committedHead,
-                                  bin_to_nibbles(to_string(key)))
+                                  bin_to_nibble_path(key))
         if val:
             return self.get_decoded(val)
 
     def get_for_root_hash(self, root_hash, key: bytes) -> Optional[bytes]:
-        root = self._hash_to_node(root_hash)
-        val = self._trie._get(root,
-                              bin_to_nibbles(to_string(key)))
+        root = self._cached_root(root_hash)
+        val = self._trie._get(root, bin_to_nibble_path(key))
         if val:
             return self.get_decoded(val)
 
+    def _cached_root(self, root_hash):
+        # Reads as of a past time go to the same few roots over and over,
+        # reads don't change nodes so decoded roots are shared by them
+        if self._root_cache_size <= 0:
+            return self._hash_to_node(root_hash)
+        root_hash = bytes(root_hash)
+        root = self._root_cache.get(root_hash)
+        if root is None:
+            root = self._hash_to_node(root_hash)
+            self._root_cache[root_hash] = root
+            if len(self._root_cache) > self._root_cache_size:
+                self._root_cache.popitem(last=False)
+        else:
+            self._root_cache.move_to_end(root_hash)
+        return root
+
     def get_all_leaves_for_root_hash(self, root_hash):
         node = self._hash_to_node(root_hash)
         leaves = self._trie.to_dict(node)
@@ -95,15 +146,149 @@ class PruningState(State):
             rootHash = rootHash
         else:
             rootHash = self.headHash
+        rootHash = bytes(rootHash)
+        # Heads are committed in the order they were made, so nodes written
+        # by the time the committed root was made and not reachable from it
+        # are not needed by any of the uncommitted heads left
+        garbage = self._db.pending_written_before(rootHash)
+        # Nodes go first, so that the committed root never refers to
+        # nodes which are not in the storage
+        self._db.flush(self._pending_subtree(rootHash))
+        self._db.drop_pending(garbage)
         self._kv.put(self.rootHashKey, rootHash)
+        if rootHash != self._committed_head_hash:
+            # Only proofs against the committed root are cached
+            self._proof_cache.clear()
+        self._committed_head_hash = rootHash
 
     def revertToHead(self, headHash=None):
+        # The head may be given as a node as well
         head = self._hash_to_node(headHash)
+        head_hash = BLANK_ROOT if head == BLANK_NODE else sha3(rlp_encode(head))
+        if head_hash == self._committed_head_hash:
+            self._db.discard()
+        else:
+            # Nodes written after the head reverted to was made belong to
+            # the reverted updates, the ones of the head and of the earlier
+            # uncommitted heads were written before it
+            self._db.drop_pending(self._db.pending_written_after(head_hash))
         self._trie.replace_root_hash(self._trie.root_node, head)
 
+    def _pending_subtree(self, root_hash: bytes) -> Set[bytes]:
+        """
+        Return hashes of the pending nodes reachable from the root, a node
+        in the storage has all of its subtree there
+        """
+        reachable = set()
+        stack = [root_hash]
+        while stack:
+            node_hash = stack.pop()
+            if node_hash in reachable:
+                continue
+            encoded = self._db.get_pending(node_hash)
+            if encoded is None:
+                continue
+            reachable.add(node_hash)
+            stack.extend(Trie.child_hashes(rlp_decode(encoded)))
+        return reachable
+
+    def get_trie_nodes(self, node_hashes: Iterable[bytes],
+                       max_nodes: int) -> List[bytes]:
+        """
+        Return encoded trie nodes with the given hashes, each followed by the
+        nodes of its subtree in the order they are reached walking down from
+        the root, at most `max_nodes` of them. Hashes which are not in the
+        storage are skipped.
+        """
+        nodes = []
+        stack = list(reversed(list(node_hashes)))
+        while stack and len(nodes) < max_nodes:
+            node_hash = stack.pop()
+            try:
+                encoded = bytes(self._kv.get(node_hash))
+            except KeyError:
+                continue
+            nodes.append(encoded)
+            stack.extend(reversed(Trie.child_hashes(rlp_decode(encoded))))
+        return nodes
+
+    def has_trie_node(self, node_hash: bytes) -> bool:
+        return node_hash in self._kv
+
+    def put_trie_nodes(self, nodes: Iterable[Tuple[bytes, bytes]]):
+        """
+        Write encoded trie nodes keyed by their hashes, the caller is
+        responsible for the hashes being right
+        """
+        self._db.set_batch(nodes)
+
+    def get_trie_node(self, node_hash: bytes) -> Optional[bytes]:
+        """
+        Return the encoded trie node with the given hash, whether it is
+        committed or not, None if there is no such node
+        """
+        try:
+            return bytes(self._db.get(node_hash))
+        except KeyError:
+            return None
+
+    def stored_trie_nodes(self) -> Iterable[Tuple[bytes, bytes]]:
+        """
+        Return (hash, encoded node) pairs of all the trie nodes in the
+        storage, the storage can be changed while they are iterated
+        """
+        for key, value in self._kv.iterator(include_value=True):
+            key = bytes(key)
+            # Everything else in the storage is the committed root hash
+            if len(key) == 32:
+                yield key, value
+
+    def remove_trie_nodes(self, node_hashes: Iterable[bytes]):
+        self._kv.do_ops_in_batch([(self._kv.REMOVE_OP, node_hash, None)
+                                  for node_hash in node_hashes])
+
+    def track_trie_node_writes(self) -> Set[bytes]:
+        """
+        Start collecting hashes of trie nodes written to the storage, the
+        returned set is filled until `stop_tracking_trie_node_writes`
+        """
+        return self._db.track_writes()
+
+    def stop_tracking_trie_node_writes(self):
+        self._db.stop_tracking_writes()
+
+    def install_root(self, root_hash: bytes):
+        """
+        Make the trie with the given root, whose nodes are all in the
+        storage, both the committed and the uncommitted state
+        """
+        self.commit(rootHash=root_hash)
+        self.revertToHead(root_hash)
+
     # Proofs are always generated over committed state
     def generate_state_proof(self, key: bytes, root=None, serialize=False, get_value=False):
-        return self._trie.generate_state_proof(key, root, serialize, get_value=get_value)
+        if not serialize or self._proof_cache_size <= 0:
+            return self._trie.generate_state_proof(key, root, serialize, get_value=get_value)
+
+        # Serialized proofs are immutable, so they are shared by all the
+        # replies for the same key until the committed root changes
+        root_hash = self._node_hash(root if root is not None else self.head)
+        if root_hash != self._committed_head_hash:
+            return self._trie.generate_state_proof(key, root, serialize, get_value=get_value)
+        cache_key = (root_hash, key, get_value)
+        rv = self._proof_cache.get(cache_key)
+        if rv is not None:
+            self._proof_cache.move_to_end(cache_key)
+            return rv
+        rv = self._trie.generate_state_proof(key, root, serialize, get_value=get_value)
+        self._proof_cache[cache_key] = rv
+        if len(self._proof_cache) > self._proof_cache_size:
+            self._proof_cache.popitem(last=False)
+        return rv
+
+    @staticmethod
+    def _node_hash(node) -> bytes:
+        return BLANK_ROOT if node == BLANK_NODE else sha3(rlp_encode(node))
 
     def generate_state_proof_for_keys_with_prefix(self, key_prfx, root=None,
                                                   serialize=False, get_value=False):
@@ -143,7 +328,16 @@ class PruningState(State):
 
     @property
     def committedHeadHash(self):
-        return self._kv.get(self.rootHashKey)
+        return self._committed_head_hash
+
+    def take_node_cache_stats(self):
+        """
+        Return the number of trie node cache hits and misses since the
+        last call
+        """
+        if self._node_cache is None:
+            return 0, 0
+        return self._node_cache.take_stats()
 
     @property
     def closed(self):
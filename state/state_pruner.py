@@ -0,0 +1,163 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from state.pruning_state import PruningState
+from state.trie.pruning_trie import BLANK_ROOT, Trie
+from state.util.fast_rlp import decode_optimized as rlp_decode
+
+
+class StatePruner:
+    """
+    Deletes trie nodes of a state which are not reachable from any of the
+    roots which have to be kept, a limited amount of work at a time.
+
+    A pruning cycle marks all the nodes reachable from the roots, then
+    goes over the storage to find the nodes which were not marked, then
+    deletes them. The state is used as usual between the steps of a cycle,
+    so nodes written after the cycle started are never deleted: new tries
+    are built from nodes of the kept roots or of the nodes written since.
+
+    Nodes are deleted parents first, so a node is left in the storage with
+    all of its subtree even if the cycle is abandoned while deleting.
+    """
+
+    MARKING = 'marking'
+    SWEEPING = 'sweeping'
+    DELETING = 'deleting'
+
+    def __init__(self, state: PruningState):
+        self._state = state
+        self._phase = None  # type: Optional[str]
+        self._roots = iter(())  # type: Iterator[bytes]
+        self._stack = []  # type: List[bytes]
+        self._marked = set()  # type: Set[bytes]
+        self._written = set()  # type: Set[bytes]
+        self._stored = iter(())  # type: Iterator[Tuple[bytes, bytes]]
+        # Nodes not marked, hash -> (size, hashes of children)
+        self._garbage = {}  # type: Dict[bytes, Tuple[int, Set[bytes]]]
+        # Number of parents not deleted yet of every child of a garbage node
+        self._parents_left = {}  # type: Dict[bytes, int]
+        # Garbage nodes which all the parents of were deleted
+        self._deletable = []  # type: List[bytes]
+        self._pruned_nodes = 0
+        self._pruned_bytes = 0
+
+    @property
+    def phase(self) -> Optional[str]:
+        return self._phase
+
+    @property
+    def is_running(self) -> bool:
+        return self._phase is not None
+
+    def start(self, roots: Iterable[bytes]):
+        """
+        Start a pruning cycle, the roots are iterated as the nodes are
+        marked, so they can be produced lazily. Roots of uncommitted
+        changes of the state have to be kept as well as committed ones.
+        """
+        self.stop()
+        self._written = self._state.track_trie_node_writes()
+        self._roots = iter(roots)
+        self._phase = self.MARKING
+
+    def stop(self):
+        """
+        Abandon the current pruning cycle, must be called before the state
+        is changed in any way other than by updates and reverts, like
+        installing a root from a snapshot
+        """
+        if self._phase is not None:
+            self._state.stop_tracking_trie_node_writes()
+        self._phase = None
+        self._roots = iter(())
+        self._stack = []
+        self._marked = set()
+        self._written = set()
+        self._stored = iter(())
+        self._garbage = {}
+        self._parents_left = {}
+        self._deletable = []
+
+    def step(self, max_nodes: int) -> bool:
+        """
+        Visit, check or delete at most `max_nodes` nodes
+
+        :return: whether the pruning cycle is still running
+        """
+        if self._phase == self.MARKING:
+            self._mark(max_nodes)
+        elif self._phase == self.SWEEPING:
+            self._sweep(max_nodes)
+        elif self._phase == self.DELETING:
+            self._delete(max_nodes)
+        return self.is_running
+
+    def take_stats(self) -> Tuple[int, int]:
+        """
+        Return the number of deleted nodes and the number of bytes they
+        took, counting keys and values, since the last call
+        """
+        stats = self._pruned_nodes, self._pruned_bytes
+        self._pruned_nodes = 0
+        self._pruned_bytes = 0
+        return stats
+
+    def _mark(self, max_nodes: int):
+        for _ in range(max_nodes):
+            if not self._stack:
+                root = next(self._roots, None)
+                if root is None:
+                    self._stored = iter(self._state.stored_trie_nodes())
+                    self._phase = self.SWEEPING
+                    return
+                self._stack.append(bytes(root))
+                continue
+
+            node_hash = self._stack.pop()
+            if node_hash == BLANK_ROOT or node_hash in self._marked:
+                continue
+            encoded = self._state.get_trie_node(node_hash)
+            if encoded is None:
+                continue
+            self._marked.add(node_hash)
+            self._stack.extend(Trie.child_hashes(rlp_decode(encoded)))
+
+    def _sweep(self, max_nodes: int):
+        for _ in range(max_nodes):
+            item = next(self._stored, None)
+            if item is None:
+                self._marked = set()
+                self._deletable = [node_hash for node_hash in self._garbage
+                                   if node_hash not in self._parents_left]
+                self._phase = self.DELETING
+                return
+            node_hash, encoded = item
+            if node_hash not in self._marked and node_hash not in self._written:
+                children = set(Trie.child_hashes(rlp_decode(encoded)))
+                self._garbage[node_hash] = (len(node_hash) + len(encoded), children)
+                for child in children:
+                    self._parents_left[child] = self._parents_left.get(child, 0) + 1
+
+    def _delete(self, max_nodes: int):
+        batch = []
+        while self._deletable and len(batch) < max_nodes:
+            node_hash = self._deletable.pop()
+            size, children = self._garbage.pop(node_hash)
+            # A node may be written again while waiting for deletion, when
+            # some update recreates the same subtree, its children are
+            # referenced again then
+            if node_hash in self._written:
+                continue
+            batch.append((node_hash, size))
+            for child in children:
+                self._parents_left[child] -= 1
+                if self._parents_left[child] == 0:
+                    del self._parents_left[child]
+                    if child in self._garbage:
+                        self._deletable.append(child)
+        if batch:
+            self._state.remove_trie_nodes(node_hash for node_hash, _ in batch)
+            self._pruned_nodes += len(batch)
+            self._pruned_bytes += sum(size for _, size in batch)
+        if not self._deletable:
+            self.stop()
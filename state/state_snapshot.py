@@ -0,0 +1,139 @@
+from typing import Iterable, List
+
+from state.pruning_state import PruningState
+from state.trie.pruning_trie import BLANK_ROOT, Trie
+from state.util.fast_rlp import decode_optimized as rlp_decode
+from state.util.utils import sha3
+
+
+class StateSnapshotReceiver:
+    """
+    Fills a state with the trie of a known root hash from trie nodes sent
+    by other nodes.
+
+    Only the root hash has to be trusted: a node is accepted only if it is
+    referred to by the root or by an already accepted node and its hash is
+    the one it is referred by, so every accepted node is a part of the trie.
+    A node is written to the storage only once its whole subtree is there,
+    so a sync which is interrupted leaves nothing but complete subtrees
+    behind and subtrees already present in the storage, e.g. from a previous
+    state of the trie, are never requested.
+    """
+
+    def __init__(self, state: PruningState, root_hash: bytes,
+                 write_batch_size: int = 1000):
+        self._state = state
+        self.root_hash = root_hash
+        self._write_batch_size = write_batch_size
+        # Hashes of nodes referred to but not received yet, with hashes of
+        # the received nodes referring to them, None stands for the root
+        self._expected = {}
+        # Received nodes with incomplete subtrees, hash -> [encoded node,
+        # number of children not written yet, hashes of parents]
+        self._pending = {}
+        # Nodes to request, the latest referred ones first so the trie is
+        # walked in depth and only a few nodes are pending at any time
+        self._to_request = []
+        self._requested = set()
+        self._writes = []
+        self.nodes_received = 0
+        self.nodes_written = 0
+        self._complete = False
+        if root_hash == BLANK_ROOT or state.has_trie_node(root_hash):
+            self._complete = True
+        else:
+            self._expect(root_hash, None)
+
+    @property
+    def is_complete(self) -> bool:
+        return self._complete
+
+    def next_hashes_to_request(self, count: int) -> List[bytes]:
+        hashes = []
+        while self._to_request and len(hashes) < count:
+            node_hash = self._to_request.pop()
+            if node_hash in self._expected and node_hash not in self._requested:
+                self._requested.add(node_hash)
+                hashes.append(node_hash)
+        return hashes
+
+    def request_again(self, node_hashes: Iterable[bytes]):
+        """
+        Make hashes requested but not received to be returned by
+        `next_hashes_to_request` again
+        """
+        for node_hash in node_hashes:
+            if node_hash in self._requested:
+                self._requested.discard(node_hash)
+                if node_hash in self._expected:
+                    self._to_request.append(node_hash)
+
+    def add_nodes(self, encoded_nodes: Iterable[bytes]) -> int:
+        """
+        Add received nodes, nodes which are not expected are ignored.
+        A node is expected once its parent is added, so nodes of a subtree
+        are accepted in one go if the parents precede their children.
+
+        :return: number of accepted nodes
+        """
+        accepted = 0
+        for encoded in encoded_nodes:
+            node_hash = sha3(encoded)
+            parents = self._expected.pop(node_hash, None)
+            if parents is None:
+                continue
+            self._requested.discard(node_hash)
+            accepted += 1
+            children = 0
+            for child in set(Trie.child_hashes(rlp_decode(encoded))):
+                if child in self._expected:
+                    self._expected[child].append(node_hash)
+                elif child in self._pending:
+                    self._pending[child][2].append(node_hash)
+                elif not self._state.has_trie_node(child):
+                    self._expect(child, node_hash)
+                else:
+                    continue
+                children += 1
+            if children:
+                self._pending[node_hash] = [encoded, children, parents]
+            else:
+                self._write(node_hash, encoded, parents)
+        self.nodes_received += accepted
+        if self._writes and \
+                (self._complete or len(self._writes) >= self._write_batch_size):
+            self._flush()
+        return accepted
+
+    def install(self):
+        """
+        Make the received trie the committed state
+        """
+        if not self._complete:
+            raise RuntimeError('cannot install incomplete state snapshot, '
+                               '{} nodes are missing'.format(len(self._expected)))
+        self._state.install_root(self.root_hash)
+
+    def _expect(self, node_hash: bytes, parent):
+        self._expected[node_hash] = [parent]
+        self._to_request.append(node_hash)
+
+    def _write(self, node_hash: bytes, encoded: bytes, parents: list):
+        written = [(node_hash, encoded, parents)]
+        while written:
+            node_hash, encoded, parents = written.pop()
+            self._writes.append((node_hash, encoded))
+            for parent in parents:
+                if parent is None:
+                    self._complete = True
+                    continue
+                pending = self._pending[parent]
+                pending[1] -= 1
+                if pending[1] == 0:
+                    del self._pending[parent]
+                    written.append((parent, pending[0], pending[2]))
+
+    def _flush(self):
+        self._state.put_trie_nodes(self._writes)
+        self.nodes_written += len(self._writes)
+        self._writes = []
@@ -1 +1,59 @@
-# TODO: Benchmark CRUD over the Trie.
+"""
+Microbenchmark of reads and writes of the state trie, run with
+
+    python -m state.test.bench [number of keys]
+
+Keys are 32 bytes long, like the hashes of DIDs NYMs are stored under.
+"""
+import random
+import sys
+import time
+
+from state.pruning_state import PruningState
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+
+def _timed(name, count, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print('{:<24}{:>10.1f} us/op'.format(name, elapsed / count * 1e6))
+
+
+def run(count=20000, seed=0):
+    rnd = random.Random(seed)
+    keys = [rnd.getrandbits(256).to_bytes(32, 'big') for _ in range(count)]
+    values = [rnd.getrandbits(8 * 100).to_bytes(100, 'big') for _ in range(count)]
+    state = PruningState(KeyValueStorageInMemory())
+
+    def insert():
+        for key, value in zip(keys, values):
+            state.set(key, value)
+
+    def update():
+        for key, value in zip(keys, reversed(values)):
+            state.set(key, value)
+
+    def get_uncommitted():
+        for key in keys:
+            state.get(key, isCommitted=False)
+
+    def get_committed():
+        for key in keys:
+            state.get(key)
+
+    def get_missing():
+        for key in keys:
+            state.get(key[::-1], isCommitted=False)
+
+    _timed('insert', count, insert)
+    state.commit(state.headHash)
+    _timed('update', count, update)
+    state.commit(state.headHash)
+    _timed('get uncommitted', count, get_uncommitted)
+    _timed('get committed', count, get_committed)
+    _timed('get missing', count, get_missing)
+
+
+if __name__ == '__main__':
+    run(*map(int, sys.argv[1:2]))
@@ -0,0 +1,142 @@
+import random
+
+from state.db.persistent_db import PersistentDB
+from state.pruning_state import PruningState
+from state.util.utils import sha3
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+
+class CountingStorage(KeyValueStorageInMemory):
+    def __init__(self):
+        super().__init__()
+        self.puts = 0
+        self.batches = 0
+
+    def put(self, key, value):
+        self.puts += 1
+        super().put(key, value)
+
+    def setBatch(self, batch):
+        self.batches += 1
+        for key, value in batch:
+            super().put(key, value)
+
+
+def test_write_back_keeps_nodes_until_flush():
+    kv = KeyValueStorageInMemory()
+    db = PersistentDB(kv, write_back=True)
+    db.inc_refcount(b'k1', b'v1')
+    assert db.get(b'k1') == b'v1'
+    assert b'k1' in db
+    assert b'k1' not in kv
+
+    db.flush()
+    assert kv.get(b'k1') == b'v1'
+    assert db.pending_count == 0
+
+    db.inc_refcount(b'k2', b'v2')
+    db.discard()
+    assert b'k2' not in db
+    assert b'k2' not in kv
+
+
+def test_batch_nodes_written_at_once_on_commit():
+    kv = CountingStorage()
+    state = PruningState(kv)
+    kv.puts = 0
+    for i in range(100):
+        state.set(str(i).encode(), str(i).encode())
+    assert kv.puts == 0
+
+    state.commit(state.headHash)
+    # Only the committed root hash is written by itself
+    assert kv.puts == 1
+    assert kv.batches == 1
+
+    restarted = PruningState(kv)
+    assert restarted.get(b'42') == b'42'
+
+
+def test_rejected_batch_nodes_are_never_written():
+    kv = KeyValueStorageInMemory()
+    state = PruningState(kv)
+    state.set(b'k1', b'v1')
+    state.commit(state.headHash)
+    committed = state.committedHeadHash
+    size = kv.size
+
+    state.set(b'k2', b'v2')
+    state.set(b'k3', b'v3')
+    state.revertToHead(committed)
+    state.commit(state.headHash)
+
+    assert kv.size == size
+    assert state.get(b'k1') == b'v1'
+    assert state.get(b'k2') is None
+
+
+def test_revert_to_uncommitted_head_keeps_its_nodes():
+    state = PruningState(KeyValueStorageInMemory())
+    state.set(b'k1', b'v1')
+    first_batch_head = state.headHash
+    state.set(b'k2', b'v2')
+
+    state.revertToHead(first_batch_head)
+    assert state.get(b'k1', isCommitted=False) == b'v1'
+    assert state.get(b'k2', isCommitted=False) is None
+
+    state.commit(rootHash=first_batch_head)
+    restarted = PruningState(state._kv)
+    assert restarted.get(b'k1') == b'v1'
+
+
+def stored_nodes(state):
+    return set(node_hash for node_hash, _ in state.stored_trie_nodes())
+
+
+def trie_nodes(state, roots):
+    return set(sha3(node) for node in state.get_trie_nodes(roots, 10 ** 6))
+
+
+def test_partially_reverted_batches_nodes_are_never_written():
+    state = PruningState(KeyValueStorageInMemory())
+    state.set(b'k1', b'v1')
+    state.set(b'k1', b'v2')
+    first_batch_head = state.headHash
+    state.set(b'k2', b'v2')
+    state.set(b'k3', b'v3')
+
+    state.revertToHead(first_batch_head)
+    state.commit(rootHash=first_batch_head)
+
+    # Only the nodes of the committed root, not the overwritten ones nor
+    # the ones of the reverted batch
+    assert stored_nodes(state) == trie_nodes(state, [first_batch_head])
+    assert state._db.pending_count == 0
+
+
+def test_only_nodes_of_committed_roots_are_written():
+    rnd = random.Random(1)
+    state = PruningState(KeyValueStorageInMemory())
+    committed = []
+    uncommitted = []
+    for _ in range(200):
+        action = rnd.random()
+        if action < 0.5:
+            for _ in range(3):
+                state.set(str(rnd.randrange(30)).encode(), str(rnd.random()).encode())
+            uncommitted.append((state.headHash,
+                                state.get_all_leaves_for_root_hash(state.headHash)))
+        elif action < 0.8 and uncommitted:
+            head, _ = uncommitted.pop(0)
+            state.commit(rootHash=head)
+            committed.append(head)
+        elif uncommitted:
+            del uncommitted[rnd.randrange(len(uncommitted)):]
+            head = uncommitted[-1][0] if uncommitted else state.committedHeadHash
+            state.revertToHead(head)
+
+        assert stored_nodes(state) == trie_nodes(state, committed)
+        # Heads left uncommitted are still whole
+        for head, items in uncommitted:
+            assert state.get_all_leaves_for_root_hash(head) == items
@@ -0,0 +1,121 @@
+import random
+
+import pytest
+import rlp
+from rlp.exceptions import DecodingError, EncodingError
+
+from state.db.persistent_db import PersistentDB
+from state.db.refcount_db import RefcountDB
+from state.trie.pruning_trie import Trie
+from state.util.fast_rlp import encode_optimized, decode_optimized, \
+    FAST_RLP, REFERENCE_RLP
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+# Items and their encodings from the RLP specification
+VECTORS = [
+    (b'', '80'),
+    (b'\x00', '00'),
+    (b'\x0f', '0f'),
+    (b'\x7f', '7f'),
+    (b'\x80', '8180'),
+    (b'\xff', '81ff'),
+    (b'dog', '83646f67'),
+    (b'\x04\x00', '820400'),
+    ([], 'c0'),
+    ([b'cat', b'dog'], 'c88363617483646f67'),
+    ([[], [[]], [[], [[]]]], 'c7c0c1c0c3c0c1c0'),
+    (b'Lorem ipsum dolor sit amet, consectetur adipisicing eli',
+     'b74c6f72656d20697073756d20646f6c6f722073697420616d65742c20636f6e7365'
+     '637465747572206164697069736963696e6720656c69'),
+    (b'Lorem ipsum dolor sit amet, consectetur adipisicing elit',
+     'b8384c6f72656d20697073756d20646f6c6f722073697420616d65742c20636f6e73'
+     '65637465747572206164697069736963696e6720656c6974'),
+    ([b'asdf', b'qwer', b'zxcv'] * 4,
+     'f83c' + ('8461736466' + '8471776572' + '847a786376') * 4),
+    (b'\x00' * 1024, 'b90400' + '00' * 1024),
+]
+
+INVALID = [
+    '',
+    '81',  # truncated short string
+    '8100',  # single byte encoded as short string
+    '817f',
+    'b800',  # long string prefix with zero length byte
+    'b80100',  # long string prefix for short string
+    'b90001' + '00' * 256,  # length with leading zero
+    'c1',  # truncated short list
+    'c38461616161',  # item runs past the end of its list
+    'f800',  # long list prefix for short list
+    'f90001' + '00' * 256,
+    '0000',  # superfluous bytes
+]
+
+
+def random_item(rnd, depth=0):
+    if depth < 4 and rnd.random() < 0.3:
+        return [random_item(rnd, depth + 1)
+                for _ in range(rnd.choice([0, 1, 2, 5, 17, 40]))]
+    length = rnd.choice([0, 1, 1, 1, 2, 31, 32, 55, 56, 57, 255, 256, 70000])
+    return rnd.getrandbits(8 * length).to_bytes(length, 'big') if length else b''
+
+
+@pytest.mark.parametrize('item, encoded', VECTORS)
+def test_vectors(item, encoded):
+    encoded = bytes.fromhex(encoded)
+    assert rlp.codec.encode_raw(item) == encoded
+    assert encode_optimized(item) == encoded
+    assert decode_optimized(encoded) == item
+    assert decode_optimized(bytearray(encoded)) == item
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_same_as_rlp_package(seed):
+    rnd = random.Random(seed)
+    for _ in range(20):
+        item = random_item(rnd)
+        encoded = rlp.codec.encode_raw(item)
+        assert encode_optimized(item) == encoded
+        assert decode_optimized(encoded) == rlp.decode(encoded) == item
+
+
+def test_tuples_and_strings_are_encoded_as_by_rlp_package():
+    for item in [(b'a', (b'b', b'')), 'dog', '', 'x', 'déjà', ['', b'\x00']]:
+        assert encode_optimized(item) == rlp.codec.encode_raw(item)
+
+    with pytest.raises(EncodingError):
+        encode_optimized([b'a', 1])
+
+
+@pytest.mark.parametrize('encoded', INVALID)
+def test_invalid_encodings_are_rejected(encoded):
+    encoded = bytes.fromhex(encoded)
+    with pytest.raises(DecodingError):
+        rlp.decode(encoded)
+    with pytest.raises(DecodingError):
+        decode_optimized(encoded)
+
+
+def test_trie_root_does_not_depend_on_codec():
+    fast = Trie(PersistentDB(KeyValueStorageInMemory()), codec=FAST_RLP)
+    reference = Trie(PersistentDB(KeyValueStorageInMemory()), codec=REFERENCE_RLP)
+    for i in range(1000):
+        key, value = str(i).encode(), str(i ** 3).encode()
+        fast.update(key, value)
+        reference.update(key, value)
+    for i in range(0, 1000, 7):
+        fast.delete(str(i).encode())
+        reference.delete(str(i).encode())
+
+    assert fast.root_hash == reference.root_hash
+    assert fast.to_dict() == reference.to_dict()
+    assert fast._db == reference._db
+
+
+def test_refcount_db_with_both_codecs_share_storage():
+    kv = KeyValueStorageInMemory()
+    RefcountDB(kv, codec=REFERENCE_RLP).inc_refcount(b'k', b'v')
+    db = RefcountDB(kv, codec=FAST_RLP)
+    assert db.get(b'k') == b'v'
+    db.inc_refcount(b'k', b'v')
+    db.dec_refcount(b'k')
+    assert RefcountDB(kv, codec=REFERENCE_RLP).get(b'k') == b'v'
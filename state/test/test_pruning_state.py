@@ -320,3 +320,19 @@ def test_get_all_leaves_for_root_hash_commited(state):
 def get_decoded_dict_values(state, head_hash):
     encoded_values = state.get_all_leaves_for_root_hash(head_hash)
     return {k: state.get_decoded(v) for k, v in encoded_values.items()}
+
+
+def test_get_for_root_hash_with_cached_roots(db):
+    state = PruningState(db, root_cache_size=2)
+    roots = []
+    for i in range(4):
+        state.set(b'k', str(i).encode())
+        state.commit()
+        roots.append(state.committedHeadHash)
+
+    for _ in range(2):
+        for i, root in enumerate(roots):
+            assert state.get_for_root_hash(root, b'k') == str(i).encode()
+            assert state.get_for_root_hash(root, b'other') is None
+    assert list(state._root_cache) == roots[-2:]
+    state.close()
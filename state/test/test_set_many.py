@@ -0,0 +1,100 @@
+import random
+
+import pytest
+
+from state.pruning_state import PruningState
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+
+class CountingStorage(KeyValueStorageInMemory):
+    def __init__(self):
+        super().__init__()
+        self.written = 0
+
+    def setBatch(self, batch):
+        for key, value in batch:
+            self.written += 1
+            super().put(key, value)
+
+
+def random_key(rnd):
+    # Short keys from a small alphabet so that they share prefixes and some
+    # of them are prefixes of others
+    return bytes(rnd.choice(b'\x00\x01\x10\x11') for _ in range(rnd.randint(0, 4)))
+
+
+def check_same_as_sequential_set(initial, items):
+    bulk = PruningState(KeyValueStorageInMemory())
+    sequential = PruningState(KeyValueStorageInMemory())
+    for key, value in initial:
+        bulk.set(key, value)
+        sequential.set(key, value)
+
+    bulk.set_many(items)
+    for key, value in items:
+        sequential.set(key, value)
+
+    assert bulk.headHash == sequential.headHash
+    assert bulk.as_dict == sequential.as_dict
+    for key, value in items:
+        assert bulk.get(key, isCommitted=False) == sequential.get(key, isCommitted=False)
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_set_many_same_as_sequential_set(seed):
+    rnd = random.Random(seed)
+    initial = [(random_key(rnd), str(i).encode())
+               for i in range(rnd.randint(0, 30))]
+    items = sorted((random_key(rnd), ('new' + str(i)).encode())
+                   for i in range(rnd.randint(1, 30)))
+    check_same_as_sequential_set(initial, items)
+
+
+@pytest.mark.parametrize('initial, keys', [
+    ([], [b'a']),
+    ([(b'abc', b'1')], [b'abc']),
+    ([(b'abc', b'1')], [b'ab', b'abd']),
+    ([(b'abc', b'1')], [b'x', b'y']),
+    ([(b'abc', b'1'), (b'abd', b'2')], [b'a', b'abe']),
+    ([(b'abc', b'1'), (b'abd', b'2')], [b'aa', b'b']),
+    ([(b'abc' * 20, b'1'), (b'abd' * 20, b'2')], [b'abc' * 20, b'abd' * 20]),
+])
+def test_set_many_on_every_node_type(initial, keys):
+    items = [(key, b'v' + key) for key in keys]
+    check_same_as_sequential_set(initial, items)
+
+
+def test_set_many_last_value_wins_for_repeated_key():
+    state = PruningState(KeyValueStorageInMemory())
+    state.set_many([(b'k1', b'v1'), (b'k2', b'v2'), (b'k2', b'v3')])
+    assert state.get(b'k2', isCommitted=False) == b'v3'
+
+    with pytest.raises(ValueError):
+        state.set_many([(b'k2', b'v'), (b'k1', b'v')])
+
+    head = state.headHash
+    state.set_many([])
+    assert state.headHash == head
+
+
+def test_set_many_writes_fewer_nodes():
+    items = [(str(i).encode() * 10, str(i).encode() * 10) for i in range(1000)]
+    items.sort()
+
+    bulk_kv = CountingStorage()
+    bulk = PruningState(bulk_kv)
+    bulk.set_many(items)
+    bulk.commit(bulk.headHash)
+
+    sequential_kv = CountingStorage()
+    sequential = PruningState(sequential_kv)
+    for key, value in items:
+        sequential.set(key, value)
+    sequential.commit(sequential.headHash)
+
+    assert bulk.committedHeadHash == sequential.committedHeadHash
+    # Only the nodes of the committed root get to the storage either way,
+    # fewer nodes are encoded and written to the buffer though
+    assert bulk_kv.written == sequential_kv.written
+    assert bulk._db._writes < sequential._db._writes / 2
+    assert PruningState(bulk_kv).get(items[500][0]) == items[500][1]
@@ -0,0 +1,54 @@
+from state.pruning_state import PruningState
+from state.trie.pruning_trie import Trie
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+
+def committed_state(**kwargs):
+    state = PruningState(KeyValueStorageInMemory(), **kwargs)
+    for i in range(100):
+        state.set(str(i).encode(), str(i).encode())
+    state.commit(state.headHash)
+    return state
+
+
+def test_proofs_against_committed_root_are_cached(monkeypatch):
+    state = committed_state(proof_cache_size=10)
+    root = state.committedHead
+    produced = []
+    generate = Trie.generate_state_proof
+
+    def counting_generate(self, key, *args, **kwargs):
+        produced.append(key)
+        return generate(self, key, *args, **kwargs)
+
+    monkeypatch.setattr(Trie, 'generate_state_proof', counting_generate)
+
+    first = state.generate_state_proof(b'42', root=root, serialize=True, get_value=True)
+    again = state.generate_state_proof(b'42', root=root, serialize=True, get_value=True)
+    assert again == first
+    assert produced == [b'42']
+    proof, value = first
+    assert PruningState.verify_state_proof(state.committedHeadHash, b'42', b'42',
+                                           proof, serialized=True)
+
+    # Proofs against uncommitted state are not cached
+    state.set(b'42', b'new')
+    state.generate_state_proof(b'42', serialize=True, get_value=True)
+    state.generate_state_proof(b'42', serialize=True, get_value=True)
+    assert produced == [b'42'] * 3
+
+    # New committed root drops the proofs
+    state.commit(state.headHash)
+    proof, value = state.generate_state_proof(b'42', root=state.committedHead,
+                                              serialize=True, get_value=True)
+    assert len(produced) == 4
+    assert PruningState.verify_state_proof(state.committedHeadHash, b'42', b'new',
+                                           proof, serialized=True)
+
+
+def test_proof_cache_is_bounded():
+    state = committed_state(proof_cache_size=10)
+    for i in range(50):
+        state.generate_state_proof(str(i).encode(), root=state.committedHead,
+                                   serialize=True)
+    assert len(state._proof_cache) == 10
@@ -0,0 +1,143 @@
+import random
+
+from state.pruning_state import PruningState
+from state.state_pruner import StatePruner
+from state.trie.pruning_trie import Trie
+from state.util.fast_rlp import decode_optimized as rlp_decode
+from state.util.utils import sha3
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+
+def apply_batches(state, rnd, count, keys=50):
+    for _ in range(count):
+        for _ in range(5):
+            key = str(rnd.randrange(keys)).encode()
+            state.set(key, str(rnd.random()).encode())
+        state.commit(state.headHash)
+
+
+def prune(pruner, step_size=10, between_steps=lambda: None):
+    steps = 0
+    while pruner.step(step_size):
+        between_steps()
+        steps += 1
+    return steps
+
+
+def test_nodes_of_old_roots_are_deleted():
+    rnd = random.Random(1)
+    state = PruningState(KeyValueStorageInMemory())
+    apply_batches(state, rnd, 50)
+    old_root = state.committedHeadHash
+    apply_batches(state, rnd, 50)
+    kept_root = state.committedHeadHash
+    kept = state.as_dict
+    size = state._kv.size
+
+    pruner = StatePruner(state)
+    pruner.start([kept_root])
+    assert prune(pruner) > 1
+
+    nodes, pruned_bytes = pruner.take_stats()
+    assert nodes > 0
+    assert state._kv.size == size - nodes
+    assert pruned_bytes > nodes * 32
+    assert pruner.take_stats() == (0, 0)
+
+    # Every node of the kept root is in place, old roots are gone
+    restarted = PruningState(state._kv)
+    assert restarted.as_dict == kept
+    assert state.get_trie_node(old_root) is None
+
+
+def test_pruning_same_as_rebuilding_kept_roots():
+    rnd = random.Random(2)
+    state = PruningState(KeyValueStorageInMemory())
+    apply_batches(state, rnd, 30)
+    roots = []
+    for _ in range(3):
+        apply_batches(state, rnd, 10)
+        roots.append(state.committedHeadHash)
+
+    pruner = StatePruner(state)
+    pruner.start(roots)
+    prune(pruner)
+
+    # Only the nodes of the kept tries are left
+    kept = set(sha3(node) for root in roots
+               for node in state.get_trie_nodes([root], 10 ** 6))
+    assert set(node_hash for node_hash, _ in state.stored_trie_nodes()) == kept
+
+
+def test_state_can_be_changed_while_pruning():
+    rnd = random.Random(3)
+    state = PruningState(KeyValueStorageInMemory())
+    apply_batches(state, rnd, 30)
+
+    # Uncommitted batch on top of the committed state
+    state.set(b'uncommitted', b'1')
+
+    pruner = StatePruner(state)
+    pruner.start([state.committedHeadHash, state.headHash])
+    steps = [0]
+
+    def change_state():
+        steps[0] += 1
+        if steps[0] % 3 == 0:
+            # Values of earlier batches are written again, recreating
+            # nodes which may be waiting for deletion
+            apply_batches(state, random.Random(steps[0] % 2), 1, keys=10)
+        if steps[0] % 7 == 0:
+            state.revertToHead(state.committedHeadHash)
+
+    prune(pruner, step_size=5, between_steps=change_state)
+    assert pruner.take_stats()[0] > 0
+
+    expected = state.as_dict
+    restarted = PruningState(state._kv)
+    assert restarted.as_dict == expected
+    # The uncommitted batch got committed with the first batch on top of it
+    assert restarted.get(b'uncommitted') == b'1'
+
+
+def test_stopped_pruning_deletes_nothing():
+    rnd = random.Random(4)
+    state = PruningState(KeyValueStorageInMemory())
+    apply_batches(state, rnd, 20)
+    size = state._kv.size
+
+    pruner = StatePruner(state)
+    pruner.start([state.committedHeadHash])
+    while pruner.phase != StatePruner.DELETING:
+        pruner.step(10)
+    pruner.stop()
+
+    assert not pruner.step(10)
+    assert state._kv.size == size
+    apply_batches(state, rnd, 1)
+    assert state._db._written is None
+
+
+class SortedPruningState(PruningState):
+    # Nodes are iterated in the order of their hashes, as in leveldb
+    def stored_trie_nodes(self):
+        return sorted(super().stored_trie_nodes())
+
+
+def test_abandoned_pruning_keeps_subtrees_whole():
+    rnd = random.Random(5)
+    state = SortedPruningState(KeyValueStorageInMemory())
+    apply_batches(state, rnd, 50)
+
+    pruner = StatePruner(state)
+    pruner.start([state.committedHeadHash])
+    while pruner.phase != StatePruner.DELETING:
+        pruner.step(10)
+    pruner.step(20)
+    pruner.stop()
+    assert pruner.take_stats()[0] == 20
+
+    # Every node left has all of its children, as snapshot sync relies on
+    for node_hash, encoded in state.stored_trie_nodes():
+        for child in Trie.child_hashes(rlp_decode(encoded)):
+            assert state.has_trie_node(child)
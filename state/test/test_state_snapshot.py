@@ -0,0 +1,133 @@
+import pytest
+
+from state.pruning_state import PruningState
+from state.state_snapshot import StateSnapshotReceiver
+from state.trie.pruning_trie import BLANK_ROOT
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+
+def fill_state(state, count, prefix=b'k'):
+    for i in range(count):
+        state.set(prefix + str(i).encode(), b'v' + str(i).encode())
+    state.commit(state.headHash)
+
+
+@pytest.fixture()
+def seeder_state():
+    state = PruningState(KeyValueStorageInMemory())
+    fill_state(state, 300)
+    yield state
+    state.close()
+
+
+@pytest.fixture()
+def leecher_state():
+    state = PruningState(KeyValueStorageInMemory())
+    yield state
+    state.close()
+
+
+def sync(receiver, seeder_state, hashes_per_req=4, max_nodes=20):
+    requests = 0
+    while not receiver.is_complete:
+        hashes = receiver.next_hashes_to_request(hashes_per_req)
+        assert hashes
+        receiver.add_nodes(seeder_state.get_trie_nodes(hashes, max_nodes))
+        # Reply may be cut before the subtrees of all requested nodes
+        receiver.request_again(hashes)
+        requests += 1
+    return requests
+
+
+def test_trie_nodes_start_with_requested(seeder_state):
+    root = seeder_state.committedHeadHash
+    nodes = seeder_state.get_trie_nodes([root], 10)
+    assert len(nodes) == 10
+    assert seeder_state.get_trie_nodes([root], 1) == nodes[:1]
+    assert seeder_state.get_trie_nodes([b'\x00' * 32, root], 1) == nodes[:1]
+
+    all_nodes = seeder_state.get_trie_nodes([root], 10 ** 6)
+    assert len(all_nodes) == len(set(all_nodes))
+    assert all_nodes[:10] == nodes
+
+
+def test_state_is_synced(seeder_state, leecher_state):
+    root = seeder_state.committedHeadHash
+    receiver = StateSnapshotReceiver(leecher_state, root, write_batch_size=7)
+    sync(receiver, seeder_state)
+    receiver.install()
+
+    assert leecher_state.committedHeadHash == root
+    assert leecher_state.headHash == root
+    assert leecher_state.as_dict == seeder_state.as_dict
+    assert leecher_state.get(b'k42') == b'v42'
+
+    leecher_state.set(b'k42', b'new')
+    seeder_state.set(b'k42', b'new')
+    assert leecher_state.headHash == seeder_state.headHash
+
+
+def test_nodes_not_in_trie_are_ignored(seeder_state, leecher_state):
+    other_state = PruningState(KeyValueStorageInMemory())
+    fill_state(other_state, 300, prefix=b'other')
+
+    receiver = StateSnapshotReceiver(leecher_state, seeder_state.committedHeadHash)
+    hashes = receiver.next_hashes_to_request(1)
+    assert receiver.add_nodes(
+        other_state.get_trie_nodes([other_state.committedHeadHash], 100)) == 0
+    # A node is not accepted before its parent
+    children = seeder_state.get_trie_nodes(hashes, 100)[1:]
+    assert receiver.add_nodes(children) == 0
+    assert receiver.nodes_received == 0
+
+    receiver.request_again(hashes)
+    sync(receiver, seeder_state)
+    receiver.install()
+    assert leecher_state.as_dict == seeder_state.as_dict
+
+
+def test_install_fails_if_incomplete(seeder_state, leecher_state):
+    receiver = StateSnapshotReceiver(leecher_state, seeder_state.committedHeadHash)
+    receiver.add_nodes(seeder_state.get_trie_nodes(
+        receiver.next_hashes_to_request(1), 5))
+    with pytest.raises(RuntimeError):
+        receiver.install()
+    assert leecher_state.committedHeadHash == BLANK_ROOT
+
+
+def test_only_changed_subtrees_are_synced(seeder_state, leecher_state):
+    full = StateSnapshotReceiver(leecher_state, seeder_state.committedHeadHash)
+    sync(full, seeder_state)
+    full.install()
+
+    seeder_state.set(b'k7', b'changed')
+    seeder_state.set(b'new', b'value')
+    seeder_state.commit(seeder_state.headHash)
+    receiver = StateSnapshotReceiver(leecher_state, seeder_state.committedHeadHash)
+    sync(receiver, seeder_state, max_nodes=1)
+    receiver.install()
+
+    assert receiver.nodes_received < full.nodes_received // 10
+    assert leecher_state.as_dict == seeder_state.as_dict
+    assert leecher_state.get(b'k7') == b'changed'
+
+
+def test_interrupted_sync_leaves_complete_subtrees(seeder_state, leecher_state):
+    root = seeder_state.committedHeadHash
+    receiver = StateSnapshotReceiver(leecher_state, root, write_batch_size=1)
+    for _ in range(10):
+        receiver.add_nodes(seeder_state.get_trie_nodes(
+            receiver.next_hashes_to_request(1), 3))
+    assert receiver.nodes_written > 0
+    assert not receiver.is_complete
+
+    # Restarted sync does not trust nodes which are not written
+    receiver = StateSnapshotReceiver(leecher_state, root)
+    sync(receiver, seeder_state)
+    receiver.install()
+    assert leecher_state.as_dict == seeder_state.as_dict
+
+
+def test_empty_or_present_root_is_complete(seeder_state, leecher_state):
+    assert StateSnapshotReceiver(leecher_state, BLANK_ROOT).is_complete
+    assert StateSnapshotReceiver(seeder_state, seeder_state.committedHeadHash).is_complete
@@ -0,0 +1,107 @@
+import random
+
+import pytest
+
+from state.pruning_state import PruningState
+from state.trie.node_cache import TrieNodeCache, node_size
+from storage.kv_in_memory import KeyValueStorageInMemory
+
+
+class CountingStorage(KeyValueStorageInMemory):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def get(self, key):
+        self.reads += 1
+        return super().get(key)
+
+
+def test_cached_state_same_as_plain():
+    cached = PruningState(KeyValueStorageInMemory(), node_cache_size=1024 * 1024)
+    plain = PruningState(KeyValueStorageInMemory())
+    rnd = random.Random(7)
+    keys = [str(i).encode() for i in range(200)]
+
+    for i in range(1000):
+        key = rnd.choice(keys)
+        op = rnd.random()
+        if op < 0.6:
+            value = str(i).encode()
+            cached.set(key, value)
+            plain.set(key, value)
+        elif op < 0.7:
+            cached.remove(key)
+            plain.remove(key)
+        elif op < 0.75:
+            cached.commit(cached.headHash)
+            plain.commit(plain.headHash)
+        elif op < 0.8:
+            cached.revertToHead(cached.committedHeadHash)
+            plain.revertToHead(plain.committedHeadHash)
+        assert cached.get(key, isCommitted=False) == plain.get(key, isCommitted=False)
+        assert cached.get(key) == plain.get(key)
+        assert cached.headHash == plain.headHash
+
+    assert cached.committedHeadHash == plain.committedHeadHash
+    assert cached.as_dict == plain.as_dict
+    hits, misses = cached.take_node_cache_stats()
+    assert hits > misses
+    assert cached.take_node_cache_stats() == (0, 0)
+
+
+def test_committed_reads_are_served_from_cache():
+    kv = CountingStorage()
+    state = PruningState(kv, node_cache_size=1024 * 1024)
+    for i in range(100):
+        state.set(str(i).encode(), str(i).encode())
+    state.commit(state.headHash)
+
+    assert state.get(b'42') == b'42'
+    kv.reads = 0
+    for _ in range(10):
+        assert state.get(b'42') == b'42'
+        assert state.get(b'42', isCommitted=False) == b'42'
+    assert kv.reads == 0
+
+
+def test_committed_root_survives_restart():
+    kv = KeyValueStorageInMemory()
+    state = PruningState(kv, node_cache_size=1024 * 1024)
+    state.set(b'k', b'v')
+    state.commit(state.headHash)
+    state.set(b'k', b'uncommitted')
+
+    restarted = PruningState(kv, node_cache_size=1024 * 1024)
+    assert restarted.committedHeadHash == state.committedHeadHash
+    assert restarted.get(b'k') == b'v'
+
+
+def test_cache_is_bounded_by_size():
+    state = PruningState(KeyValueStorageInMemory(), node_cache_size=4096)
+    for i in range(300):
+        state.set(str(i).encode(), str(i).encode())
+    state.commit(state.headHash)
+    for i in range(300):
+        state.get(str(i).encode())
+
+    cache = state._node_cache
+    assert 0 < cache.size <= cache.max_size
+    assert cache.size == sum(size for _, size in cache._nodes.values())
+
+
+def test_cache_evicts_least_recently_used():
+    node = [b'\x20' + b'k' * 10, b'v' * 10]
+    cache = TrieNodeCache(max_size=2 * node_size(node))
+    cache.put(b'1', node)
+    cache.put(b'2', list(node))
+    cache.get(b'1')
+    cache.put(b'3', list(node))
+
+    assert cache.get(b'2') is None
+    assert cache.get(b'1') == node
+    assert cache.get(b'3') == node
+    assert cache.take_stats() == (3, 1)
+
+    with pytest.raises(ValueError):
+        TrieNodeCache(0)
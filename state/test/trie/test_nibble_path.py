@@ -0,0 +1,29 @@
+import random
+
+from state.trie.pruning_trie import bin_to_nibble_path, bin_to_nibbles, \
+    pack_nibbles, unpack_to_nibble_path, unpack_to_nibbles, \
+    key_path_from_key_value_node, key_nibbles_from_key_value_node, \
+    NIBBLE_TERMINATOR
+
+
+def test_nibble_path_same_as_nibble_list():
+    rnd = random.Random(0)
+    for length in range(40):
+        key = bytes(rnd.getrandbits(8) for _ in range(length))
+        assert list(bin_to_nibble_path(key)) == bin_to_nibbles(key)
+    assert bin_to_nibble_path('he') == b'\x06\x08\x06\x05'
+
+
+def test_unpacked_nibble_path_same_as_nibble_list():
+    rnd = random.Random(1)
+    for length in range(1, 20):
+        for terminated in (False, True):
+            nibbles = [rnd.randrange(16) for _ in range(length)]
+            if terminated:
+                nibbles.append(NIBBLE_TERMINATOR)
+            packed = pack_nibbles(nibbles)
+            assert list(unpack_to_nibble_path(packed)) == nibbles
+            assert unpack_to_nibbles(packed) == nibbles
+            node = [packed, b'value']
+            assert list(key_path_from_key_value_node(node)) == \
+                key_nibbles_from_key_value_node(node)
@@ -0,0 +1,80 @@
+import threading
+from collections import OrderedDict
+
+# Rough CPython sizes of an empty list, a pointer in it and an empty bytes
+# object, used to keep the cache within its memory budget
+LIST_SIZE = 56
+POINTER_SIZE = 8
+BYTES_SIZE = 33
+
+
+def node_size(node) -> int:
+    size = LIST_SIZE + POINTER_SIZE * len(node)
+    for item in node:
+        if isinstance(item, list):
+            size += node_size(item)
+        else:
+            size += BYTES_SIZE + len(item)
+    return size
+
+
+def copy_node(node):
+    return [copy_node(item) if isinstance(item, list) else item
+            for item in node]
+
+
+class TrieNodeCache:
+    # Keeps the most recently used decoded trie nodes keyed by their hashes.
+    # Nodes are stored under the hash of their content, so a cached node
+    # never becomes stale and is only evicted once the total size of the
+    # cached nodes exceeds `max_size` bytes. The cache is shared by the
+    # threads reading the state, like state proof and signature workers.
+    def __init__(self, max_size: int):
+        if max_size < 1:
+            raise ValueError("max_size must be positive, got {}"
+                             .format(max_size))
+        self.max_size = max_size
+        self.size = 0
+        self._nodes = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def get(self, node_hash: bytes):
+        with self._lock:
+            entry = self._nodes.get(node_hash)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._nodes.move_to_end(node_hash)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, node_hash: bytes, node):
+        size = node_size(node)
+        if size > self.max_size:
+            return
+        with self._lock:
+            if node_hash in self._nodes:
+                return
+            self._nodes[node_hash] = (node, size)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, evicted_size) = self._nodes.popitem(last=False)
+                self.size -= evicted_size
+
+    def take_stats(self):
+        """
+        Return the number of cache hits and misses since the last call
+        """
+        stats = self.hits, self.misses
+        self.hits = self.misses = 0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._nodes.clear()
+            self.size = 0
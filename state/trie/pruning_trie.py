@@ -1,12 +1,14 @@
 #!/usr/bin/env python
 
 import copy
+import threading
 
 from common.exceptions import PlenumTypeError, PlenumValueError
 
-import rlp
 from state.db.db import BaseDB
-from state.util.fast_rlp import encode_optimized, decode_optimized
+from state.trie.node_cache import TrieNodeCache, copy_node
+from state.util.fast_rlp import encode_optimized, decode_optimized, \
+    RlpCodec, FAST_RLP
 from state.util.utils import is_string, to_string, sha3, sha3rlp, encode_int, str_to_bytes, encode_hex
 from storage.kv_in_memory import KeyValueStorageInMemory
 
@@ -17,6 +19,24 @@ bin_to_nibbles_cache = {}
 
 hti = {c: i for i, c in enumerate('0123456789abcdef')}
 
+# Hex digits of a key translated to nibble values, so that a key path is
+# built at C speed as a bytes object with one nibble per byte
+_HEX_TO_NIBBLE = bytes.maketrans(b'0123456789abcdef', bytes(range(16)))
+
+
+def bin_to_nibble_path(s):
+    """convert string s to a nibble path, bytes with a nibble per byte
+
+    Paths are compared and sliced like nibble lists, but are built
+    without an int object per nibble.
+
+    >>> bin_to_nibble_path(b"he")
+    b'\\x06\\x08\\x06\\x05'
+    """
+    if isinstance(s, str):
+        s = s.encode('utf-8')
+    return s.hex().encode().translate(_HEX_TO_NIBBLE)
+
 
 def bin_to_nibbles(s):
     """convert string s to nibbles (half-bytes)
@@ -30,7 +50,7 @@ def bin_to_nibbles(s):
     >>> bin_to_nibbles("hello")
     [6, 8, 6, 5, 6, 12, 6, 12, 6, 15]
     """
-    return [hti[c] for c in encode_hex(s)]
+    return list(bin_to_nibble_path(s))
 
 
 def nibbles_to_bin(nibbles):
@@ -52,10 +72,10 @@ NONE = 0
 VERIFYING = -1
 ZERO_ENCODED = encode_int(0)
 
-proving = False
 
-
-class ProofConstructor:
+class ProofConstructor(threading.local):
+    # Every thread records its own proofs, so that a proof produced in one
+    # thread never picks up nodes read by the trie in another one
 
     def __init__(self):
         self.mode = []
@@ -63,8 +83,6 @@ class ProofConstructor:
         self.exempt = []
 
     def push(self, mode, nodes=None):
-        global proving
-        proving = True
         self.mode.append(mode)
         self.exempt.append(set())
         if mode == VERIFYING:
@@ -74,15 +92,12 @@ class ProofConstructor:
             self.nodes.append(set())
 
     def pop(self):
-        global proving
         self.mode.pop()
         self.nodes.pop()
         self.exempt.pop()
-        if not self.mode:
-            proving = False
 
     def get_nodelist(self):
-        return list(map(rlp.decode, list(self.nodes[-1])))
+        return list(map(rlp_decode, list(self.nodes[-1])))
 
     def get_nodes(self):
         return self.nodes[-1]
@@ -160,21 +175,37 @@ def pack_nibbles(nibbles):
     return o
 
 
+def unpack_to_nibble_path(bindata):
+    """unpack packed binary data to a nibble path
+
+    :param bindata: binary packed from nibbles
+    :return: nibble path, ends with a terminator for leaves
+    """
+    path = bin_to_nibble_path(bindata)
+    flags = path[0]
+    path = path[1:] if flags & 1 else path[2:]
+    if flags & 2:
+        path += b'\x10'
+    return path
+
+
 def unpack_to_nibbles(bindata):
     """unpack packed binary data to nibbles
 
     :param bindata: binary packed from nibbles
     :return: nibbles sequence, may have a terminator
     """
-    o = bin_to_nibbles(bindata)
-    flags = o[0]
-    if flags & 2:
-        o.append(NIBBLE_TERMINATOR)
-    if flags & 1 == 1:
-        o = o[1:]
-    else:
-        o = o[2:]
-    return o
+    return list(unpack_to_nibble_path(bindata))
+
+
+def common_prefix(a, b):
+    ''' longest sequence both a and b start with
+    '''
+    length = min(len(a), len(b))
+    for i in range(length):
+        if a[i] != b[i]:
+            return a[:i]
+    return a[:length]
 
 
 def starts_with(full, part):
@@ -203,6 +234,11 @@ def key_nibbles_from_key_value_node(node):
     return without_terminator(unpack_to_nibbles(node[0]))
 
 
+def key_path_from_key_value_node(node):
+    path = unpack_to_nibble_path(node[0])
+    return path[:-1] if path[-1:] == b'\x10' else path
+
+
 BLANK_NODE = b''
 BLANK_ROOT = sha3rlp(BLANK_NODE)
 DEATH_ROW_OFFSET = 2**62
@@ -214,13 +250,22 @@ def transient_trie_exception(*args):
 
 class Trie:
 
-    def __init__(self, db: BaseDB, root_hash=BLANK_ROOT, transient=False):
+    def __init__(self, db: BaseDB, root_hash=BLANK_ROOT, transient=False,
+                 node_cache: TrieNodeCache = None, codec: RlpCodec = FAST_RLP):
         '''it also present a dictionary like interface
 
         :param db key value database
         :root: blank or trie node in form of [key, value] or [v0,v1..v15,v]
+        :param node_cache cache of decoded nodes read from the database
+        :param codec RLP encoding of the nodes
         '''
         self._db = db  # Pass in a database object directly
+        self._node_cache = node_cache
+        self._rlp_encode = codec.encode
+        self._rlp_decode = codec.decode
+        # Old nodes are only worth copying and hashing on updates when the
+        # database keeps reference counts of the nodes
+        self._counts_references = getattr(db, 'counts_references', True)
         self.transient = transient
         if self.transient:
             self.update = self.get = self.delete = transient_trie_exception
@@ -231,8 +276,7 @@ class Trie:
 
     # For SPV proof production/verification purposes
     def spv_grabbing(self, node):
-        global proving
-        if not proving:
+        if not proof.mode:
             pass
         elif proof.get_mode() == RECORDING:
             proof.add_node(copy.copy(node))
@@ -243,8 +287,7 @@ class Trie:
                 raise InvalidSPVProof("Proof invalid!")
 
     def spv_storing(self, node):
-        global proving
-        if not proving:
+        if not proof.mode:
             pass
         elif proof.get_mode() == RECORDING:
             proof.add_exempt(copy.copy(node))
@@ -263,11 +306,16 @@ class Trie:
         if self.root_node == BLANK_NODE:
             return BLANK_ROOT
         assert isinstance(self.root_node, list)
-        val = rlp_encode(self.root_node)
+        val = self._rlp_encode(self.root_node)
         key = sha3(val)
         self.spv_grabbing(self.root_node)
         return key
 
+    def _copy_root(self):
+        if not self._counts_references:
+            return self.root_node
+        return copy.deepcopy(self.root_node)
+
     def replace_root_hash(self, old_node, new_node):
         # sys.stderr.write('rrh %r %r\n' % (old_node, new_node))
         self._delete_node_storage(old_node, is_root=True)
@@ -335,7 +383,7 @@ class Trie:
         if node == BLANK_NODE:
             return BLANK_NODE
         # assert isinstance(node, list)
-        rlpnode = rlp_encode(node)
+        rlpnode = self._rlp_encode(node)
         if len(rlpnode) < 32 and not is_root:
             return node
 
@@ -348,7 +396,16 @@ class Trie:
             return BLANK_NODE
         if isinstance(encoded, list):
             return encoded
-        o = rlp.decode(self._db.get(encoded))
+        if self._node_cache is None:
+            o = self._rlp_decode(self._db.get(encoded))
+        else:
+            o = self._node_cache.get(encoded)
+            if o is None:
+                o = self._rlp_decode(self._db.get(encoded))
+                self._node_cache.put(encoded, o)
+            # Updates change decoded nodes in place, the cached ones
+            # have to stay as they are
+            o = copy_node(o)
         self.spv_grabbing(o)
         return o
 
@@ -366,45 +423,76 @@ class Trie:
             return NODE_TYPE_BLANK
 
         if len(node) == 2:
-            nibbles = unpack_to_nibbles(node[0])
-            has_terminator = (nibbles and nibbles[-1] == NIBBLE_TERMINATOR)
+            # terminator flag of the packed key, see `pack_nibbles`
+            has_terminator = node[0] and node[0][0] & 0x20
             return NODE_TYPE_LEAF if has_terminator\
                 else NODE_TYPE_EXTENSION
         if len(node) == 17:
             return NODE_TYPE_BRANCH
 
+    @staticmethod
+    def child_hashes(node):
+        ''' get hashes of the nodes the node refers to
+
+        Children shorter than a hash are embedded into the node itself,
+        the hashes those refer to are returned instead of them.
+
+        :param node: node in form of list, or BLANK_NODE
+        :return: list of hashes of the child nodes
+        '''
+        node_type = Trie._get_node_type(node)
+        if node_type == NODE_TYPE_BRANCH:
+            children = node[:16]
+        elif node_type == NODE_TYPE_EXTENSION:
+            children = [node[1]]
+        else:
+            return []
+        hashes = []
+        for child in children:
+            if isinstance(child, list):
+                hashes.extend(Trie.child_hashes(child))
+            elif child != BLANK_NODE:
+                hashes.append(child)
+        return hashes
+
     def _get(self, node, key):
         """ get value inside a node
 
         :param node: node in form of list, or BLANK_NODE
-        :param key: nibble list without terminator
+        :param key: nibble path (see `bin_to_nibble_path`) or nibble list
+            without terminator
         :return:
             BLANK_NODE if does not exist, otherwise value or hash
         """
-        node_type = self._get_node_type(node)
-
-        if node_type == NODE_TYPE_BLANK:
-            return BLANK_NODE
-
-        if node_type == NODE_TYPE_BRANCH:
-            # already reach the expected node
-            if not key:
-                return node[-1]
-            sub_node = self._decode_to_node(node[key[0]])
-            return self._get(sub_node, key[1:])
+        if not isinstance(key, bytes):
+            key = bytes(key)
+        # Walk down by an offset into the path instead of slicing it
+        pos = 0
+        while True:
+            node_type = self._get_node_type(node)
 
-        # key value node
-        curr_key = key_nibbles_from_key_value_node(node)
-        if node_type == NODE_TYPE_LEAF:
-            return node[1] if key == curr_key else BLANK_NODE
+            if node_type == NODE_TYPE_BLANK:
+                return BLANK_NODE
 
-        if node_type == NODE_TYPE_EXTENSION:
-            # traverse child nodes
-            if starts_with(key, curr_key):
-                sub_node = self._get_inner_node_from_extension(node)
-                return self._get(sub_node, key[len(curr_key):])
-            else:
+            if node_type == NODE_TYPE_BRANCH:
+                # already reach the expected node
+                if pos == len(key):
+                    return node[-1]
+                node = self._decode_to_node(node[key[pos]])
+                pos += 1
+                continue
+
+            # key value node
+            curr_key = key_path_from_key_value_node(node)
+            if node_type == NODE_TYPE_LEAF:
+                return node[1] if len(key) - pos == len(curr_key) and \
+                    key.startswith(curr_key, pos) else BLANK_NODE
+
+            # traverse child nodes of extension
+            if not key.startswith(curr_key, pos):
                 return BLANK_NODE
+            node = self._get_inner_node_from_extension(node)
+            pos += len(curr_key)
 
     def _get_last_node_for_prfx(self, node, key_prfx, seen_prfx):
         """ get last node for the given prefix, also update `seen_prfx` to track the path already traversed
@@ -495,6 +583,8 @@ class Trie:
 
     def _update_and_delete_storage(self, node, key, value):
         # sys.stderr.write('uds_start %r\n' % node)
+        if not self._counts_references:
+            return self._update(node, key, value)
         old_node = copy.deepcopy(node)
         new_node = self._update(node, key, value)
         # sys.stderr.write('uds_mid %r\n' % old_node)
@@ -502,6 +592,107 @@ class Trie:
         # sys.stderr.write('uds_end %r\n' % old_node)
         return new_node
 
+    def _update_many(self, node, items):
+        """ update a node with several keys at once
+
+        :param node: node in form of list, or BLANK_NODE
+        :param items: (nibble list, value) pairs with unique keys sorted by
+            key, keys are relative to the node
+        :return: new node
+
+        Every node on the paths of the keys is changed and encoded once,
+        no matter how many of the keys go through it.
+        """
+        if len(items) == 1:
+            key, value = items[0]
+            return self._update_and_delete_storage(node, key, value)
+
+        node_type = self._get_node_type(node)
+
+        if node_type == NODE_TYPE_BLANK:
+            return self._build_node(items)
+
+        if node_type == NODE_TYPE_BRANCH:
+            self._update_branch_children(node, items)
+            self._encode_node(node)
+            return node
+
+        curr_key = key_nibbles_from_key_value_node(node)
+        if node_type == NODE_TYPE_LEAF:
+            # Nothing hangs below a leaf, so the subtree is built anew
+            # from its value and the new ones
+            values = {tuple(curr_key): node[1]}
+            values.update((tuple(key), value) for key, value in items)
+            return self._build_node([(list(key), values[key])
+                                     for key in sorted(values)])
+
+        # Extension node, the new subtree starts where the keys leave its path
+        prefix_len = len(curr_key)
+        for key, _ in items:
+            prefix_len = min(prefix_len, len(common_prefix(curr_key, key)))
+            if prefix_len == 0:
+                break
+        items = [(key[prefix_len:], value) for key, value in items]
+
+        if prefix_len == len(curr_key):
+            new_node = self._update_many(self._decode_to_node(node[1]), items)
+        else:
+            new_node = [BLANK_NODE] * 17
+            remain_key = curr_key[prefix_len + 1:]
+            new_node[curr_key[prefix_len]] = node[1] if not remain_key else \
+                self._encode_node([pack_nibbles(remain_key), node[1]])
+            self._update_branch_children(new_node, items)
+            self._encode_node(new_node)
+
+        if prefix_len == 0:
+            return new_node
+        o = [pack_nibbles(curr_key[:prefix_len]), self._encode_node(new_node)]
+        self._encode_node(o)
+        return o
+
+    def _update_branch_children(self, node, items):
+        start = 0
+        if not items[0][0]:
+            node[-1] = items[0][1]
+            start = 1
+        while start < len(items):
+            nibble = items[start][0][0]
+            end = start + 1
+            while end < len(items) and items[end][0][0] == nibble:
+                end += 1
+            child = self._update_many(
+                self._decode_to_node(node[nibble]),
+                [(key[1:], value) for key, value in items[start:end]])
+            node[nibble] = self._encode_node(child)
+            start = end
+
+    def _build_node(self, items):
+        """ build a new subtree with the keys
+
+        :param items: (nibble list, value) pairs with unique keys sorted by
+            key, at least one of them
+        :return: new node
+        """
+        if len(items) == 1:
+            key, value = items[0]
+            o = [pack_nibbles(with_terminator(key)), value]
+            self._encode_node(o)
+            return o
+
+        # Keys are sorted, so the first and the last ones differ the most
+        prefix = common_prefix(items[0][0], items[-1][0])
+        if prefix:
+            child = self._build_node([(key[len(prefix):], value)
+                                      for key, value in items])
+            o = [pack_nibbles(prefix), self._encode_node(child)]
+            self._encode_node(o)
+            return o
+
+        o = [BLANK_NODE] * 17
+        self._update_branch_children(o, items)
+        self._encode_node(o)
+        return o
+
     def _update_kv_node(self, node, key, value):
         node_type = self._get_node_type(node)
         curr_key = key_nibbles_from_key_value_node(node)
@@ -666,10 +857,10 @@ class Trie:
         '''delete storage
         :param node: node in form of list, or BLANK_NODE
         '''
-        if node == BLANK_NODE:
+        if node == BLANK_NODE or not self._counts_references:
             return
         # assert isinstance(node, list)
-        encoded = rlp_encode(node)
+        encoded = self._rlp_encode(node)
         if len(encoded) < 32 and not is_root:
             return
         """
@@ -745,6 +936,8 @@ class Trie:
 
     def _delete_and_delete_storage(self, node, key):
         # sys.stderr.write('dds_start %r\n' % node)
+        if not self._counts_references:
+            return self._delete(node, key)
         old_node = copy.deepcopy(node)
         new_node = self._delete(node, key)
         # sys.stderr.write('dds_mid %r\n' % old_node)
@@ -841,7 +1034,7 @@ class Trie:
         # if len(key) > 32:
         #     raise Exception("Max key length is 32")
 
-        old_root = copy.deepcopy(self.root_node)
+        old_root = self._copy_root()
         self.root_node = self._delete_and_delete_storage(
             self.root_node,
             bin_to_nibbles(to_string(key)))
@@ -983,7 +1176,7 @@ class Trie:
                 yield (to_string(NIBBLE_TERMINATOR), node[-1])
 
     def get(self, key):
-        return self._get(self.root_node, bin_to_nibbles(to_string(key)))
+        return self._get(self.root_node, bin_to_nibble_path(key))
 
     def __len__(self):
         return self._get_size(self.root_node)
@@ -1019,13 +1212,38 @@ class Trie:
 
         # if value == '':
         #     return self.delete(key)
-        old_root = copy.deepcopy(self.root_node)
+        old_root = self._copy_root()
         self.root_node = self._update_and_delete_storage(
             self.root_node,
             bin_to_nibbles(to_string(key)),
             to_string(value))
         self.replace_root_hash(old_root, self.root_node)
 
+    def update_many(self, items):
+        '''
+        :param items: (key, value) pairs of strings sorted by key, for
+            repeated keys the last value is taken
+        '''
+        nibble_items = []
+        for key, value in items:
+            if not is_string(key):
+                raise Exception("Key must be string")
+            if not is_string(value):
+                raise Exception("Value must be string")
+            key = bin_to_nibbles(to_string(key))
+            if nibble_items and nibble_items[-1][0] == key:
+                nibble_items[-1] = (key, to_string(value))
+            elif nibble_items and nibble_items[-1][0] > key:
+                raise ValueError("Items must be sorted by key")
+            else:
+                nibble_items.append((key, to_string(value)))
+        if not nibble_items:
+            return
+
+        old_root = self._copy_root()
+        self.root_node = self._update_many(self.root_node, nibble_items)
+        self.replace_root_hash(old_root, self.root_node)
+
     def root_hash_valid(self):
         if self.root_hash == BLANK_ROOT:
             return True
@@ -1038,7 +1256,7 @@ class Trie:
         :param key:
         :return:
         """
-        return self._get(root_node, bin_to_nibbles(to_string(key)))
+        return self._get(root_node, bin_to_nibble_path(key))
 
     def produce_spv_proof(self, key, root=None, get_value=False):
         root = root if root is not None else self.root_node
@@ -1,20 +1,35 @@
-import sys
-
 import rlp
-from state.util.utils import int_to_big_endian, big_endian_to_int, safe_ord
+from rlp.exceptions import DecodingError, EncodingError
 from storage.kv_in_memory import KeyValueStorageInMemory
 
+# Prefixes of strings and lists shorter than 56 bytes, the most of the trie
+# node items, so that they are not built on every encode
+_SHORT_STRING_PREFIXES = [bytes([0x80 + length]) for length in range(56)]
+_SHORT_LIST_PREFIXES = [bytes([0xc0 + length]) for length in range(56)]
+
 
 def _encode_optimized(item):
-    """RLP encode (a nested sequence of) bytes"""
+    """RLP encode (a nested sequence of) bytes, byte to byte the same as
+    `rlp.codec.encode_raw`"""
     if isinstance(item, bytes):
-        if len(item) == 1 and ord(item) < 128:
+        length = len(item)
+        if length == 1 and item[0] < 0x80:
             return item
-        prefix = length_prefix(len(item), 128)
-    else:
-        item = b''.join([_encode_optimized(x) for x in item])
-        prefix = length_prefix(len(item), 192)
-    return prefix + item
+        if length < 56:
+            return _SHORT_STRING_PREFIXES[length] + item
+        return length_prefix(length, 0x80) + item
+    if isinstance(item, (list, tuple)):
+        payload = b''.join([_encode_optimized(x) for x in item])
+        length = len(payload)
+        if length < 56:
+            return _SHORT_LIST_PREFIXES[length] + payload
+        return length_prefix(length, 0xc0) + payload
+    if isinstance(item, (bytearray, memoryview)):
+        return _encode_optimized(bytes(item))
+    if isinstance(item, str):
+        return _encode_optimized(item.encode('utf-8'))
+    raise EncodingError('Cannot encode object of type {0}'
+                        .format(type(item).__name__), item)
 
 
 def length_prefix(length, offset):
@@ -25,87 +40,132 @@ def length_prefix(length, offset):
                    list
     """
     if length < 56:
-        return chr(offset + length)
-    else:
-        length_string = int_to_big_endian(length)
-        return chr(offset + 56 - 1 + len(length_string)) + length_string
+        return bytes([offset + length])
+    if length >= 256 ** 8:
+        raise EncodingError('Item too big to encode', length)
+    length_string = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+    return bytes([offset + 56 - 1 + len(length_string)]) + length_string
 
 
 def _decode_optimized(rlp):
-    o = []
-    pos = 0
-    _typ, _len, pos = consume_length_prefix(rlp, pos)
-    if _typ != list:
-        return rlp[pos: pos + _len]
-    while pos < len(rlp):
-        _, _l, _p = consume_length_prefix(rlp, pos)
-        o.append(_decode_optimized(rlp[pos: _l + _p]))
-        pos = _l + _p
-    return o
-
-
-def consume_length_prefix(rlp, start):
-    """Read a length prefix from an RLP string.
-
-    :param rlp: the rlp string to read from
+    """Decode an RLP string into (a nested list of) bytes, rejecting the same
+    malformed and non-canonical encodings as `rlp.decode`"""
+    if isinstance(rlp, str):
+        rlp = rlp.encode('utf-8')
+    data = rlp if isinstance(rlp, bytes) else bytes(rlp)
+    try:
+        item, end = consume_item(data, 0)
+    except IndexError:
+        raise DecodingError('RLP string to short', rlp)
+    if end != len(data):
+        raise DecodingError('RLP string ends with {} superfluous bytes'
+                            .format(len(data) - end), rlp)
+    return item
+
+
+def consume_item(data, start):
+    """Read an item from an RLP string.
+
+    Nested items are read in place by their offsets, only the decoded
+    strings are copied out of the string. This is faster than slicing a
+    memoryview, as trie node items are mostly short.
+
+    :param data: the rlp string to read from
     :param start: the position at which to start reading
-    :returns: a tuple ``(type, length, end)``, where ``type`` is either ``str``
-              or ``list`` depending on the type of the following payload,
-              ``length`` is the length of the payload in bytes, and ``end`` is
-              the position of the first payload byte in the rlp string
+    :returns: a tuple ``(item, end)`` where ``item`` is the read item and
+              ``end`` is the position of the first unprocessed byte
     """
-    b0 = safe_ord(rlp[start])
-    if b0 < 128:  # single byte
-        return (str, 1, start)
-    elif b0 < 128 + 56:  # short string
-        return (str, b0 - 128, start + 1)
-    elif b0 < 192:  # long string
-        ll = b0 - 128 - 56 + 1
-        l_idx = big_endian_to_int(rlp[start + 1:start + 1 + ll])
-        return (str, l_idx, start + 1 + ll)
-    elif b0 < 192 + 56:  # short list
-        return (list, b0 - 192, start + 1)
+    b0 = data[start]
+    if b0 < 0x80:  # single byte
+        return data[start:start + 1], start + 1
+    if b0 < 0xb8:  # short string
+        start += 1
+        end = start + b0 - 0x80
+        if end > len(data):
+            raise IndexError
+        if end == start + 1 and data[start] < 0x80:
+            raise DecodingError('Encoded as short string although single '
+                                'byte was possible', data)
+        return data[start:end], end
+    if b0 < 0xc0:  # long string
+        start, end = _consume_long_length(data, start, b0 - 0xb7)
+        if end > len(data):
+            raise IndexError
+        return data[start:end], end
+    if b0 < 0xf8:  # short list
+        start += 1
+        end = start + b0 - 0xc0
     else:  # long list
-        ll = b0 - 192 - 56 + 1
-        l_idx = big_endian_to_int(rlp[start + 1:start + 1 + ll])
-        return (list, l_idx, start + 1 + ll)
+        start, end = _consume_long_length(data, start, b0 - 0xf7)
+    if end > len(data):
+        raise IndexError
+
+    items = []
+    while start < end:
+        item, start = consume_item(data, start)
+        items.append(item)
+    if start > end:
+        raise DecodingError('List length prefix announced a too small '
+                            'length', data)
+    return items, end
+
+
+def _consume_long_length(data, start, length_of_length):
+    """Read the length written after the first byte of a long string or a
+    long list prefix
+
+    :returns: a tuple ``(start, end)`` of the payload
+    """
+    length_start = start + 1
+    length_end = length_start + length_of_length
+    if length_end > len(data):
+        raise IndexError
+    if data[length_start] == 0:
+        raise DecodingError('Length starts with zero bytes', data)
+    length = int.from_bytes(data[length_start:length_end], 'big')
+    if length < 56:
+        raise DecodingError('Long prefix used for short item', data)
+    return length_end, length_end + length
 
 
-#
-if sys.version_info.major == 2:
-    encode_optimized = _encode_optimized
-    decode_optimized = _decode_optimized
-else:
-    encode_optimized = rlp.codec.encode_raw
-    # rlp does not implement a decode_raw function.
-    # decode_optimized = rlp.codec.decode_raw
-    decode_optimized = _decode_optimized
+encode_optimized = _encode_optimized
+decode_optimized = _decode_optimized
+
+
+class RlpCodec:
+    """Pair of RLP encode and decode functions used by the state trie and
+    its databases"""
+
+    def __init__(self, encode, decode):
+        self.encode = encode
+        self.decode = decode
+
+
+# Codec of this module and the reference one of the `rlp` package, both
+# produce the same bytes
+FAST_RLP = RlpCodec(encode_optimized, decode_optimized)
+REFERENCE_RLP = RlpCodec(rlp.codec.encode_raw, rlp.decode)
 
 
 def main():
     import time
     import state.trie.pruning_trie as trie
+    from state.db.persistent_db import PersistentDB
 
-    def run():
+    def run(codec):
         st = time.time()
-        x = trie.Trie(KeyValueStorageInMemory())
+        x = trie.Trie(PersistentDB(KeyValueStorageInMemory()), codec=codec)
+        for i in range(10000):
+            x.update(str(i).encode(), str(i**3).encode())
         for i in range(10000):
-            x.update(str(i), str(i**3))
+            x.get(str(i).encode())
         print('elapsed', time.time() - st)
         return x.root_hash
 
-    trie.rlp_encode = _encode_optimized
-    print('trie.rlp_encode = encode_optimized')
-    r3 = run()
-
-    trie.rlp_encode = rlp.codec.encode_raw
-    print('trie.rlp_encode = rlp.codec.encode_raw')
-    r2 = run()
-    assert r2 == r3
-
-    trie.rlp_encode = rlp.encode
-    print('trie.rlp_encode = rlp.encode')
-    r = run()
+    print('fast codec')
+    r = run(FAST_RLP)
+    print('rlp package')
+    r2 = run(REFERENCE_RLP)
     assert r == r2
 
 
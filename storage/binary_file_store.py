@@ -4,6 +4,10 @@ from storage.kv_store_single_file import SingleFileStore
 
 
 class BinaryFileStore(SingleFileStore):
+    # Size of blocks the file is read in when iterating over it. The file
+    # is not buffered, so every block is a separate read call
+    readBlockSize = 64 * 1024
+
     def __init__(self,
                  dbDir,
                  dbName,
@@ -40,12 +44,12 @@ class BinaryFileStore(SingleFileStore):
     def _init_db_file(self):
         return open(self.db_path, mode="a+b", buffering=0)
 
-    def put(self, key, value):
+    def _write_entry(self, key, value):
         key = self.to_byte_repr(key)
         value = self.to_byte_repr(value)
         if not ((self.isLineNoKey or not key or self._isBytes(key)) and self._isBytes(value)):
             raise ValueError("key and value need to be bytes-like object")
-        super().put(key=key, value=value)
+        super()._write_entry(key=key, value=value)
 
     def get(self, key):
         key = self.to_byte_repr(key)
@@ -60,7 +64,7 @@ class BinaryFileStore(SingleFileStore):
         return super().iterator(start, end, includeKey, includeValue, prefix)
 
     def _file_chunks(self):
-        buf_size = 4096
+        buf_size = self.readBlockSize
         self.db_file.seek(0)
         while True:
             chunk = self.db_file.read(buf_size)
@@ -76,7 +80,9 @@ class BinaryFileStore(SingleFileStore):
             lines = buffer.split(self.lineSep)
             for line in lines[:-1]:
                 yield line
-            buffer = buffer[-len(lines[-1]):]
+            # The last part is an incomplete line or empty if the block
+            # ended with a separator
+            buffer = lines[-1]
         if len(lines[-1]) > 0:
             yield lines[-1]
 
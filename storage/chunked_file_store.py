@@ -1,4 +1,6 @@
 import os
+from collections import OrderedDict
+from typing import Iterable, Tuple
 
 from storage.kv_store_file import KeyValueStorageFile
 from storage.text_file_store import TextFileStore
@@ -21,6 +23,10 @@ class ChunkedFileStore(KeyValueStorageFile):
 
     firstChunkIndex = 1
 
+    # Number of chunks kept open for reads, so that reading a range or
+    # consecutive keys does not open the same files over and over
+    readChunksCacheSize = 8
+
     @staticmethod
     def _fileNameToChunkIndex(fileName):
         try:
@@ -60,6 +66,7 @@ class ChunkedFileStore(KeyValueStorageFile):
         self.dataDir = os.path.join(dbDir, dbName)  # chunk files destination
         self.currentChunk = None  # type: KeyValueStorageFile
         self.currentChunkIndex = None  # type: int
+        self._readChunks = OrderedDict()
 
         # TODO: fix chunk_creator support
         def default_chunk_creator(name):
@@ -141,6 +148,32 @@ class ChunkedFileStore(KeyValueStorageFile):
         return self._chunkCreator(
             ChunkedFileStore._chunkIndexToFileName(index))
 
+    def _getChunkForReading(self, index) -> KeyValueStorageFile:
+        """
+        Return an open chunk to read from, chunks are kept open until
+        `readChunksCacheSize` other chunks are read.
+        Reads do not go through the current chunk, since its file position
+        moves with every write.
+
+        :param index: index of an existing chunk
+        """
+        chunk = self._readChunks.pop(index, None)
+        if chunk is None or chunk.closed:
+            chunk = self._openChunk(index)
+        self._readChunks[index] = chunk
+        if len(self._readChunks) > self.readChunksCacheSize:
+            _, oldest = self._readChunks.popitem(last=False)
+            oldest.close()
+        return chunk
+
+    def _chunkExists(self, index) -> bool:
+        return index in self._readChunks or index in self._listChunks()
+
+    def _closeReadChunks(self):
+        for chunk in self._readChunks.values():
+            chunk.close()
+        self._readChunks.clear()
+
     def _get_key_location(self, key) -> (int, int):
         """
         Return chunk no and 1-based offset of key
@@ -164,17 +197,35 @@ class ChunkedFileStore(KeyValueStorageFile):
         self.itemNum += 1
         self.currentChunk.put(key, value)
 
+    def setBatch(self, batch: Iterable[Tuple]) -> None:
+        """
+        Writes entries to the current chunk with as few writes as possible,
+        starting new chunks when the current one is full
+        """
+        batch = list(batch)
+        idx = 0
+        while idx < len(batch):
+            if self.itemNum > self.chunkSize:
+                self._startNextChunk()
+                self.itemNum = 1
+            free = self.chunkSize - self.itemNum + 1
+            part = batch[idx:idx + free]
+            self.currentChunk.setBatch(part)
+            self.itemNum += len(part)
+            idx += len(part)
+
     def get(self, key) -> str:
         """
         Determines the file to retrieve the data from and retrieves the data.
 
         :return: value corresponding to specified key
         """
-        # TODO: get is creating files when a key is given which is more than
-        # the store size
         chunk_no, offset = self._get_key_location(key)
-        with self._openChunk(chunk_no) as chunk:
-            return chunk.get(str(offset))
+        # Opening a chunk creates its file, so missing chunks are not opened
+        if not self._chunkExists(chunk_no):
+            raise KeyError("'{}' doesn't contain {} key".format(
+                self.dataDir, str(key)))
+        return self._getChunkForReading(chunk_no).get(str(offset))
 
     def reset(self) -> None:
         """
@@ -206,6 +257,7 @@ class ChunkedFileStore(KeyValueStorageFile):
         return self.currentChunk._parse_line(line, prefix, returnKey, returnValue, key)
 
     def close(self):
+        self._closeReadChunks()
         if self.currentChunk is not None:
             self.currentChunk.close()
         self.currentChunk = None
@@ -245,44 +297,34 @@ class ChunkedFileStore(KeyValueStorageFile):
         return self._keyIterator(lines, start=start, end=end, prefix=prefix)
 
     def _get_range(self, start=None, end=None):
+        """
+        Stream entries from `start` to `end` (both inclusive) chunk by
+        chunk. Every chunk is read in one pass with a file kept open, and
+        the range ends with the last stored entry, so the size of the store
+        is not calculated.
+        """
         self._is_valid_range(start, end)
 
-        if not self.size:
-            return
-
-        if start and end and start == end:
-            res = self.get(start)
-            if res:
-                yield (start, res)
-        else:
-            if start is None:
-                start = 1
-            if end is None:
-                end = self.size
-            start_chunk_no, start_offset = self._get_key_location(start)
-            end_chunk_no, end_offset = self._get_key_location(end)
-
-            if start_chunk_no == end_chunk_no:
-                # If entries lie in the same range
-                assert end_offset >= start_offset
-                with self._openChunk(start_chunk_no) as chunk:
-                    yield from zip(range(start, end + 1),
-                                   (l for _, l in chunk.iterator(start=start_offset,
-                                                                 end=end_offset)))
-            else:
-                current_chunk_no = start_chunk_no
-                while current_chunk_no <= end_chunk_no:
-                    with self._openChunk(current_chunk_no) as chunk:
-                        if current_chunk_no == start_chunk_no:
-                            yield from ((str(current_chunk_no + int(k) - 1), l) for k, l in
-                                        chunk.iterator(start=start_offset))
-                        elif current_chunk_no == end_chunk_no:
-                            yield from ((str(current_chunk_no + int(k) - 1), l)
-                                        for k, l in chunk.iterator(end=end_offset))
-                        else:
-                            yield from ((str(current_chunk_no + int(k) - 1), l)
-                                        for k, l in chunk.iterator(start=1, end=self.chunkSize))
-                    current_chunk_no += self.chunkSize
+        chunks = set(self._listChunks())
+        key = int(start) if start else 1
+        while end is None or key <= int(end):
+            chunk_no, offset = self._get_key_location(key)
+            if chunk_no not in chunks:
+                return
+            last_offset = self.chunkSize
+            if end is not None:
+                last_offset = min(last_offset, int(end) - chunk_no + 1)
+            # The generator may be suspended between entries while other
+            # reads go through the cached chunks, so it reads through a file
+            # of its own
+            with self._openChunk(chunk_no) as chunk:
+                for _, value in chunk.iterator(start=offset, end=last_offset):
+                    yield str(key), value
+                    key += 1
+            if key <= chunk_no + last_offset - 1:
+                # The chunk has less entries than requested, so it is the
+                # last one
+                return
 
     def _append_new_line_if_req(self):
         self._useLatestChunk()
@@ -299,9 +341,8 @@ class ChunkedFileStore(KeyValueStorageFile):
         if num_chunks == 0:
             return 0
         count = (num_chunks - 1) * self.chunkSize
-        last_chunk = self._openChunk(chunks[-1])
+        last_chunk = self._getChunkForReading(chunks[-1])
         count += sum(1 for _ in last_chunk._lines())
-        last_chunk.close()
         return count
 
     @property
@@ -0,0 +1,174 @@
+from collections import OrderedDict
+from typing import Iterable, Tuple, Optional
+
+from storage.kv_store import KeyValueStorage
+
+
+class GroupCommit:
+    """
+    Collects writes to several key-value storages made between `begin` and
+    `commit`, and writes them together when the group is committed.
+
+    Writes to storages which are column families of one RocksDB database
+    (see `SharedRocksdb`) go to the database in a single atomic batch,
+    writes to any other storage in one batch per storage.
+    """
+
+    def __init__(self, sync: bool = False):
+        """
+        :param sync: whether batches of shared RocksDB databases are synced
+            to disk before the commit returns
+        """
+        self._sync = sync
+        # Storages and the last value written to every key, None for removed
+        # keys, by id of storage in the order the storages were written to.
+        # Storages are not keys themselves, in-memory ones are compared by
+        # their content
+        self._pending = None  # type: Optional[OrderedDict]
+
+    @property
+    def is_open(self) -> bool:
+        return self._pending is not None
+
+    def begin(self):
+        self._pending = OrderedDict()
+
+    def commit(self):
+        pending, self._pending = self._pending, None
+        if not pending:
+            return
+
+        shared_batches = OrderedDict()
+        for storage, writes in pending.values():
+            shared_db = getattr(storage, 'shared_db', None)
+            if shared_db is not None:
+                shared_batches.setdefault(shared_db, []).extend(
+                    (storage, key, value) for key, value in writes.items())
+                continue
+            storage.setBatch([(key, value) for key, value in writes.items()
+                              if value is not None])
+            for key, value in writes.items():
+                if value is None:
+                    storage.remove(key)
+
+        for shared_db, batch in shared_batches.items():
+            shared_db.set_batch(batch, sync=self._sync)
+
+    def discard(self):
+        """
+        Close the group dropping the writes collected, none of them goes to
+        the storages
+        """
+        self._pending = None
+
+    def put(self, storage: KeyValueStorage, key: bytes, value: Optional[bytes]):
+        pending = self._pending.get(id(storage))
+        if pending is None:
+            pending = self._pending[id(storage)] = (storage, {})
+        pending[1][key] = value
+
+    def get(self, storage: KeyValueStorage, key: bytes) -> Tuple[bool, Optional[bytes]]:
+        """
+        :return: whether the key was written in the group and the value
+            written, None if it was removed
+        """
+        pending = self._pending.get(id(storage))
+        if pending is None or key not in pending[1]:
+            return False, None
+        return True, pending[1][key]
+
+
+class GroupCommitStorage(KeyValueStorage):
+    """
+    Key-value storage whose writes are collected by a `GroupCommit` while
+    it is open and go to the wrapped storage right away otherwise.
+
+    Writes collected by the group are seen by `get`, but not by iterators
+    and lookups like `get_equal_or_prev`.
+    """
+
+    def __init__(self, storage: KeyValueStorage, group: GroupCommit):
+        self._storage = storage
+        self._group = group
+
+    def __getattr__(self, item):
+        # Storage specific methods
+        if '_storage' not in self.__dict__:
+            raise AttributeError(item)
+        return getattr(self._storage, item)
+
+    def __repr__(self):
+        return repr(self._storage)
+
+    @property
+    def storage(self) -> KeyValueStorage:
+        return self._storage
+
+    def put(self, key, value):
+        if self._group.is_open:
+            self._group.put(self._storage, self.to_byte_repr(key), self.to_byte_repr(value))
+        else:
+            self._storage.put(key, value)
+
+    def get(self, key):
+        if self._group.is_open:
+            written, value = self._group.get(self._storage, self.to_byte_repr(key))
+            if written:
+                if value is None:
+                    raise KeyError(key)
+                return value
+        return self._storage.get(key)
+
+    def remove(self, key):
+        if self._group.is_open:
+            self._group.put(self._storage, self.to_byte_repr(key), None)
+        else:
+            self._storage.remove(key)
+
+    def setBatch(self, batch: Iterable[Tuple]):
+        if self._group.is_open:
+            for key, value in batch:
+                self.put(key, value)
+        else:
+            self._storage.setBatch(batch)
+
+    def get_equal_or_prev(self, key):
+        return self._storage.get_equal_or_prev(key)
+
+    def get_last_key(self):
+        return self._storage.get_last_key()
+
+    def do_ops_in_batch(self, batch: Iterable[Tuple], *args, **kwargs):
+        return self._storage.do_ops_in_batch(batch, *args, **kwargs)
+
+    def open(self):
+        self._storage.open()
+
+    def close(self):
+        self._storage.close()
+
+    def drop(self):
+        self._storage.drop()
+
+    def reset(self):
+        self._storage.reset()
+
+    def iterator(self, start=None, end=None, include_key=True, include_value=True, prefix=None):
+        return self._storage.iterator(start=start, end=end, include_key=include_key,
+                                      include_value=include_value, prefix=prefix)
+
+    @property
+    def closed(self):
+        return self._storage.closed
+
+    @property
+    def is_byte(self) -> bool:
+        return self._storage.is_byte
+
+    @property
+    def db_path(self) -> str:
+        return self._storage.db_path
+
+    @property
+    def size(self):
+        return self._storage.size
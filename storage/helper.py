@@ -1,11 +1,14 @@
 import os
 
+from ledger.hash_stores.cached_hash_store import CachedHashStore
 from ledger.hash_stores.file_hash_store import FileHashStore
 from ledger.hash_stores.hash_store import HashStore
 from ledger.hash_stores.memory_hash_store import MemoryHashStore
+from ledger.hash_stores.mmap_file_hash_store import MmapFileHashStore
 
 from plenum.common.config_util import getConfig
-from plenum.common.constants import KeyValueStorageType, HS_FILE, HS_LEVELDB, HS_ROCKSDB
+from plenum.common.constants import KeyValueStorageType, HS_FILE, HS_MMAP_FILE, HS_LEVELDB, \
+    HS_ROCKSDB
 from plenum.common.exceptions import KeyValueStorageConfigNotFound
 
 from plenum.persistence.db_hash_store import DbHashStore
@@ -30,6 +33,14 @@ def initKeyValueStorage(keyValueType, dataLocation, keyValueStorageName,
         return KeyValueStorageRocksdb(dataLocation, keyValueStorageName, open,
                                       read_only, db_config)
 
+    if keyValueType == KeyValueStorageType.RocksdbColumnFamily:
+        from storage.kv_store_rocksdb_column_family import KeyValueStorageRocksdbColumnFamily
+        config = getConfig()
+        return KeyValueStorageRocksdbColumnFamily(dataLocation, keyValueStorageName, open,
+                                                  read_only, db_config,
+                                                  shared_db_name=config.sharedRocksdbName,
+                                                  shared_db_config=config.db_shared_config)
+
     if keyValueType == KeyValueStorageType.Memory:
         return KeyValueStorageInMemory()
 
@@ -66,6 +77,13 @@ def initKeyValueStorageIntKeys(keyValueType, dataLocation, keyValueStorageName,
         return KeyValueStorageLeveldbIntKeys(dataLocation, keyValueStorageName, open, read_only)
     if keyValueType == KeyValueStorageType.Rocksdb:
         return KeyValueStorageRocksdbIntKeys(dataLocation, keyValueStorageName, open, read_only, db_config)
+    if keyValueType == KeyValueStorageType.RocksdbColumnFamily:
+        from storage.kv_store_rocksdb_column_family import KeyValueStorageRocksdbIntKeysColumnFamily
+        config = getConfig()
+        return KeyValueStorageRocksdbIntKeysColumnFamily(dataLocation, keyValueStorageName, open,
+                                                         read_only, db_config,
+                                                         shared_db_name=config.sharedRocksdbName,
+                                                         shared_db_config=config.db_shared_config)
     return initKeyValueStorage(keyValueType, dataLocation, keyValueStorageName, open, read_only, db_config, txn_serializer)
 
 
@@ -76,16 +94,23 @@ def initHashStore(data_dir, name, config=None, read_only=False, hs_type=None) ->
     config = config or getConfig()
     hsConfig = hs_type if hs_type is not None else config.hashStore['type'].lower()
     if hsConfig == HS_FILE:
-        return FileHashStore(dataDir=data_dir,
-                             fileNamePrefix=name)
+        hash_store = FileHashStore(dataDir=data_dir,
+                                   fileNamePrefix=name)
+    elif hsConfig == HS_MMAP_FILE:
+        hash_store = MmapFileHashStore(dataDir=data_dir,
+                                       fileNamePrefix=name)
     elif hsConfig == HS_LEVELDB or hsConfig == HS_ROCKSDB:
-        return DbHashStore(dataDir=data_dir,
-                           fileNamePrefix=name,
-                           db_type=hsConfig,
-                           read_only=read_only,
-                           config=config)
+        hash_store = DbHashStore(dataDir=data_dir,
+                                 fileNamePrefix=name,
+                                 db_type=hsConfig,
+                                 read_only=read_only,
+                                 config=config)
     else:
         return MemoryHashStore()
+    if config.MERKLE_NODE_CACHE_SIZE:
+        hash_store = CachedHashStore(hash_store,
+                                     max_nodes=config.MERKLE_NODE_CACHE_SIZE)
+    return hash_store
 
 
 def integer_comparator(a, b):
@@ -58,6 +58,8 @@ class KeyValueStorageInMemory(KeyValueStorage):
         self._dict = {}
 
     def iterator(self, start=None, end=None, include_key=True, include_value=True, prefix=None):
+        # Iterators go over a copy, so that the storage can be changed while
+        # they are in use, as with leveldb and rocksdb iterators
         if not (include_key or include_value):
             raise ValueError("At least one of includeKey or includeValue "
                              "should be true")
@@ -79,15 +81,15 @@ class KeyValueStorageInMemory(KeyValueStorage):
                     if filter(k, start, end):
                         filtered_dct[k] = v
                 return filtered_dct.items()
-            return self._dict.items()
+            return list(self._dict.items())
         if include_key:
             if start or end:
-                return (k for k in self._dict.keys() if filter(k, start, end))
-            return self._dict.keys()
+                return [k for k in self._dict.keys() if filter(k, start, end)]
+            return list(self._dict.keys())
         if include_value:
             if start or end:
-                return (v for k, v in self._dict.items() if filter(k, start, end))
-            return self._dict.values()
+                return [v for k, v in self._dict.items() if filter(k, start, end)]
+            return list(self._dict.values())
 
     @property
     def closed(self):
@@ -23,40 +23,39 @@ class KeyValueStorageRocksdb(KeyValueStorage):
         if open:
             self.open()
 
-    def __apply_db_config_opts(self, opts):
-        if self._db_config is None:
+    @staticmethod
+    def _apply_db_config_opts(opts, db_config):
+        if db_config is None:
             return
 
-        _db_config = self._db_config
-
-        if _db_config['max_open_files'] is not None:
-            opts.max_open_files = _db_config['max_open_files']
-        if _db_config['max_log_file_size'] is not None:
-            opts.max_log_file_size = _db_config['max_log_file_size']
-        if _db_config['keep_log_file_num'] is not None:
-            opts.keep_log_file_num = _db_config['keep_log_file_num']
-        if _db_config['db_log_dir'] is not None:
-            opts.db_log_dir = _db_config['db_log_dir']
+        if db_config['max_open_files'] is not None:
+            opts.max_open_files = db_config['max_open_files']
+        if db_config['max_log_file_size'] is not None:
+            opts.max_log_file_size = db_config['max_log_file_size']
+        if db_config['keep_log_file_num'] is not None:
+            opts.keep_log_file_num = db_config['keep_log_file_num']
+        if db_config['db_log_dir'] is not None:
+            opts.db_log_dir = db_config['db_log_dir']
 
         # Compaction related options
-        if _db_config['target_file_size_base'] is not None:
-            opts.target_file_size_base = _db_config['target_file_size_base']
+        if db_config['target_file_size_base'] is not None:
+            opts.target_file_size_base = db_config['target_file_size_base']
 
         # Memtable related options
-        if _db_config['write_buffer_size'] is not None:
-            opts.write_buffer_size = _db_config['write_buffer_size']
-        if _db_config['max_write_buffer_number'] is not None:
-            opts.max_write_buffer_number = _db_config['max_write_buffer_number']
+        if db_config['write_buffer_size'] is not None:
+            opts.write_buffer_size = db_config['write_buffer_size']
+        if db_config['max_write_buffer_number'] is not None:
+            opts.max_write_buffer_number = db_config['max_write_buffer_number']
 
-        if _db_config['block_size'] is not None \
-                or _db_config['block_cache_size'] is not None \
-                or _db_config['block_cache_compressed_size'] is not None \
-                or _db_config['no_block_cache'] is not None:
+        if db_config['block_size'] is not None \
+                or db_config['block_cache_size'] is not None \
+                or db_config['block_cache_compressed_size'] is not None \
+                or db_config['no_block_cache'] is not None:
 
-            block_size = _db_config['block_size']
-            block_cache_size = _db_config['block_cache_size']
-            block_cache_compressed_size = _db_config['block_cache_compressed_size']
-            no_block_cache = _db_config['no_block_cache']
+            block_size = db_config['block_size']
+            block_cache_size = db_config['block_cache_size']
+            block_cache_compressed_size = db_config['block_cache_compressed_size']
+            no_block_cache = db_config['no_block_cache']
 
             block_cache = None
             block_cache_compressed = None
@@ -75,7 +74,7 @@ class KeyValueStorageRocksdb(KeyValueStorage):
     def _get_db_opts(self):
         opts = rocksdb.Options()
         if self._db_config is not None:
-            self.__apply_db_config_opts(opts)
+            self._apply_db_config_opts(opts, self._db_config)
         opts.create_if_missing = True
         return opts
 
@@ -0,0 +1,242 @@
+import os
+
+from typing import Dict, Iterable, Tuple
+
+from storage.kv_store_rocksdb import KeyValueStorageRocksdb, WrappingIter
+from state.util.utils import removeLockFiles
+
+try:
+    import rocksdb
+except ImportError:
+    print('Cannot import rocksdb, please install')
+
+
+class SharedRocksdb:
+    """
+    One RocksDB database hosting several key-value storages of a node as
+    column families. The storages share the WAL, the block cache and the
+    background threads, and a write batch spanning several of them is
+    applied atomically with a single write to the WAL.
+
+    There is one instance per database path in the process, it is opened
+    by the first storage and closed when the last storage is closed.
+    """
+
+    # Column families of storages with integer keys, their comparator has
+    # to be known whenever the database is opened
+    INT_KEYS_PREFIX = b'int_keys:'
+
+    _instances = {}  # type: Dict[str, SharedRocksdb]
+
+    @classmethod
+    def acquire(cls, db_dir, db_name, db_config=None, read_only=False) -> 'SharedRocksdb':
+        db_path = os.path.join(db_dir, db_name)
+        shared = cls._instances.get(db_path)
+        if shared is None:
+            shared = cls._instances[db_path] = cls(db_path, db_config, read_only)
+        shared._users += 1
+        return shared
+
+    def __init__(self, db_path, db_config=None, read_only=False):
+        if 'rocksdb' not in globals():
+            raise RuntimeError('Rocksdb is needed to use this class')
+        self._db_path = db_path
+        self._users = 0
+        self._opts = rocksdb.Options()
+        KeyValueStorageRocksdb._apply_db_config_opts(self._opts, db_config)
+        self._opts.create_if_missing = True
+
+        existing = []
+        if os.path.exists(os.path.join(db_path, 'CURRENT')):
+            existing = [name for name in rocksdb.list_column_families(db_path, self._opts)
+                        if name != b'default']
+        self._db = rocksdb.DB(db_path, self._opts,
+                              column_families={name: self._cf_opts(name) for name in existing},
+                              read_only=read_only)
+
+    def __repr__(self):
+        return self._db_path
+
+    @property
+    def db(self):
+        return self._db
+
+    def release(self):
+        self._users -= 1
+        if self._users > 0:
+            return
+        self._instances.pop(self._db_path, None)
+        del self._db
+        self._db = None
+        removeLockFiles(self._db_path)
+
+    def column_family(self, name: bytes):
+        cf = self._db.get_column_family(name)
+        if cf is None:
+            cf = self._db.create_column_family(name, self._cf_opts(name))
+        return cf
+
+    def drop_column_family(self, name: bytes):
+        cf = self._db.get_column_family(name)
+        if cf is not None:
+            self._db.drop_column_family(cf)
+
+    def set_batch(self, batch: Iterable[Tuple['KeyValueStorageRocksdbColumnFamily', bytes, bytes]],
+                  sync=False):
+        """
+        Write to several storages of this database at once
+
+        :param batch: (storage, key, value) triples, None value removes the key
+        """
+        b = rocksdb.WriteBatch()
+        for storage, key, value in batch:
+            if value is None:
+                b.delete(storage.cf_key(key))
+            else:
+                b.put(storage.cf_key(key), storage.to_byte_repr(value))
+        self._db.write(b, sync=sync)
+
+    def _cf_opts(self, name: bytes):
+        opts = rocksdb.ColumnFamilyOptions()
+        # Same table factory for all column families, so that they share
+        # the block cache
+        if self._opts.table_factory is not None:
+            opts.table_factory = self._opts.table_factory
+        for option in ('write_buffer_size', 'max_write_buffer_number',
+                       'target_file_size_base'):
+            setattr(opts, option, getattr(self._opts, option))
+        if name.startswith(self.INT_KEYS_PREFIX):
+            from storage.kv_store_rocksdb_int_keys import IntegerComparator
+            opts.comparator = IntegerComparator()
+        return opts
+
+
+class KeyValueStorageRocksdbColumnFamily(KeyValueStorageRocksdb):
+    """
+    Key-value storage kept in a column family of a database shared with
+    other storages in the same directory, see `SharedRocksdb`.
+
+    Options of the database come from `shared_db_config`, as the WAL and
+    the block cache are shared; `db_config` of the storage is not used.
+    """
+
+    def __init__(self, db_dir, db_name, open=True, read_only=False, db_config=None,
+                 shared_db_name='node_db', shared_db_config=None):
+        self._db_dir = db_dir
+        self._cf_name = self._column_family_name(db_name)
+        self._shared_db_name = shared_db_name
+        self._shared_db_config = shared_db_config
+        self._shared = None
+        self._cf = None
+        super().__init__(db_dir, db_name, open, read_only, db_config)
+        self._db_path = os.path.join(db_dir, shared_db_name, db_name)
+
+    @staticmethod
+    def _column_family_name(db_name) -> bytes:
+        return db_name.encode()
+
+    @property
+    def shared_db(self) -> SharedRocksdb:
+        return self._shared
+
+    def open(self):
+        self._shared = SharedRocksdb.acquire(self._db_dir, self._shared_db_name,
+                                             self._shared_db_config, self._read_only)
+        self._db = self._shared.db
+        self._cf = self._shared.column_family(self._cf_name)
+
+    def close(self):
+        if self._shared is None:
+            return
+        self._db = None
+        self._cf = None
+        self._shared.release()
+        self._shared = None
+
+    def drop(self):
+        shared = SharedRocksdb.acquire(self._db_dir, self._shared_db_name,
+                                       self._shared_db_config)
+        self.close()
+        shared.drop_column_family(self._cf_name)
+        shared.release()
+
+    def cf_key(self, key):
+        return self._cf, self.to_byte_repr(key)
+
+    def put(self, key, value):
+        value = self.to_byte_repr(value)
+        self._db.put(self.cf_key(key), value)
+
+    def get(self, key):
+        vv = self._db.get(self.cf_key(key))
+        if vv is None:
+            raise KeyError
+        return vv
+
+    def remove(self, key):
+        self._db.delete(self.cf_key(key))
+
+    def setBatch(self, batch: Iterable[Tuple]):
+        b = rocksdb.WriteBatch()
+        for key, value in batch:
+            b.put(self.cf_key(key), self.to_byte_repr(value))
+        self._db.write(b, sync=False)
+
+    def has_key(self, key):
+        return self._db.key_may_exist(self.cf_key(key))[0]
+
+    def iterator(self, start=None, end=None, include_key=True, include_value=True, prefix=None):
+        start = self.to_byte_repr(start) if start is not None else None
+        end = self.to_byte_repr(end) if end is not None else None
+
+        if not include_value:
+            itr = self._db.iterkeys(self._cf)
+        else:
+            itr = self._db.iteritems(self._cf)
+
+        if start:
+            itr.seek(start)
+        else:
+            itr.seek_to_first()
+
+        # Keys of column families are (column family, key) pairs
+        if not include_value:
+            itr = (key for _, key in itr)
+        else:
+            itr = ((key, value) for (_, key), value in itr)
+
+        if end:
+            itr = WrappingIter(itr, end)
+
+        return itr
+
+
+class KeyValueStorageRocksdbIntKeysColumnFamily(KeyValueStorageRocksdbColumnFamily):
+
+    @staticmethod
+    def _column_family_name(db_name) -> bytes:
+        return SharedRocksdb.INT_KEYS_PREFIX + db_name.encode()
+
+    def get_equal_or_prev(self, key):
+        # return value can be:
+        #    None, if required key less then minimal key from DB
+        #    Equal by key if key exist in DB
+        #    Previous if key does not exist in Db, but there is key less than required
+
+        key = self.to_byte_repr(key)
+        itr = self._db.itervalues(self._cf)
+        itr.seek_for_prev(key)
+        try:
+            value = next(itr)
+        except StopIteration:
+            value = None
+        return value
+
+    def get_last_key(self):
+        itr = self._db.iterkeys(self._cf)
+        itr.seek_to_last()
+        try:
+            _, key = next(itr)
+        except StopIteration:
+            key = None
+        return key
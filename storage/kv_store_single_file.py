@@ -1,5 +1,6 @@
 import os
 from hashlib import sha256
+from typing import Iterable, Tuple
 
 from storage.kv_store_file import KeyValueStorageFile
 
@@ -25,6 +26,17 @@ class SingleFileStore(KeyValueStorageFile):
                          open=open)
 
     def put(self, key, value):
+        self._write_entry(key, value)
+        self._flush()
+
+    def setBatch(self, batch: Iterable[Tuple]):
+        # All entries are written before a single flush (and fsync if
+        # durability is required) instead of one per entry
+        for key, value in batch:
+            self._write_entry(key, value)
+        self._flush()
+
+    def _write_entry(self, key, value):
         # If line no is not treated as key then write the key and then the
         # delimiter
         if not self.isLineNoKey:
@@ -43,6 +55,7 @@ class SingleFileStore(KeyValueStorageFile):
             self.db_file.write(hexedHash)
         self.db_file.write(self.lineSep)
 
+    def _flush(self):
         # A little bit smart strategy like flush every 2 seconds
         # or every 10 writes or every 1 KB may be a better idea
         # Make sure data get written to the disk
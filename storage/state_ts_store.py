@@ -1,4 +1,5 @@
-from typing import Dict
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from plenum.common.constants import DOMAIN_LEDGER_ID
 from storage.kv_store import KeyValueStorage
@@ -8,10 +9,27 @@ logger = getlogger()
 
 
 class StateTsDbStorage():
-    def __init__(self, name: str, storages: Dict[int, KeyValueStorage]):
+    def __init__(self, name: str, storages: Dict[int, KeyValueStorage],
+                 index: bool = False):
+        """
+        :param index: keep all timestamps and root hashes in memory, sorted
+            by timestamp, so that lookups are binary searches instead of
+            iterating over the storage
+        """
         logger.debug("Initializing timestamp-rootHash storage")
         self._storages = storages
         self._name = name
+        # Sorted timestamps and their root hashes of every ledger
+        self._indexes = {}  # type: Dict[int, Tuple[List[int], List[bytes]]]
+        if index:
+            for ledger_id, storage in storages.items():
+                self._indexes[ledger_id] = self._load_index(storage)
+
+    @staticmethod
+    def _load_index(storage: KeyValueStorage) -> Tuple[List[int], List[bytes]]:
+        items = sorted((int(ts), bytes(root_hash))
+                       for ts, root_hash in storage.iterator())
+        return [ts for ts, _ in items], [root_hash for _, root_hash in items]
 
     def __repr__(self):
         return self._name
@@ -21,6 +39,14 @@ class StateTsDbStorage():
         if storage is None:
             return None
 
+        index = self._indexes.get(ledger_id)
+        if index is not None:
+            timestamps, root_hashes = index
+            i = bisect_left(timestamps, int(timestamp))
+            if i == len(timestamps) or timestamps[i] != int(timestamp):
+                raise KeyError(timestamp)
+            return root_hashes[i]
+
         value = storage.get(str(timestamp))
         return value
 
@@ -31,6 +57,31 @@ class StateTsDbStorage():
 
         storage.put(str(timestamp), root_hash)
 
+        index = self._indexes.get(ledger_id)
+        if index is not None:
+            timestamps, root_hashes = index
+            root_hash = storage.to_byte_repr(root_hash)
+            # Timestamps of batches mostly grow, so it is usually an append
+            i = bisect_left(timestamps, int(timestamp))
+            if i < len(timestamps) and timestamps[i] == int(timestamp):
+                root_hashes[i] = root_hash
+            else:
+                timestamps.insert(i, int(timestamp))
+                root_hashes.insert(i, root_hash)
+
+    def get_roots(self, from_timestamp: Optional[int] = None,
+                  ledger_id: int = DOMAIN_LEDGER_ID) -> Iterable[bytes]:
+        """
+        Return root hashes stored for timestamps not earlier than the given
+        one, or for all the timestamps if it is None
+        """
+        storage = self._storages.get(ledger_id)
+        if storage is None:
+            return []
+
+        # Storages on disk return keys along with values in any case
+        return (root_hash for _, root_hash in storage.iterator(start=from_timestamp))
+
     def close(self):
         for storage in self._storages.values():
             storage.close()
@@ -40,6 +91,12 @@ class StateTsDbStorage():
         if storage is None:
             return None
 
+        index = self._indexes.get(ledger_id)
+        if index is not None:
+            timestamps, root_hashes = index
+            i = bisect_right(timestamps, int(timestamp))
+            return root_hashes[i - 1] if i else None
+
         return storage.get_equal_or_prev(str(timestamp))
 
     def get_last_key(self, ledger_id: int = DOMAIN_LEDGER_ID):
@@ -47,4 +104,9 @@ class StateTsDbStorage():
         if storage is None:
             return None
 
+        index = self._indexes.get(ledger_id)
+        if index is not None:
+            timestamps, _ = index
+            return str(timestamps[-1]).encode() if timestamps else None
+
         return storage.get_last_key()
@@ -5,6 +5,7 @@ import random
 from time import perf_counter
 
 import pytest
+from storage.binary_file_store import BinaryFileStore
 from storage.chunked_file_store import ChunkedFileStore
 from storage.text_file_store import TextFileStore
 
@@ -117,3 +118,92 @@ def test_get_range(populatedChunkedFileStore):
         for k, v in populatedChunkedFileStore.iterator(
                 start=frm, end=to):
             assert data[int(k) - 1] == v
+
+
+def test_set_batch_across_chunks(tempdir, chunkedTextFileStore):
+    store = chunkedTextFileStore
+    store.reset()
+    dirPath = os.path.join(tempdir, "chunked_data")
+    store.put(None, data[0])
+    store.setBatch([(None, d) for d in data[1:8]])
+    store.setBatch([(None, d) for d in data[8:]])
+    assert len(os.listdir(dirPath)) == math.ceil(dataSize / chunkSize)
+    assert all(countLines(dirPath + os.path.sep + f) <= chunkSize
+               for f in os.listdir(dirPath))
+    assert store.size == dataSize
+    for k, v in store.iterator():
+        assert v == getValue(int(k))
+
+
+def test_range_read_opens_chunks_once(populatedChunkedFileStore, monkeypatch):
+    store = populatedChunkedFileStore
+    opened = []
+    open_chunk = store._openChunk
+
+    def _openChunk(index):
+        opened.append(index)
+        return open_chunk(index)
+
+    monkeypatch.setattr(store, '_openChunk', _openChunk)
+    frm, to = chunkSize + 2, 4 * chunkSize
+    expected = [(str(i), data[i - 1]) for i in range(frm, to + 1)]
+    assert list(store.iterator(start=frm, end=to)) == expected
+    assert sorted(opened) == [chunkSize + 1, 2 * chunkSize + 1, 3 * chunkSize + 1]
+
+    # Single reads go through the chunks which are kept open
+    assert [store.get(i) for i in range(frm, to + 1)] == [v for _, v in expected]
+    assert [store.get(i) for i in range(frm, to + 1)] == [v for _, v in expected]
+    assert len(opened) == 6
+
+
+def test_interleaved_reads(populatedChunkedFileStore):
+    store = populatedChunkedFileStore
+    expected = [(str(i), data[i - 1]) for i in range(1, dataSize + 1)]
+
+    # Single reads of the chunk a range read is suspended in
+    read = []
+    for key, value in store.iterator(start=1, end=dataSize):
+        read.append((key, value))
+        assert store.get(int(key)) == value
+        assert store.size == dataSize
+    assert read == expected
+
+    # Range reads nested in a range read
+    read = []
+    for key, value in store.iterator(start=1, end=dataSize):
+        read.append((key, value))
+        assert list(store.iterator(start=int(key), end=int(key) + 1)) == \
+            expected[int(key) - 1:int(key) + 1]
+    assert read == expected
+
+
+def test_range_read_ends_with_last_entry(populatedChunkedFileStore):
+    store = populatedChunkedFileStore
+    assert [int(k) for k, _ in store.iterator(start=dataSize - 4, end=dataSize + 10)] == \
+        list(range(dataSize - 4, dataSize + 1))
+    assert [int(k) for k, _ in store.iterator(start=dataSize - 4)] == \
+        list(range(dataSize - 4, dataSize + 1))
+    assert list(store.iterator(start=dataSize + 1, end=dataSize + 10)) == []
+
+
+def test_get_missing_key_does_not_create_chunk(tempdir, populatedChunkedFileStore):
+    store = populatedChunkedFileStore
+    chunks = os.listdir(os.path.join(tempdir, "chunked_data"))
+    with pytest.raises(KeyError):
+        store.get(dataSize + 10 * chunkSize)
+    assert os.listdir(os.path.join(tempdir, "chunked_data")) == chunks
+
+    store.put(None, getValue(dataSize + 1))
+    assert store.get(dataSize + 1) == getValue(dataSize + 1)
+
+
+def test_read_lines_across_blocks(tempdir):
+    store = BinaryFileStore(tempdir, "binary_data", isLineNoKey=True,
+                            storeContentHash=False)
+    # Blocks end in the middle of lines as well as right after a separator
+    store.readBlockSize = len(store.lineSep) + 3
+    values = [b"a" * (i % 7 + 1) for i in range(30)]
+    for value in values:
+        store.put(None, value)
+    assert [v for _, v in store.iterator()] == values
+    store.close()
@@ -0,0 +1,77 @@
+import pytest
+
+from state.pruning_state import PruningState
+from storage.group_commit import GroupCommit, GroupCommitStorage
+from storage.kv_in_memory import KeyValueStorageInMemory
+from storage.kv_store_leveldb_int_keys import KeyValueStorageLeveldbIntKeys
+
+
+@pytest.fixture(scope="function")
+def group():
+    return GroupCommit()
+
+
+def test_writes_go_through_when_group_is_not_open(group):
+    kv = KeyValueStorageInMemory()
+    storage = GroupCommitStorage(kv, group)
+    storage.put('k1', 'v1')
+    storage.setBatch([('k2', 'v2')])
+    assert kv.get('k1') == b'v1'
+    assert kv.get('k2') == b'v2'
+    storage.remove('k1')
+    assert 'k1' not in kv
+
+
+def test_writes_are_written_on_commit(group):
+    kv1 = KeyValueStorageInMemory()
+    kv2 = KeyValueStorageInMemory()
+    storage1 = GroupCommitStorage(kv1, group)
+    storage2 = GroupCommitStorage(kv2, group)
+    kv1.put('old', 'v')
+
+    group.begin()
+    storage1.put('k1', 'v1')
+    storage1.setBatch([('k2', 'v2'), ('k1', 'v11')])
+    storage1.remove('old')
+    storage2.put('k1', 'v1')
+    assert kv1.size == 1
+    assert kv2.size == 0
+    # Written values are read back before the commit
+    assert storage1.get('k1') == b'v11'
+    assert storage1.get(b'k2') == b'v2'
+    assert 'old' not in storage1
+    with pytest.raises(KeyError):
+        storage2.get('k2')
+
+    group.commit()
+    assert not group.is_open
+    assert dict(kv1.iterator()) == {b'k1': b'v11', b'k2': b'v2'}
+    assert dict(kv2.iterator()) == {b'k1': b'v1'}
+
+
+def test_state_committed_in_group(group):
+    kv = KeyValueStorageInMemory()
+    state = PruningState(GroupCommitStorage(kv, group))
+    size = kv.size
+
+    group.begin()
+    state.set(b'k', b'v')
+    state.commit(state.headHash)
+    assert kv.size == size
+    assert state.get(b'k') == b'v'
+    group.commit()
+    assert kv.size > size
+
+    restarted = PruningState(kv)
+    assert restarted.committedHeadHash == state.committedHeadHash
+    assert restarted.get(b'k') == b'v'
+
+
+def test_storage_specific_methods(group, tempdir):
+    kv = KeyValueStorageLeveldbIntKeys(tempdir, 'int_keys')
+    storage = GroupCommitStorage(kv, group)
+    storage.put('1', 'a')
+    storage.put('5', 'b')
+    assert storage.get_equal_or_prev(3) == b'a'
+    assert storage.get_last_key() == b'5'
+    storage.close()
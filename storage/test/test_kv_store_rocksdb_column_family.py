@@ -0,0 +1,69 @@
+import pytest
+
+from storage.kv_store_rocksdb_column_family import KeyValueStorageRocksdbColumnFamily, \
+    KeyValueStorageRocksdbIntKeysColumnFamily, SharedRocksdb
+
+
+@pytest.fixture(scope="function")
+def storages(tempdir):
+    kv1 = KeyValueStorageRocksdbColumnFamily(tempdir, 'kv1')
+    kv2 = KeyValueStorageRocksdbColumnFamily(tempdir, 'kv2')
+    int_kv = KeyValueStorageRocksdbIntKeysColumnFamily(tempdir, 'int_kv')
+    yield kv1, kv2, int_kv
+    for kv in (kv1, kv2, int_kv):
+        kv.close()
+
+
+def test_storages_share_one_database(storages):
+    kv1, kv2, int_kv = storages
+    assert kv1.shared_db is kv2.shared_db is int_kv.shared_db
+
+    kv1.put('k', 'v1')
+    kv2.put('k', 'v2')
+    assert kv1.get('k') == b'v1'
+    assert kv2.get('k') == b'v2'
+    assert list(kv1.iterator()) == [(b'k', b'v1')]
+    assert list(kv2.iterator(include_value=False)) == [b'k']
+    with pytest.raises(KeyError):
+        int_kv.get('1')
+
+
+def test_reopen(tempdir, storages):
+    kv1, kv2, int_kv = storages
+    kv1.put('k', 'v1')
+    for ts in (10, 2, 100):
+        int_kv.put(str(ts), str(ts))
+    for kv in storages:
+        kv.close()
+    assert not SharedRocksdb._instances
+
+    int_kv = KeyValueStorageRocksdbIntKeysColumnFamily(tempdir, 'int_kv')
+    kv1 = KeyValueStorageRocksdbColumnFamily(tempdir, 'kv1')
+    assert kv1.get('k') == b'v1'
+    # Keys are still compared as integers
+    assert list(int_kv.iterator(include_value=False)) == [b'2', b'10', b'100']
+    assert int_kv.get_equal_or_prev(50) == b'10'
+    assert int_kv.get_last_key() == b'100'
+    int_kv.close()
+    kv1.close()
+
+
+def test_batch_over_several_storages(storages):
+    kv1, kv2, int_kv = storages
+    kv1.shared_db.set_batch([(kv1, 'a', '1'),
+                             (kv2, 'b', '2'),
+                             (int_kv, '3', '3')])
+    assert kv1.get('a') == b'1'
+    assert kv2.get('b') == b'2'
+    assert int_kv.get('3') == b'3'
+
+
+def test_drop(storages):
+    kv1, kv2, _ = storages
+    kv1.put('k', 'v')
+    kv2.put('k', 'v')
+    kv1.close()
+    kv1.drop()
+    kv1.open()
+    assert 'k' not in kv1
+    assert kv2.get('k') == b'v'
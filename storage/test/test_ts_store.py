@@ -5,11 +5,15 @@ from storage.state_ts_store import StateTsDbStorage
 
 
 @pytest.fixture(scope="function", params=['rocksdb', 'leveldb'])
-def empty_storage(request, tmpdir_factory):
+def storage_type(request):
     if request.param == 'leveldb':
-        kv_storage_type = KeyValueStorageType.Leveldb
-    else:
-        kv_storage_type = KeyValueStorageType.Rocksdb
+        return KeyValueStorageType.Leveldb
+    return KeyValueStorageType.Rocksdb
+
+
+@pytest.fixture(scope="function", params=[False, True], ids=['no_index', 'index'])
+def empty_storage(request, storage_type, tmpdir_factory):
+    kv_storage_type = storage_type
 
     data_location = tmpdir_factory.mktemp('tmp').strpath
 
@@ -26,7 +30,7 @@ def empty_storage(request, tmpdir_factory):
     storage = StateTsDbStorage("test", {
         DOMAIN_LEDGER_ID: domain_storage,
         CONFIG_LEDGER_ID: config_storage
-    })
+    }, index=request.param)
 
     return storage
 
@@ -98,3 +102,40 @@ def test_empty_storage_get_last_key(empty_storage):
     storage = empty_storage
     assert storage.get_last_key() is None
     assert storage.get_last_key(CONFIG_LEDGER_ID) is None
+
+
+def test_index_loaded_from_storage(storage_type, tmpdir_factory):
+    data_location = tmpdir_factory.mktemp('tmp').strpath
+    storage = StateTsDbStorage("test", {
+        DOMAIN_LEDGER_ID: initKeyValueStorageIntKeys(storage_type, data_location, "test_db")
+    })
+    for ts in (5, 100, 3, 20):
+        storage.set(ts, "root{}".format(ts))
+    storage.close()
+
+    storage = StateTsDbStorage("test", {
+        DOMAIN_LEDGER_ID: initKeyValueStorageIntKeys(storage_type, data_location, "test_db")
+    }, index=True)
+    assert storage.get_equal_or_prev(2) is None
+    assert storage.get_equal_or_prev(4) == b"root3"
+    assert storage.get_equal_or_prev(99) == b"root20"
+    assert storage.get(20) == b"root20"
+    assert storage.get_last_key() == b"100"
+
+    # New roots are indexed as they are stored
+    storage.set(50, "root50")
+    storage.set(200, "root200")
+    assert storage.get_equal_or_prev(99) == b"root50"
+    assert storage.get_equal_or_prev(10 ** 6) == b"root200"
+    assert storage.get_last_key() == b"200"
+    with pytest.raises(KeyError):
+        storage.get(21)
+    storage.close()
+
+
+def test_get_roots(storage_with_ts_root_hashes):
+    storage, domain_ts_list, config_ts_list = storage_with_ts_root_hashes
+    assert [root.decode() for root in storage.get_roots()] == \
+        [domain_ts_list[ts] for ts in sorted(domain_ts_list)]
+    assert [root.decode() for root in storage.get_roots(5, CONFIG_LEDGER_ID)] == \
+        [config_ts_list[5], config_ts_list[50]]
@@ -142,6 +142,28 @@ def test_ident_not_utf_8_decoded(clientstack):
     assert not client.rxMsgs
 
 
+def test_received_msgs_decoded_when_processed(clientstack):
+    """
+    ZStack keeps received messages as bytes and rejects the ones which are
+    not utf-8 encoded when they are processed
+    """
+    alpha, _ = clientstack
+    received = []
+    rejected = []
+    alpha.msgHandler = received.append
+    alpha.msgRejectHandler = lambda reason, frm: rejected.append(frm)
+    ident = b'client'
+
+    assert alpha._verifyAndAppend(b'{"k1": "v1"}', ident)
+    assert alpha._verifyAndAppend(b'{"k2": "v2\x9c"}', ident)
+    assert alpha._verifyAndAppend(b'{"k3": "v3"}', ident)
+    assert all(isinstance(msg, bytes) for msg, _ in alpha.rxMsgs)
+
+    assert alpha.processReceived(limit=10) == 3
+    assert received == [({"k1": "v1"}, ident), ({"k3": "v3"}, ident)]
+    assert rejected == [ident]
+
+
 def test_zstack_creates_keys_with_secure_permissions(tdir):
     any_seed = b'0' * 32
     stack_name = 'aStack'
@@ -33,7 +33,7 @@ from zmq.utils import z85
 from zmq.utils.monitor import recv_monitor_message
 
 import zmq
-from stp_core.common.log import getlogger
+from stp_core.common.log import getlogger, TRACE_LOG_LEVEL
 from stp_core.network.network_interface import NetworkInterface
 from stp_zmq.util import createEncAndSigKeys, \
     moveKeyFilesToCorrectLocations, createCertsFromKeys
@@ -507,16 +507,20 @@ class ZStack(NetworkInterface):
         try:
             self.metrics.add_event(self.mt_incoming_size, len(msg))
             self.msgLenVal.validate(msg)
-            decoded = msg.decode()
-        except (UnicodeDecodeError, InvalidMessageExceedingSizeException) as ex:
-            errstr = 'Message will be discarded due to {}'.format(ex)
-            frm = self.remotesByKeys[ident].name if ident in self.remotesByKeys else ident
-            logger.error("Got from {} {}".format(z85_to_friendly(frm), errstr))
-            self.msgRejectHandler(errstr, frm)
+        except InvalidMessageExceedingSizeException as ex:
+            self._rejectMsg(ex, ident)
             return False
-        self.rxMsgs.append((decoded, ident))
+        # Messages are kept as received, they are decoded only when
+        # processed, and health messages are never decoded
+        self.rxMsgs.append((msg, ident))
         return True
 
+    def _rejectMsg(self, ex, ident):
+        errstr = 'Message will be discarded due to {}'.format(ex)
+        frm = self.remotesByKeys[ident].name if ident in self.remotesByKeys else ident
+        logger.error("Got from {} {}".format(z85_to_friendly(frm), errstr))
+        self.msgRejectHandler(errstr, frm)
+
     def _receiveFromListener(self, quota: Quota) -> int:
         """
         Receives messages from listener
@@ -571,8 +575,11 @@ class ZStack(NetworkInterface):
                         # Router probing sends empty message on connection
                         continue
                     i += 1
-                    logger.trace("{} received a message from remote {} by socket {} {}".
-                                 format(self, z85_to_friendly(ident), sock.FD, sock.underlying))
+                    # Getting socket options takes system calls, so the
+                    # message is formatted only when it is logged
+                    if logger.isEnabledFor(TRACE_LOG_LEVEL):
+                        logger.trace("{} received a message from remote {} by socket {} {}".
+                                     format(self, z85_to_friendly(ident), sock.FD, sock.underlying))
                     self._verifyAndAppend(msg, ident)
                 except zmq.Again as e:
                     break
@@ -618,7 +625,8 @@ class ZStack(NetworkInterface):
             if not self.config.RETRY_CONNECT and ident in self.remotesByKeys:
                 self.remotesByKeys[ident].setConnected()
 
-            if self.handlePingPong(msg, frm, ident):
+            if msg in self.healthMessages:
+                self.handlePingPong(msg.decode(), frm, ident)
                 continue
 
             if not self.onlyListener and ident not in self.remotesByKeys:
@@ -633,6 +641,9 @@ class ZStack(NetworkInterface):
 
             try:
                 msg = self.deserializeMsg(msg)
+            except UnicodeDecodeError as ex:
+                self._rejectMsg(ex, ident)
+                continue
             except Exception as e:
                 logger.error('Error {} while converting message {} '
                              'to JSON from {}'.format(e, msg, z85_to_friendly(ident)))